@@ -0,0 +1,177 @@
+from __future__ import annotations
+import numpy as np
+from edge import Edge, EdgeBuffer
+
+
+class BatchLineOfSight:
+    """
+    Visibility polygons of many sources against one shared set of walls, computed with NumPy.
+
+    Instead of sweeping the walls, two rays are cast from each source slightly to each side of
+    every wall corner, and the nearest hit of each ray is found for all rays, walls
+    and sources at once. The hits sorted by angle are the vertices of the visibility polygon.
+    """
+
+    # Angular offset of the rays cast beside each vertex, to see past the corners
+    epsilon = 1e-5
+
+    # Maximum number of (source, ray, wall) combinations evaluated at once
+    chunk_size = 1 << 22
+
+    @staticmethod
+    def wall_arrays(walls: EdgeBuffer | set[Edge], map_size: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Convert the walls to arrays.
+
+        Returns the (W, 4) array of walls as x0, y0, x1, y1 and the (V, 2) array of the
+        vertices where the visibility can change, including the corners of the map. Vertices in the middle of a straight run of
+        walls, such as the shared corners of the sides of a row of tiles, are left out since
+        rays cast at them see the same walls as their neighbours. Both arrays can be reused
+        for every batch while the walls don't change.
+        """
+        width, height = map_size
+        limits = [(0, 0, 0, height), (0, height, width, height), (width, height, width, 0), (width, 0, 0, 0)]
+
+        if isinstance(walls, EdgeBuffer):
+            segments = np.column_stack(walls.as_numpy())
+        else:
+            segments = np.array([(*wall.start, *wall.end) for wall in walls], dtype=np.float64).reshape(-1, 4)
+        segments = np.concatenate((segments, np.array(limits, dtype=np.float64)))
+        vertices, inverse, counts = np.unique(segments.reshape(-1, 2), axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+
+        # Direction of each wall leaving each of its two vertices
+        directions = np.stack((segments[:, 2:] - segments[:, :2], segments[:, :2] - segments[:, 2:]), axis=1).reshape(-1, 2)
+
+        # A vertex shared by exactly two walls going in opposite directions is not a corner
+        order = np.argsort(inverse, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        pairs = counts == 2
+        first = directions[order[starts[pairs]]]
+        second = directions[order[starts[pairs] + 1]]
+        straight = np.zeros(len(vertices), dtype=bool)
+        straight[pairs] = ((first[:, 0] * second[:, 1] - first[:, 1] * second[:, 0] == 0) &
+                           (first[:, 0] * second[:, 0] + first[:, 1] * second[:, 1] < 0))
+
+        # The limits are hit in closed form by cast_rays, only their corners are kept
+        return segments[:-len(limits)], vertices[~straight]
+
+    @staticmethod
+    def cast_rays(sources: np.ndarray, angles: np.ndarray, segments: np.ndarray, map_size: tuple[int, int]) -> np.ndarray:
+        """
+        Cast the (N, R) rays with the given angles from each of the (N, 2) sources and return
+        the (N, R, 2) points where they hit the nearest wall or the limits of the map.
+
+        The angles of each source must be sorted and in [-pi, pi). Each wall is only tested
+        against the rays inside the angle it covers as seen from the source, which is a range
+        of the sorted rays found with a binary search.
+        """
+        count, rays = angles.shape
+        dx = np.cos(angles).reshape(-1)
+        dy = np.sin(angles).reshape(-1)
+
+        # Rays of all sources in one sorted array, each source shifted to its own turn
+        turns = np.arange(count)[:, None] * (4 * np.pi)
+        keys = (angles + turns).reshape(-1)
+
+        # Angles of the ends of each wall as seen from each source
+        a0 = np.arctan2(segments[None, :, 1] - sources[:, 1, None], segments[None, :, 0] - sources[:, 0, None])
+        a1 = np.arctan2(segments[None, :, 3] - sources[:, 1, None], segments[None, :, 2] - sources[:, 0, None])
+        low = np.minimum(a0, a1)
+        high = np.maximum(a0, a1)
+
+        # Walls covering more than half a turn cross the -pi ray, so they are split in two
+        wraps = high - low > np.pi
+        lows = np.concatenate((np.where(wraps, high, low), np.where(wraps, -np.pi, np.nan)), axis=1)
+        highs = np.concatenate((np.where(wraps, np.pi, high), np.where(wraps, low, np.nan)), axis=1)
+        walls = np.tile(np.arange(len(segments)), 2)
+
+        row, column = np.nonzero(~np.isnan(lows))
+        wall = walls[column]
+        tolerance = 1e-9
+        first = np.searchsorted(keys, lows[row, column] + turns[row, 0] - tolerance)
+        last = np.searchsorted(keys, highs[row, column] + turns[row, 0] + tolerance, side='right')
+
+        # One (ray, wall) pair for every ray inside the angle of every wall
+        sizes = last - first
+        offsets = np.cumsum(sizes) - sizes
+        ray = np.arange(sizes.sum()) - np.repeat(offsets - first, sizes)
+
+        # Solve source + t * ray = start + u * (end - start). A ray inside the angle of a wall
+        # always hits it, so only t is needed, and its numerator only depends on the source
+        # and the wall, so it is computed once and repeated for each of its rays.
+        ax = segments[wall, 0] - sources[row, 0]
+        ay = segments[wall, 1] - sources[row, 1]
+        ex = segments[wall, 2] - segments[wall, 0]
+        ey = segments[wall, 3] - segments[wall, 1]
+        numerator = np.repeat(ax * ey - ay * ex, sizes)
+        ex = np.repeat(ex, sizes)
+        ey = np.repeat(ey, sizes)
+
+        denom = dx[ray] * ey - dy[ray] * ex
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = numerator / denom
+
+        hits = (denom != 0) & (t >= 0)
+        nearest = BatchLineOfSight.limits_distance(sources, dx.reshape(count, rays), dy.reshape(count, rays), map_size).reshape(-1)
+        np.minimum.at(nearest, ray[hits], t[hits])
+
+        x = sources[:, 0, None] + nearest.reshape(count, rays) * dx.reshape(count, rays)
+        y = sources[:, 1, None] + nearest.reshape(count, rays) * dy.reshape(count, rays)
+        return np.stack((x, y), axis=2)
+
+    @staticmethod
+    def limits_distance(sources: np.ndarray, dx: np.ndarray, dy: np.ndarray, map_size: tuple[int, int]) -> np.ndarray:
+        """
+        Distance along the (N, R) rays from the (N, 2) sources to the limits of the map.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tx = np.where(dx > 0, map_size[0] - sources[:, 0, None], -sources[:, 0, None]) / dx
+            ty = np.where(dy > 0, map_size[1] - sources[:, 1, None], -sources[:, 1, None]) / dy
+
+        tx[dx == 0] = np.inf
+        ty[dy == 0] = np.inf
+        return np.minimum(tx, ty)
+
+    @staticmethod
+    def build_visibility_polygons(walls: EdgeBuffer | set[Edge], sources, map_size: tuple[int, int],
+                                  segments: np.ndarray = None, vertices: np.ndarray = None) -> list[np.ndarray]:
+        """
+        Build the visibility polygon of each source.
+
+        `sources` is an (N, 2) array of points in the same coordinates as the walls. The
+        walls are converted with wall_arrays unless `segments` and `vertices` are given.
+
+        Returns one (M, 2) array per source with the vertices of its polygon sorted by angle.
+        """
+        if segments is None or vertices is None:
+            segments, vertices = BatchLineOfSight.wall_arrays(walls, map_size)
+
+        sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+        polygons = []
+
+        # Two rays per vertex, slightly to each side of it
+        offsets = np.array([-BatchLineOfSight.epsilon, BatchLineOfSight.epsilon])
+        rays = len(offsets) * len(vertices)
+        step = max(1, BatchLineOfSight.chunk_size // (rays * max(1, len(segments))))
+
+        for first in range(0, len(sources), step):
+            batch = sources[first:first + step]
+
+            # Angle from every source to every vertex, kept in [-pi, pi)
+            base = np.arctan2(vertices[None, :, 1] - batch[:, None, 1], vertices[None, :, 0] - batch[:, None, 0])
+            angles = (base[:, :, None] + offsets).reshape(len(batch), rays)
+            angles = (angles + np.pi) % (2 * np.pi) - np.pi
+            angles.sort(axis=1)
+
+            polygons.extend(BatchLineOfSight.cast_rays(batch, angles, segments, map_size))
+
+        return polygons
+
+    @staticmethod
+    def polygon_to_triangles(source: tuple[int, int], polygon: np.ndarray) -> list[tuple[tuple[float, float], ...]]:
+        """
+        Split a visibility polygon in the (source, point, next point) triangles of its fan.
+        """
+        points = [tuple(point) for point in polygon.tolist()]
+        return [(tuple(source), points[i - 1], points[i]) for i in range(len(points))]
@@ -0,0 +1,65 @@
+"""
+Throughput of BatchLineOfSight against looping LineOfSight.build_visibility_triangles.
+
+Both are timed the same way: one warm-up call, then the best of REPEAT calls.
+
+Run from the repository root with `python benchmarks/batch_throughput.py`.
+"""
+from __future__ import annotations
+import os
+import random
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_line_of_sight import BatchLineOfSight
+from line_of_sight import LineOfSight
+from polymap import Polymap
+
+REPEAT = 3
+
+
+def best_time(function, repeat: int = REPEAT) -> float:
+    """
+    Best time of `repeat` calls of the function, after one call to warm the caches up.
+    """
+    function()
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main():
+    rng = random.Random(0)
+    map_size = (800, 600)
+
+    print(f"{'edges':>6} {'sources':>8} {'loop ms':>9} {'batch ms':>9} {'speedup':>8}")
+    for tile_count, source_count in ((40, 50), (40, 200), (150, 100)):
+        tiles = {(rng.randrange(20), rng.randrange(15)) for _ in range(tile_count)}
+        edges = Polymap().convert_to_polygon(tiles)
+        sources = np.array([(rng.randrange(800) + 0.5, rng.randrange(600) + 0.5) for _ in range(source_count)])
+
+        def loop_sources():
+            for source in sources:
+                LineOfSight.build_visibility_triangles(edges, tuple(source), map_size)
+
+        # The wall arrays are shared by every batch while the map doesn't change
+        segments, vertices = BatchLineOfSight.wall_arrays(edges, map_size)
+
+        def batch_sources():
+            BatchLineOfSight.build_visibility_polygons(edges, sources, map_size, segments, vertices)
+
+        loop = best_time(loop_sources)
+        batch = best_time(batch_sources)
+
+        print(f"{len(edges):>6} {source_count:>8} {loop * 1000:>9.1f} {batch * 1000:>9.1f} {loop / batch:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Seeded generators of tile maps for the benchmarks.
+
+Each generator takes the map size in tiles and a seed and returns the set of filled
+(x, y) tiles, the same format Polymap.convert_to_polygon takes.
+"""
+from __future__ import annotations
+import random
+
+
+def scatter(width: int, height: int, seed: int, density: float = 0.15) -> set[tuple[int, int]]:
+    """Random tile scatter with the given fraction of filled tiles."""
+    rng = random.Random(seed)
+    return {(x, y) for x in range(width) for y in range(height) if rng.random() < density}
+
+
+def maze(width: int, height: int, seed: int) -> set[tuple[int, int]]:
+    """Perfect maze carved by a randomized depth first search, with one tile wide walls."""
+    rng = random.Random(seed)
+    tiles = {(x, y) for x in range(width) for y in range(height)}
+
+    # Cells are the tiles with odd coordinates, walls lie between them
+    start = (1, 1)
+    tiles.discard(start)
+    stack = [start]
+    while stack:
+        x, y = stack[-1]
+        neighbours = [(x + dx, y + dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                      if 0 < x + dx < width - 1 and 0 < y + dy < height - 1 and (x + dx, y + dy) in tiles]
+        if not neighbours:
+            stack.pop()
+            continue
+
+        nx, ny = rng.choice(neighbours)
+        tiles.discard(((x + nx) // 2, (y + ny) // 2))
+        tiles.discard((nx, ny))
+        stack.append((nx, ny))
+
+    return tiles
+
+
+def rooms(width: int, height: int, seed: int, room_size: tuple[int, int] = (4, 12)) -> set[tuple[int, int]]:
+    """Rectangular rooms carved out of solid rock, joined by L shaped corridors."""
+    rng = random.Random(seed)
+    tiles = {(x, y) for x in range(width) for y in range(height)}
+
+    count = max(2, width * height // (room_size[1] * room_size[1] * 2))
+    centres = []
+    for _ in range(count):
+        w = rng.randint(*room_size)
+        h = rng.randint(*room_size)
+        if w >= width - 2 or h >= height - 2:
+            w, h = max(1, width - 2), max(1, height - 2)
+        x = rng.randint(1, width - w - 1)
+        y = rng.randint(1, height - h - 1)
+        tiles.difference_update((i, j) for i in range(x, x + w) for j in range(y, y + h))
+        centres.append((x + w // 2, y + h // 2))
+
+    # Each room is joined to the previous one
+    for (x0, y0), (x1, y1) in zip(centres, centres[1:]):
+        tiles.difference_update((x, y0) for x in range(min(x0, x1), max(x0, x1) + 1))
+        tiles.difference_update((x1, y) for y in range(min(y0, y1), max(y0, y1) + 1))
+
+    return tiles
+
+
+def checkerboard(width: int, height: int, seed: int) -> set[tuple[int, int]]:
+    """Every other tile filled, the worst case for the number of edges."""
+    return {(x, y) for x in range(width) for y in range(height) if (x + y) % 2 == 0}
+
+
+GENERATORS = {
+    'scatter': scatter,
+    'maze': maze,
+    'rooms': rooms,
+    'checkerboard': checkerboard,
+}
@@ -0,0 +1,81 @@
+"""
+Frame cost of LayeredRenderer while the light is dragged, as in the demo.
+
+Times the frames that recompute the light, with the flat polygon light of the demo and with
+Lightmap lights of several radii, and prints the median and the worst frame. The visibility
+triangles are computed before the frame, so only the drawing is timed. A frame must stay
+under 16.7 ms to hold 60 FPS.
+
+Run from the repository root with `python benchmarks/light_frame.py`. It needs pygame and
+uses the dummy video driver, so no window is opened.
+"""
+from __future__ import annotations
+import os
+import sys
+from time import perf_counter
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pygame
+
+from generators import scatter
+from line_of_sight import LineOfSight
+from polymap import Polymap
+from render import LayeredRenderer
+
+TILE_SIZE = 40
+MAP_SIZE = (800, 600)
+FRAMES = 120
+FRAME_BUDGET = 1 / 60
+
+
+def drag_path(tiles: set[tuple[int, int]], frames: int) -> list[tuple[int, int]]:
+    """Source moved a few pixels per frame around the middle of the map, off the tiles."""
+    path = []
+    x, y = MAP_SIZE[0] // 2, MAP_SIZE[1] // 2
+    for frame in range(frames):
+        step = (3, 1) if frame % 40 < 20 else (-3, -1)
+        if (((x + step[0]) // TILE_SIZE, (y + step[1]) // TILE_SIZE)) not in tiles:
+            x, y = x + step[0], y + step[1]
+        path.append((x, y))
+    return path
+
+
+def main():
+    pygame.display.init()
+    screen = pygame.display.set_mode(MAP_SIZE)
+
+    width, height = MAP_SIZE[0] // TILE_SIZE, MAP_SIZE[1] // TILE_SIZE
+    tiles = scatter(width, height, seed=1) - {(width // 2, height // 2)}
+    polymap = Polymap((width, height), TILE_SIZE)
+    for tile in tiles:
+        polymap.tiles.add(tile)
+    polymap.update()
+
+    path = drag_path(tiles, FRAMES)
+    triangles = {source: LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE) for source in path}
+
+    print(f"{'light':>12} {'median ms':>10} {'worst ms':>9} {'60 FPS':>7}")
+    for radius in (None, 150, 400, 1000):
+        renderer = LayeredRenderer(screen, TILE_SIZE, (0, 0, 0), (100, 100, 100), (255, 0, 0), (100, 100, 100),
+                                   (255, 240, 180), (255, 0, 0), radius)
+        renderer.render(polymap, path[0], 10, lambda source: triangles[source])
+
+        times = []
+        for source in path[1:]:
+            start = perf_counter()
+            renderer.render(polymap, source, 10, lambda source: triangles[source])
+            times.append(perf_counter() - start)
+
+        times.sort()
+        median = times[len(times) // 2]
+        label = 'flat' if radius is None else f'radius {radius}'
+        print(f"{label:>12} {median * 1000:>10.2f} {times[-1] * 1000:>9.2f} {'yes' if median < FRAME_BUDGET else 'no':>7}")
+
+    pygame.display.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Headless benchmark suite of the visibility pipeline.
+
+Generates seeded maps, then times the path the demo runs, Polymap.update on the occupancy
+grid with and without traced contours and LineOfSight.build_visibility_triangles on the
+Polymap with its cached vertex adjacency, and saves the results as JSON. The set based
+Polymap.convert_to_polygon and queries over its plain edge list are timed too, as a legacy
+row to compare against.
+
+    python benchmarks/suite.py --sizes 20x15 80x60 --output results.json
+    python benchmarks/suite.py --compare results.json
+
+Maps of 1000x1000 tiles take minutes per query, ask for them explicitly with
+--sizes 1000x1000 --queries 1 --repeat 1.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import GENERATORS
+from line_of_sight import LineOfSight
+from polymap import Polymap
+
+TILE_SIZE = 40
+DEFAULT_SIZES = ['20x15', '80x60', '250x250']
+
+
+def parse_size(text: str) -> tuple[int, int]:
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def measure(function, repeat: int) -> tuple[float, int]:
+    """
+    Best time of `repeat` calls of the function, and the peak memory of one more call.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+
+    # O tracemalloc deixa as chamadas mais lentas, então a memória é medida à parte
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def pick_sources(tiles: set[tuple[int, int]], width: int, height: int, count: int, seed: int) -> list[tuple[int, int]]:
+    """Centres of random empty tiles."""
+    rng = random.Random(seed)
+    empty = [(x, y) for x in range(width) for y in range(height) if (x, y) not in tiles]
+    chosen = rng.sample(empty, min(count, len(empty)))
+    return [(x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE // 2) for x, y in chosen]
+
+
+def timing(seconds: float, peak: int) -> dict:
+    return {'seconds': seconds, 'ops_per_sec': 1 / seconds if seconds else None, 'peak_bytes': peak}
+
+
+def query_timing(seconds: float, peak: int, queries: int) -> dict:
+    return {
+        'queries': queries,
+        'seconds_per_query': seconds / queries if queries else None,
+        'ops_per_sec': queries / seconds if seconds else None,
+        'peak_bytes': peak,
+    }
+
+
+def run_case(generator: str, size: tuple[int, int], seed: int, queries: int, repeat: int) -> dict:
+    width, height = size
+    tiles = GENERATORS[generator](width, height, seed)
+    map_size = (width * TILE_SIZE, height * TILE_SIZE)
+    sources = pick_sources(tiles, width, height, queries, seed)
+
+    polymap = Polymap(size, TILE_SIZE)
+    for tile in tiles:
+        polymap.tiles.add(tile)
+
+    traced_time, traced_peak = measure(lambda: polymap.update(trace_contours=True), repeat)
+    traced_edges = len(polymap.edges)
+    traced_vertices = sum(len(contour) for contour in polymap.contours)
+    update_time, update_peak = measure(lambda: polymap.update(), repeat)
+    vertices = {point for edge in polymap.edges for point in (edge.start, edge.end)}
+
+    # A adjacência fica no Polymap entre as consultas, como no demo, então a primeira não entra na média
+    def visibility():
+        for source in sources:
+            LineOfSight.build_visibility_triangles(polymap, source, map_size)
+
+    visibility_time, visibility_peak = measure(visibility, repeat) if sources else (0.0, 0)
+
+    legacy_time, legacy_peak = measure(lambda: polymap.convert_to_polygon(tiles, tile_size=TILE_SIZE), repeat)
+    edges = polymap.convert_to_polygon(tiles, tile_size=TILE_SIZE)
+
+    def legacy_visibility():
+        for source in sources:
+            LineOfSight.build_visibility_triangles(edges, source, map_size)
+
+    legacy_visibility_time, legacy_visibility_peak = measure(legacy_visibility, repeat) if sources else (0.0, 0)
+
+    return {
+        'generator': generator,
+        'size': f'{width}x{height}',
+        'seed': seed,
+        'tiles': len(tiles),
+        'edges': len(polymap.edges),
+        'traced_edges': traced_edges,
+        'traced_vertices': traced_vertices,
+        'vertices': len(vertices),
+        'polymap_update': timing(update_time, update_peak),
+        'polymap_update_traced': timing(traced_time, traced_peak),
+        'build_visibility_triangles': query_timing(visibility_time, visibility_peak, len(sources)),
+        'legacy': {
+            'convert_to_polygon': timing(legacy_time, legacy_peak),
+            'build_visibility_triangles': query_timing(legacy_visibility_time, legacy_visibility_peak, len(sources)),
+        },
+    }
+
+
+def compare(results: list[dict], baseline_path: str):
+    """Print the speed ratio of each case against a previous run."""
+    with open(baseline_path) as file:
+        baseline = {(case['generator'], case['size']): case for case in json.load(file)['results']}
+
+    def ratio(old: float, new: float) -> str:
+        return f"{old / new:>9.2f}x" if old and new else f"{'-':>10}"
+
+    print(f"\n{'generator':<14}{'size':>11}{'update':>10}{'query':>10}   (baseline time / current time)")
+    for case in results:
+        old = baseline.get((case['generator'], case['size']))
+        if old is None or 'polymap_update' not in old:
+            continue
+        update = ratio(old['polymap_update']['seconds'], case['polymap_update']['seconds'])
+        query = ratio(old['build_visibility_triangles']['seconds_per_query'],
+                      case['build_visibility_triangles']['seconds_per_query'])
+        print(f"{case['generator']:<14}{case['size']:>11}{update}{query}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='map sizes in tiles, as WIDTHxHEIGHT')
+    parser.add_argument('--generators', nargs='+', default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--queries', type=int, default=10, help='visibility queries per map')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each measurement, the best is kept')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of a previous run to compare against')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'generator':<14}{'size':>11}{'path':>8}{'edges':>9}{'vertices':>10}{'build s':>10}"
+          f"{'query ms':>10}{'queries/s':>11}{'peak MB':>9}")
+    for size in map(parse_size, args.sizes):
+        for generator in args.generators:
+            case = run_case(generator, size, args.seed, args.queries, args.repeat)
+            results.append(case)
+
+            # A linha legacy é o convert_to_polygon com consultas sobre a lista de arestas
+            rows = (('polymap', case['polymap_update'], case['build_visibility_triangles'], case['edges'], case['vertices']),
+                    ('traced', case['polymap_update_traced'], None, case['traced_edges'], case['traced_vertices']),
+                    ('legacy', case['legacy']['convert_to_polygon'], case['legacy']['build_visibility_triangles'],
+                     case['edges'], case['vertices']))
+            for path, build, visibility, edges, vertices in rows:
+                if visibility and visibility['seconds_per_query']:
+                    query = f"{visibility['seconds_per_query'] * 1000:>10.2f}{visibility['ops_per_sec']:>11.1f}"
+                else:
+                    query = f"{'-':>10}{'-':>11}"
+                peak = max(build['peak_bytes'], visibility['peak_bytes'] if visibility else 0) / 2 ** 20
+                print(f"{generator:<14}{case['size']:>11}{path:>8}{edges:>9}{vertices:>10}"
+                      f"{build['seconds']:>10.4f}{query}{peak:>9.1f}")
+
+    if args.output:
+        report = {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'arguments': vars(args),
+            'results': results,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Scaling benchmark of LineOfSight.build_visibility_triangles.
+
+Run from the repository root with `python benchmarks/sweep_scaling.py`.
+"""
+from __future__ import annotations
+import os
+import sys
+from math import log
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import scatter
+from line_of_sight import LineOfSight
+from polymap import Polymap
+
+
+def time_query(edges, source, map_size, repeat: int) -> float:
+    """Best time of `repeat` visibility queries, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        LineOfSight.build_visibility_triangles(edges, source, map_size)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main():
+    tile_size = 40
+    previous = None
+
+    print(f"{'tiles':>10} {'edges':>8} {'ms/query':>10} {'t/(n log n)':>12}")
+    for width in (20, 40, 80, 160, 320):
+        height = width * 3 // 4
+        tiles = scatter(width, height, seed=width)
+        edges = Polymap().convert_to_polygon(tiles, tile_size=tile_size)
+        map_size = (width * tile_size, height * tile_size)
+        source = (map_size[0] // 2 + 7, map_size[1] // 2 + 3)
+
+        elapsed = time_query(edges, source, map_size, repeat=3)
+        n = len(edges) + 4
+        normalized = elapsed / (n * log(n))
+        growth = f" x{normalized / previous:.2f}" if previous else ""
+        previous = normalized
+
+        print(f"{width}x{height:<6} {len(edges):>8} {elapsed * 1000:>10.2f} {normalized * 1e9:>9.1f}ns{growth}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+from collections import OrderedDict
+from edge import Edge
+from line_of_sight import LineOfSight
+from polymap import Polymap
+
+
+class Chunk:
+    """
+    Tiles of one chunk of the world and, once needed, the edges of their exposed sides.
+    """
+
+    __slots__ = ('tiles', 'edges')
+
+    def __init__(self, tiles: set[tuple[int, int]]):
+        self.tiles = tiles
+        self.edges = None
+
+
+class ChunkedWorld:
+    """
+    Tile world much larger than the screen, split in square chunks of `chunk_size` tiles that
+    are loaded only while needed.
+
+    The tiles of a chunk come from `tile_source(cx, cy, chunk_size)`, which returns the filled
+    tiles of the chunk (cx, cy) in world tile coordinates, or from the edits made with
+    add_tile and remove_tile. The edges of a chunk are the exposed sides of its own filled
+    tiles, so the edges of neighbour chunks never overlap, and they are built the first time a
+    query reaches the chunk. At most `capacity` chunks are kept, the least recently used are
+    dropped and loaded again from the source when needed. Only edited chunks are kept for
+    good, so the memory depends on the range of the lights and on the edits, not on the size
+    of the world.
+    """
+
+    def __init__(self, size: tuple[int, int], tile_source=None, chunk_size: int = 32, tile_size: int = 40, capacity: int = 64):
+        self.size = size
+        self.tile_source = tile_source
+        self.chunk_size = chunk_size
+        self.tile_size = tile_size
+        self.capacity = capacity
+        self.chunks = OrderedDict()
+        self.edited = {}
+        self.version = 0
+        self.loads = 0
+
+    def map_size(self) -> tuple[int, int]:
+        """
+        Size of the world in pixels.
+        """
+        return (self.size[0] * self.tile_size, self.size[1] * self.tile_size)
+
+    def chunk_of(self, x: int, y: int) -> tuple[int, int]:
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def chunk(self, cx: int, cy: int) -> Chunk:
+        """
+        The chunk (cx, cy), loaded from the edits or the tile source if it is not in memory.
+        """
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+
+        tiles = self.edited.get(key)
+        if tiles is None:
+            tiles = set(self.tile_source(cx, cy, self.chunk_size)) if self.tile_source else set()
+
+        chunk = Chunk(tiles)
+        self.chunks[key] = chunk
+        self.loads += 1
+
+        if len(self.chunks) > self.capacity:
+            self.chunks.popitem(last=False)
+
+        return chunk
+
+    def is_filled(self, x: int, y: int) -> bool:
+        if not (0 <= x < self.size[0] and 0 <= y < self.size[1]):
+            return False
+        return (x, y) in self.chunk(*self.chunk_of(x, y)).tiles
+
+    def chunk_edges(self, cx: int, cy: int) -> list[Edge]:
+        """
+        Edges of the exposed sides of the filled tiles of the chunk, built on the first use.
+        """
+        chunk = self.chunk(cx, cy)
+        if chunk.edges is not None:
+            return chunk.edges
+
+        edges = []
+        first_x, first_y = cx * self.chunk_size, cy * self.chunk_size
+        for x, y in chunk.tiles:
+            for dx, dy in Polymap.directions:
+                nx, ny = x + dx, y + dy
+
+                # Vizinhos fora do chunk são lidos do chunk deles
+                if first_x <= nx < first_x + self.chunk_size and first_y <= ny < first_y + self.chunk_size:
+                    filled = (nx, ny) in chunk.tiles
+                else:
+                    filled = self.is_filled(nx, ny)
+
+                if not filled:
+                    edges.append(Polymap.tile_side(x, y, (dx, dy), self.tile_size))
+
+        chunk.edges = edges
+        return edges
+
+    def add_tile(self, x: int, y: int) -> bool:
+        """
+        Fill the tile (x, y). Returns False if it was already filled.
+        """
+        if self.is_filled(x, y):
+            return False
+        self.edit(x, y, True)
+        return True
+
+    def remove_tile(self, x: int, y: int) -> bool:
+        """
+        Clear the tile (x, y). Returns False if it was not filled.
+        """
+        if not self.is_filled(x, y):
+            return False
+        self.edit(x, y, False)
+        return True
+
+    def edit(self, x: int, y: int, filled: bool):
+        """
+        Change the tile (x, y) and drop the edges of its chunk and of the neighbour chunks
+        sharing a side with it.
+        """
+        key = self.chunk_of(x, y)
+        tiles = self.chunk(*key).tiles
+        if filled:
+            tiles.add((x, y))
+        else:
+            tiles.discard((x, y))
+        self.edited[key] = tiles
+        self.version += 1
+
+        for dx, dy in ((0, 0),) + tuple(Polymap.directions):
+            chunk = self.chunks.get(self.chunk_of(x + dx, y + dy))
+            if chunk is not None:
+                chunk.edges = None
+
+    def chunks_in_range(self, center: tuple[float, float], radius: float) -> list[tuple[int, int]]:
+        """
+        Chunks inside the world that overlap the circle, in pixels.
+        """
+        span = self.chunk_size * self.tile_size
+        last_x = (self.size[0] - 1) // self.chunk_size
+        last_y = (self.size[1] - 1) // self.chunk_size
+        cx0 = max(0, int((center[0] - radius) // span))
+        cx1 = min(last_x, int((center[0] + radius) // span))
+        cy0 = max(0, int((center[1] - radius) // span))
+        cy1 = min(last_y, int((center[1] + radius) // span))
+
+        found = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                # Distância do centro ao retângulo do chunk
+                dx = max(cx * span - center[0], 0, center[0] - (cx + 1) * span)
+                dy = max(cy * span - center[1], 0, center[1] - (cy + 1) * span)
+                if dx * dx + dy * dy <= radius * radius:
+                    found.append((cx, cy))
+        return found
+
+    def walls_in_range(self, center: tuple[float, float], radius: float) -> list[Edge]:
+        walls = []
+        for cx, cy in self.chunks_in_range(center, radius):
+            walls.extend(self.chunk_edges(cx, cy))
+        return walls
+
+    def build_visibility_triangles(self, source: tuple[int, int], max_radius: float) -> list[tuple[int, int]]:
+        """
+        Build the visibility triangles of a light with the given range, loading only the
+        chunks it reaches.
+        """
+        walls = self.walls_in_range(source, max_radius)
+        return LineOfSight.build_visibility_triangles(walls, source, self.map_size(), max_radius)
@@ -1,7 +1,11 @@
+from __future__ import annotations
+from array import array
 from math import sqrt
 
 
 class Edge:
+    __slots__ = ('start', 'end')
+
     def __init__(self, start: tuple[int, int], end: tuple[int, int]):
         self.start = start
         self.end = end
@@ -12,15 +16,20 @@ class Edge:
 
     def distance(self, point: tuple[int, int]) -> float:
         """Calcula a distância entre o ponto fornecido a aresta."""
+        return Edge.segment_distance(self.start, self.end, point)
+
+    @staticmethod
+    def segment_distance(start: tuple[int, int], end: tuple[int, int], point: tuple[int, int]) -> float:
+        """Calcula a distância entre o ponto fornecido e a aresta de start até end."""
 
-        sx = self.start[0]
-        ex = self.end[0]
+        sx = start[0]
+        ex = end[0]
 
         if sx > ex:
             sx, ex = ex, sx
 
-        sy = self.start[1]
-        ey = self.end[1]
+        sy = start[1]
+        ey = end[1]
 
         if sy > ey:
             sy, ey = ey, sy
@@ -63,5 +72,127 @@ class Edge:
     
     def __hash__(self):
         return hash((self.start, self.end))
-    
-    
\ No newline at end of file
+
+
+class EdgeBuffer:
+    """
+    Arestas guardadas como estrutura de arrays: arrays contíguos de float x0, y0, x1, y1.
+
+    Cada aresta é guardada uma vez, sem direção, então adicionar uma aresta que já está no
+    buffer ou a sua reversa não faz nada. Remover uma aresta move a última para a sua posição,
+    então a ordem não é mantida. A iteração cria objetos Edge sob demanda.
+
+    Um buffer criado com wrap lê as colunas de memória de outro dono, como um arquivo mapeado,
+    sem copiá-las. Elas só são copiadas, e o índice das chaves montado, na primeira consulta
+    ou alteração.
+    """
+
+    __slots__ = ('x0', 'y0', 'x1', 'y1', 'slots')
+
+    def __init__(self, edges=()):
+        self.x0 = array('d')
+        self.y0 = array('d')
+        self.x1 = array('d')
+        self.y1 = array('d')
+        # Chave sem direção -> posição da aresta nos arrays
+        self.slots = {}
+
+        for edge in edges:
+            self.add(edge)
+
+    def __len__(self) -> int:
+        return len(self.x0)
+
+    def __iter__(self):
+        x0, y0, x1, y1 = self.x0, self.y0, self.x1, self.y1
+        for i in range(len(x0)):
+            yield Edge((x0[i], y0[i]), (x1[i], y1[i]))
+
+    def __contains__(self, edge: Edge) -> bool:
+        if self.slots is None:
+            self.unpack()
+        return EdgeBuffer.key(edge.start, edge.end) in self.slots
+
+    @staticmethod
+    def wrap(x0, y0, x1, y1) -> EdgeBuffer:
+        """Cria um buffer sobre colunas de float64 já existentes, como memoryviews, sem copiá-las."""
+        buffer = EdgeBuffer()
+        buffer.x0, buffer.y0, buffer.x1, buffer.y1 = x0, y0, x1, y1
+        buffer.slots = None
+        return buffer
+
+    @staticmethod
+    def from_columns(x0, y0, x1, y1) -> EdgeBuffer:
+        """Cria um buffer com cópias de colunas contíguas de float64, como arrays NumPy, montando o índice das chaves só no primeiro uso."""
+        buffer = EdgeBuffer.wrap(array('d'), array('d'), array('d'), array('d'))
+        for own, column in zip((buffer.x0, buffer.y0, buffer.x1, buffer.y1), (x0, y0, x1, y1)):
+            own.frombytes(memoryview(column).cast('B'))
+        return buffer
+
+    def copy(self) -> EdgeBuffer:
+        """Cópia independente do buffer, com as colunas copiadas."""
+        buffer = EdgeBuffer()
+        buffer.x0, buffer.y0, buffer.x1, buffer.y1 = (array('d', column) for column in (self.x0, self.y0, self.x1, self.y1))
+        buffer.slots = None if self.slots is None else dict(self.slots)
+        return buffer
+
+    def unpack(self):
+        """Copia colunas externas para arrays próprios e monta o índice das chaves."""
+        self.x0, self.y0, self.x1, self.y1 = (array('d', column) for column in (self.x0, self.y0, self.x1, self.y1))
+        starts = zip(self.x0.tolist(), self.y0.tolist())
+        ends = zip(self.x1.tolist(), self.y1.tolist())
+        keys = [(start, end) if start <= end else (end, start) for start, end in zip(starts, ends)]
+        self.slots = dict(zip(keys, range(len(keys))))
+
+    @staticmethod
+    def key(start: tuple[int, int], end: tuple[int, int]) -> tuple[tuple[int, int], tuple[int, int]]:
+        """Chave da aresta que não depende da direção, consistente com Edge.__eq__."""
+        return (start, end) if start <= end else (end, start)
+
+    def segment(self, i: int) -> tuple[tuple[float, float], tuple[float, float]]:
+        """Retorna os pontos (start, end) da aresta na posição i."""
+        return (self.x0[i], self.y0[i]), (self.x1[i], self.y1[i])
+
+    def add(self, edge: Edge) -> bool:
+        """Adiciona a aresta, retorna False se ela já estava no buffer."""
+        if self.slots is None:
+            self.unpack()
+        key = EdgeBuffer.key(edge.start, edge.end)
+        if key in self.slots:
+            return False
+
+        self.slots[key] = len(self.x0)
+        self.x0.append(edge.start[0])
+        self.y0.append(edge.start[1])
+        self.x1.append(edge.end[0])
+        self.y1.append(edge.end[1])
+        return True
+
+    def discard(self, edge: Edge) -> bool:
+        """Remove a aresta se ela estiver no buffer, retorna False se não estava."""
+        if self.slots is None:
+            self.unpack()
+        i = self.slots.pop(EdgeBuffer.key(edge.start, edge.end), None)
+        if i is None:
+            return False
+
+        # A última aresta ocupa a posição da removida
+        last = len(self.x0) - 1
+        if i != last:
+            for column in (self.x0, self.y0, self.x1, self.y1):
+                column[i] = column[last]
+            start, end = self.segment(i)
+            self.slots[EdgeBuffer.key(start, end)] = i
+
+        for column in (self.x0, self.y0, self.x1, self.y1):
+            column.pop()
+        return True
+
+    def as_numpy(self):
+        """
+        Retorna os arrays x0, y0, x1, y1 como arrays NumPy, sem copiá-los.
+
+        O buffer não pode crescer nem diminuir enquanto as views existirem.
+        """
+        import numpy as np
+        return tuple(np.frombuffer(column, dtype=np.float64) for column in (self.x0, self.y0, self.x1, self.y1))
@@ -0,0 +1,101 @@
+from __future__ import annotations
+from edge import Edge
+
+
+class EdgeGrid:
+    """
+    Uniform grid index over edges, to find the edges close to a point without visiting the
+    whole map. Each edge is stored in every cell its bounding box overlaps. With defer the
+    edges are only indexed on the first use of the grid.
+    """
+
+    def __init__(self, cell_size: int = 160):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.pending = None
+
+    def __iter__(self):
+        self.ensure()
+        seen = set()
+        for edges in self.cells.values():
+            for edge in edges:
+                if id(edge) not in seen:
+                    seen.add(id(edge))
+                    yield edge
+
+    def edge_cells(self, edge: Edge):
+        """
+        Cells overlapped by the bounding box of the edge.
+        """
+        x0, x1 = sorted((edge.start[0], edge.end[0]))
+        y0, y1 = sorted((edge.start[1], edge.end[1]))
+        for cx in range(int(x0 // self.cell_size), int(x1 // self.cell_size) + 1):
+            for cy in range(int(y0 // self.cell_size), int(y1 // self.cell_size) + 1):
+                yield (cx, cy)
+
+    def add(self, edge: Edge):
+        self.ensure()
+        for cell in self.edge_cells(edge):
+            self.cells.setdefault(cell, set()).add(edge)
+
+    def remove(self, edge: Edge):
+        self.ensure()
+        for cell in self.edge_cells(edge):
+            edges = self.cells.get(cell)
+            if edges is not None:
+                edges.discard(edge)
+                if not edges:
+                    del self.cells[cell]
+
+    def rebuild(self, edges):
+        """
+        Replace the content of the index with the given edges.
+        """
+        self.cells = {}
+        self.pending = None
+        for edge in edges:
+            self.add(edge)
+
+    def defer(self, edges):
+        """
+        Replace the content of the index with the given edges, indexing them on the first use.
+        """
+        self.cells = None
+        self.pending = edges
+
+    def ensure(self):
+        if self.cells is None:
+            self.rebuild(self.pending)
+
+    def query(self, center: tuple[int, int], radius: float) -> set[Edge]:
+        """
+        Edges that cross or lie inside the circle with the given center and radius.
+        """
+        self.ensure()
+        found = set()
+        cx0 = int((center[0] - radius) // self.cell_size)
+        cx1 = int((center[0] + radius) // self.cell_size)
+        cy0 = int((center[1] - radius) // self.cell_size)
+        cy1 = int((center[1] + radius) // self.cell_size)
+
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                edges = self.cells.get((cx, cy))
+                if edges:
+                    found.update(edges)
+
+        return {edge for edge in found if EdgeGrid.distance_squared(edge, center) <= radius * radius}
+
+    @staticmethod
+    def distance_squared(edge: Edge, point: tuple[int, int]) -> float:
+        """
+        Squared distance between the point and the closest point of the edge.
+        """
+        sx, sy = edge.start
+        dx = edge.end[0] - sx
+        dy = edge.end[1] - sy
+        length = dx * dx + dy * dy
+
+        t = 0 if length == 0 else ((point[0] - sx) * dx + (point[1] - sy) * dy) / length
+        t = max(0, min(1, t))
+        return (sx + t * dx - point[0]) ** 2 + (sy + t * dy - point[1]) ** 2
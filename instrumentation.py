@@ -0,0 +1,112 @@
+from __future__ import annotations
+import threading
+from collections import deque
+from time import perf_counter
+
+
+class Instrumentation:
+    """
+    Opt-in timings and counters of the stages of the visibility pipeline.
+
+    While no instrumentation is active, the instrumented code only checks
+    `Instrumentation.active` for None once per call. Once enabled, each call of an
+    instrumented function produces one record with the seconds spent in each of its stages and
+    its counters, such as the number of vertices or the peak of open walls. The record is kept
+    in `records`, the last `history` records, and passed to the sink if there is one.
+
+    A record is a dict with the name of the run, a dict of stage timings and a dict of
+    counters. Each thread builds its own record, so the stages of a VisibilityWorker never mix
+    with the stages of the frame, and the finished records are kept under a lock. A stage can
+    be timed by chaining its start:
+
+        start = perf_counter()
+        ...
+        start = stats.stage('sort', start)
+    """
+
+    # Instrumentação em uso, None quando desligada
+    active = None
+
+    def __init__(self, sink=None, history: int = 120):
+        self.sink = sink
+        self.records = deque(maxlen=history)
+        self.lock = threading.Lock()
+        # Registro em construção de cada thread
+        self.local = threading.local()
+
+    @staticmethod
+    def enable(sink=None, history: int = 120) -> Instrumentation:
+        """
+        Start recording into a new Instrumentation and return it.
+        """
+        Instrumentation.active = Instrumentation(sink, history)
+        return Instrumentation.active
+
+    @staticmethod
+    def disable():
+        Instrumentation.active = None
+
+    @property
+    def timings(self) -> dict:
+        """Stage timings of the record the calling thread is building."""
+        try:
+            return self.local.timings
+        except AttributeError:
+            self.local.timings = {}
+            return self.local.timings
+
+    @property
+    def counters(self) -> dict:
+        """Counters of the record the calling thread is building."""
+        try:
+            return self.local.counters
+        except AttributeError:
+            self.local.counters = {}
+            return self.local.counters
+
+    def stage(self, name: str, start: float) -> float:
+        """
+        Add the time since start to the stage and return the current time, the start of the
+        next stage.
+        """
+        now = perf_counter()
+        timings = self.timings
+        timings[name] = timings.get(name, 0.0) + now - start
+        return now
+
+    def count(self, name: str, value: int = 1):
+        counters = self.counters
+        counters[name] = counters.get(name, 0) + value
+
+    def peak(self, name: str, value: int):
+        counters = self.counters
+        if value > counters.get(name, 0):
+            counters[name] = value
+
+    def flush(self, run: str) -> dict:
+        """
+        Close the record of the current run of the calling thread and send it to the sink.
+        """
+        record = {'run': run, 'timings': self.timings, 'counters': self.counters}
+        self.local.timings = {}
+        self.local.counters = {}
+        with self.lock:
+            self.records.append(record)
+            if self.sink is not None:
+                self.sink(record)
+        return record
+
+    def summary(self, run: str = None) -> dict:
+        """
+        Mean timings and counters of the recorded runs, or of the runs with the given name.
+        """
+        with self.lock:
+            records = [record for record in self.records if run is None or record['run'] == run]
+        timings = {}
+        counters = {}
+        for record in records:
+            for name, seconds in record['timings'].items():
+                timings[name] = timings.get(name, 0.0) + seconds / len(records)
+            for name, value in record['counters'].items():
+                counters[name] = counters.get(name, 0) + value / len(records)
+        return {'runs': len(records), 'timings': timings, 'counters': counters}
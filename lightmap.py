@@ -0,0 +1,192 @@
+from __future__ import annotations
+import numpy as np
+
+
+class Light:
+    """
+    Point light with a colour, an intensity and the radius where its falloff reaches zero.
+    """
+
+    __slots__ = ('position', 'color', 'intensity', 'radius')
+
+    def __init__(self, position: tuple[float, float], color=(255, 255, 255), intensity: float = 1.0, radius: float = 200.0):
+        self.position = position
+        self.color = color
+        self.intensity = intensity
+        self.radius = radius
+
+
+class Lightmap:
+    """
+    Accumulated light of many lights over the screen, kept as a float32 (height, width, 3)
+    array.
+
+    Each light only touches the pixels of the bounding box of its visibility triangles,
+    clipped to the square around it of side 2 * radius. Its triangles are scan converted there
+    all at once: the crossings of their sides with the rows of pixel centres are counted in a
+    grid, and a cumulative sum along the rows gives, for each pixel, how many sides lie to its
+    left, odd inside a triangle and even outside. The light reaching each pixel is added to the
+    buffer with the falloff (1 - d² / r²)², read from a tile computed once per radius and
+    position of the light inside its pixel, so a light moving by whole pixels computes no
+    distance at all. The cost of a light is a few array operations over its box, with no draw
+    call per triangle, and clear and to_rgb take an area so only the lit part of the screen is
+    cleared and converted.
+    """
+
+    # Tiles de queda guardados, cada um ocupa até 4 * (2 * largura + 1) * (2 * altura + 1) bytes
+    falloff_capacity = 8
+
+    def __init__(self, size: tuple[int, int], ambient=(0, 0, 0)):
+        self.size = tuple(size)
+        self.ambient = np.array(ambient, dtype=np.float32)
+        self.buffer = np.empty((self.size[1], self.size[0], 3), dtype=np.float32)
+
+        # Centros dos pixels, compartilhados por todas as luzes
+        self.xs = np.arange(self.size[0], dtype=np.float32) + 0.5
+        self.ys = np.arange(self.size[1], dtype=np.float32) + 0.5
+        self.falloffs = {}
+        self.clear()
+
+    def clear(self, area: tuple[int, int, int, int] = None):
+        """
+        Reset the buffer to the ambient light, only inside the area (left, top, width, height)
+        if it is given.
+        """
+        buffer = self.buffer
+        if area is not None:
+            left, top, width, height = area
+            buffer = buffer[top:top + height, left:left + width]
+
+        # Preencher com um escalar é bem mais rápido que repetir o vetor da cor ambiente
+        for channel, value in enumerate(self.ambient.tolist()):
+            buffer[:, :, channel] = value
+
+    def falloff(self, radius: float, x: float, y: float, area: tuple[int, int, int, int]) -> np.ndarray:
+        """
+        Falloff (1 - d² / r²)² of a light at (x, y) over the area (left, top, width, height).
+
+        For lights on the screen it is cut from a tile around the pixel of the light, that only
+        depends on the radius and on the position of the light inside its pixel and is kept
+        for the next calls. The tile is cut to the size of the screen, so lights outside it
+        get the falloff of the area computed directly.
+        """
+        left, top, width, height = area
+        column, row = int(np.floor(x)), int(np.floor(y))
+        fx, fy = x - column, y - row
+
+        if not (0 <= column < self.size[0] and 0 <= row < self.size[1]):
+            dx = self.xs[left:left + width] - np.float32(x)
+            dy = self.ys[top:top + height] - np.float32(y)
+            return self.falloff_tile(radius, dx, dy)
+
+        key = (radius, fx, fy)
+        tile = self.falloffs.get(key)
+        if tile is None:
+            reach_x = min(int(np.ceil(radius)), self.size[0])
+            reach_y = min(int(np.ceil(radius)), self.size[1])
+            dx = np.arange(-reach_x, reach_x + 1, dtype=np.float32) + np.float32(0.5 - fx)
+            dy = np.arange(-reach_y, reach_y + 1, dtype=np.float32) + np.float32(0.5 - fy)
+            tile = self.falloff_tile(radius, dx, dy)
+
+            if len(self.falloffs) >= self.falloff_capacity:
+                self.falloffs.clear()
+            self.falloffs[key] = tile
+
+        # Pixel da tela no canto superior esquerdo do tile
+        tile_left = column - tile.shape[1] // 2
+        tile_top = row - tile.shape[0] // 2
+        return tile[top - tile_top:top - tile_top + height, left - tile_left:left - tile_left + width]
+
+    @staticmethod
+    def falloff_tile(radius: float, dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+        """
+        Falloff at the offsets dx of the columns and dy of the rows from the light.
+        """
+        tile = np.maximum(1 - (dy[:, None] ** 2 + dx[None, :] ** 2) / np.float32(radius * radius), 0)
+        tile *= tile
+        return tile
+
+    @staticmethod
+    def rasterize(triangles: list, left: int, top: int, width: int, height: int) -> np.ndarray:
+        """
+        Mask of the pixels of the window whose centres are inside the triangles, as a
+        (height, width) boolean array. The triangles must not overlap, like the fan of a
+        visibility region.
+        """
+        points = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 2)
+        sides = np.concatenate((points[:, [0, 1]], points[:, [1, 2]], points[:, [2, 0]])).reshape(-1, 4)
+        x0, y0, x1, y1 = sides.T
+
+        # Linhas cujos centros y + 0.5 estão em [min(y0, y1), max(y0, y1)), horizontais não cruzam nenhuma
+        first = np.clip(np.ceil(np.minimum(y0, y1) - top - 0.5), 0, height).astype(np.int64)
+        last = np.clip(np.ceil(np.maximum(y0, y1) - top - 0.5), 0, height).astype(np.int64)
+        counts = last - first
+        side = np.repeat(np.arange(len(sides)), counts)
+        rows = np.arange(len(side)) - np.repeat(np.cumsum(counts) - counts, counts) + first[side]
+
+        # Cada cruzamento inverte os pixels cujos centros ficam à sua direita
+        y = rows + top + 0.5
+        x = x0[side] + (y - y0[side]) * (x1[side] - x0[side]) / (y1[side] - y0[side])
+        columns = np.clip(np.ceil(x - left - 0.5), 0, width).astype(np.int64)
+
+        # A paridade sobrevive ao estouro de uint8, que soma bem mais rápido que int64
+        crossings = np.bincount(rows * (width + 1) + columns, minlength=height * (width + 1)).astype(np.uint8)
+        inside = np.cumsum(crossings.reshape(height, width + 1), axis=1, dtype=np.uint8)[:, :width]
+        inside &= 1
+        return inside.view(bool)
+
+    def add(self, light: Light, triangles: list) -> tuple[int, int, int, int] | None:
+        """
+        Add the light, seen through its visibility triangles, to the buffer.
+
+        Returns the area it touched as (left, top, width, height), or None if it is outside
+        the screen.
+        """
+        x, y = light.position
+        radius = light.radius
+        if not triangles:
+            return None
+
+        # Caixa dos triângulos, recortada pelo quadrado da luz e pela tela
+        points = np.asarray(triangles, dtype=np.float64).reshape(-1, 2)
+        low = points.min(axis=0)
+        high = points.max(axis=0)
+        left = max(0, int(x - radius), int(np.floor(low[0])))
+        top = max(0, int(y - radius), int(np.floor(low[1])))
+        right = min(self.size[0], int(x + radius) + 1, int(np.ceil(high[0])))
+        bottom = min(self.size[1], int(y + radius) + 1, int(np.ceil(high[1])))
+        if left >= right or top >= bottom:
+            return None
+
+        area = (left, top, right - left, bottom - top)
+        weight = self.falloff(radius, x, y, area) * np.float32(light.intensity)
+        weight *= self.rasterize(points, *area)
+
+        # Um canal por vez evita o temporário (altura, largura, 3)
+        region = self.buffer[top:bottom, left:right]
+        for channel, value in enumerate(light.color):
+            if value:
+                region[:, :, channel] += weight * np.float32(value)
+        return area
+
+    def composite(self, lights: list[Light], visibility) -> np.ndarray:
+        """
+        Clear the buffer and add the lights. `visibility` is called with each light and
+        returns its visibility triangles, such as LineOfSight.build_visibility_triangles
+        with the light radius as max_radius.
+        """
+        self.clear()
+        for light in lights:
+            self.add(light, visibility(light))
+        return self.buffer
+
+    def to_rgb(self, area: tuple[int, int, int, int] = None) -> np.ndarray:
+        """
+        The buffer clipped to bytes, as a (width, height, 3) array in the layout of
+        pygame.surfarray, only inside the area (left, top, width, height) if it is given.
+        """
+        buffer = self.buffer
+        if area is not None:
+            left, top, width, height = area
+            buffer = buffer[top:top + height, left:left + width]
+        return np.minimum(buffer, 255).astype(np.uint8).transpose(1, 0, 2)
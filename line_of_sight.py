@@ -1,7 +1,13 @@
 from __future__ import annotations
-from math import atan2, sqrt
-from edge import Edge
+from math import atan2, cos, pi, sin, sqrt
+from time import perf_counter
+from edge import Edge, EdgeBuffer
+from edge_grid import EdgeGrid
 from functools import cmp_to_key
+from instrumentation import Instrumentation
+from occluders import Occluders
+from polymap import Polymap
+from visibility_region import VisibilityRegion
 
 
 class LineOfSight:
@@ -26,6 +32,28 @@ class LineOfSight:
         angle = -atan2(target[1] - source[1], target[0] - source[0])
         return angle
     
+    @staticmethod
+    def pseudo_angle(source: tuple[int, int], target: tuple[int, int]) -> float:
+        """
+        Sort key in [0, 4) that orders points around the source like angle, without trigonometry.
+
+        The position of the direction on the diamond |x| + |y| = 1 grows with the angle, and
+        collinear points get the same key since the division is exactly rounded.
+        """
+        dx = target[0] - source[0]
+        dy = target[1] - source[1]
+        if dx == 0 and dy == 0:
+            return 2.0
+
+        # Posição no losango, de 0 (+x) até 4 no sentido anti-horário
+        if dy >= 0:
+            turn = 1 - dx / (abs(dx) + dy)
+        else:
+            turn = 3 + dx / (abs(dx) - dy)
+
+        # angle começa em -pi e gira no sentido horário
+        return 2 - turn if turn <= 2 else 6 - turn
+
     @staticmethod
     def is_clockwise(p1: tuple[int, int], p2: tuple[int, int], p3: tuple[int, int]) -> bool:
         """
@@ -69,19 +97,55 @@ class LineOfSight:
         py = ((x1 * y2 - y1 * x2) * (y3 - y4) - (y1 - y2) * (x3 * y4 - y3 * x4)) / denom
 
         return (px, py) 
-    
+
+    @staticmethod
+    def axis_line_intersection(p1_start: tuple[int, int], p1_end: tuple[int, int],
+                               p2_start: tuple[int, int], p2_end: tuple[int, int]) -> tuple[float, float]:
+        """
+        line_intersection for a second line that is vertical or horizontal, like the walls
+        of a Polymap.
+
+        The coordinate along the wall is read from it and the other one takes a single
+        division, so the point is exact on the wall line. With integer coordinates every
+        product is exact and the result is the same as line_intersection.
+        """
+        x1, y1 = p1_start
+        x2, y2 = p1_end
+        x3, y3 = p2_start
+        x4, y4 = p2_end
+
+        if x3 == x4:
+            # Parede vertical, paralela ou degenerada quando o determinante é zero
+            if x1 == x2 or y3 == y4:
+                return None
+            return (x3, ((x1 * y2 - y1 * x2) + (y1 - y2) * x3) / (x1 - x2))
+
+        # Parede horizontal
+        if y1 == y2:
+            return None
+        return (((x1 * y2 - y1 * x2) - (x1 - x2) * y3) / (y2 - y1), y3)
+
     @staticmethod
     def build_triangle(source : tuple[int, int], old_vertex : tuple[int, int], current_vertex : tuple[int, int], closest_old_wall : Edge) -> (tuple[int, int, int]):
         """
         Build a visibility triangle from the source point to the current vertex.
         """
-        dist1 = LineOfSight.distance(source, old_vertex)
-        dist2 = LineOfSight.distance(source, current_vertex)
+        # Distâncias ao quadrado bastam para comparar, sem raiz
+        dist1 = (old_vertex[0] - source[0]) ** 2 + (old_vertex[1] - source[1]) ** 2
+        dist2 = (current_vertex[0] - source[0]) ** 2 + (current_vertex[1] - source[1]) ** 2
+
+        # Paredes alinhadas aos eixos têm a interseção em forma fechada
+        start = closest_old_wall.start
+        end = closest_old_wall.end
+        if start[0] == end[0] or start[1] == end[1]:
+            intersection = LineOfSight.axis_line_intersection
+        else:
+            intersection = LineOfSight.line_intersection
 
         closest_vertex = old_vertex if dist1 < dist2 else current_vertex
         far_vertex = current_vertex if dist1 < dist2 else old_vertex
-        close_hit_point = LineOfSight.line_intersection(source, closest_vertex, closest_old_wall.start, closest_old_wall.end)
-        far_hit_point = LineOfSight.line_intersection(source, far_vertex, closest_old_wall.start, closest_old_wall.end)
+        close_hit_point = intersection(source, closest_vertex, start, end)
+        far_hit_point = intersection(source, far_vertex, start, end)
 
         if not close_hit_point:
             close_hit_point = closest_vertex
@@ -92,77 +156,477 @@ class LineOfSight:
         return (source, far_hit_point, close_hit_point)
 
     @staticmethod
-    def build_visibility_triangles(walls: set[Edge], source: tuple[int, int], map_size: tuple[int, int]) -> list[tuple[int, int]]:
+    def vertex_adjacency(walls: list) -> dict:
+        """
+        Map every vertex of the (start, end) walls to its walls, as (EdgeBuffer.key, other
+        vertex) pairs, in the order the walls are given.
+        """
+        walls_per_vertex = {}
+        for start, end in walls:
+            wall = EdgeBuffer.key(start, end)
+            if start not in walls_per_vertex:
+                walls_per_vertex[start] = []
+            if end not in walls_per_vertex:
+                walls_per_vertex[end] = []
+
+            walls_per_vertex[start].append((wall, end))
+            walls_per_vertex[end].append((wall, start))
+
+        return walls_per_vertex
+
+    @staticmethod
+    def flipped_walls(walls: EdgeBuffer, height: int) -> list:
+        """
+        The walls as (start, end) tuples with the y axis inverted.
+        """
+        # Read straight from the buffer
+        x0, y0, x1, y1 = walls.x0, walls.y0, walls.x1, walls.y1
+        return [((x0[i], height - y0[i]), (x1[i], height - y1[i])) for i in range(len(x0))]
+
+    @staticmethod
+    def map_limits(map_size: tuple[int, int]) -> list:
+        """
+        The limits of the map as walls.
+        """
+        return [((0, 0), (0, map_size[1])),
+                ((0, map_size[1]), (map_size[0], map_size[1])),
+                ((map_size[0], map_size[1]), (map_size[0], 0)),
+                ((map_size[0], 0), (0, 0))]
+
+    @staticmethod
+    def polymap_adjacency(polymap: Polymap, map_size: tuple[int, int]) -> dict:
+        """
+        Vertex adjacency of the walls of the Polymap and the limits of the map, kept in the
+        Polymap and built again only when its geometry version changes.
+        """
+        if polymap.adjacency_version != polymap.version:
+            polymap.adjacency = {}
+            polymap.adjacency_version = polymap.version
+
+        map_size = tuple(map_size)
+        walls_per_vertex = polymap.adjacency.get(map_size)
+        if walls_per_vertex is None:
+            walls = polymap.edges if isinstance(polymap.edges, EdgeBuffer) else EdgeBuffer(polymap.edges)
+            walls = LineOfSight.flipped_walls(walls, map_size[1]) + LineOfSight.map_limits(map_size)
+            walls_per_vertex = LineOfSight.vertex_adjacency(walls)
+            polymap.adjacency[map_size] = walls_per_vertex
+
+        return walls_per_vertex
+
+    @staticmethod
+    def occluder_adjacency(occluders: Occluders, height: int) -> dict:
+        """
+        Vertex adjacency of the enabled occluders, with the y axis inverted, kept in the
+        Occluders and built again from them only when their version changes.
+        """
+        if occluders.adjacency_version != occluders.version:
+            occluders.adjacency = {}
+            occluders.adjacency_version = occluders.version
+
+        walls_per_vertex = occluders.adjacency.get(height)
+        if walls_per_vertex is None:
+            walls = [((start[0], height - start[1]), (end[0], height - end[1])) for start, end in occluders.sides()]
+            walls_per_vertex = LineOfSight.vertex_adjacency(walls)
+            occluders.adjacency[height] = walls_per_vertex
+
+        return walls_per_vertex
+
+    @staticmethod
+    def merge_adjacency(static: dict, dynamic: dict) -> dict:
+        """
+        Adjacency of both layers, without changing either. Only the vertices of the dynamic
+        layer get new lists, the others are shared with the static adjacency.
+        """
+        merged = dict(static)
+        for vertex, entries in dynamic.items():
+            current = merged.get(vertex)
+            if current is None:
+                merged[vertex] = entries
+            else:
+                # Uma parede que já está na camada estática não entra duas vezes
+                walls = {wall for wall, _ in current}
+                merged[vertex] = current + [entry for entry in entries if entry[0] not in walls]
+        return merged
+
+    @staticmethod
+    def sweep(source: tuple[int, int], events: list, first: int, last: int,
+              open_walls: dict, ahead: list, seq: int, old_vertex, emit) -> tuple:
+        """
+        Sweep the vertices events[first:last] keeping the open walls sorted along the ray.
+
+        Walls are (start, end) keys from EdgeBuffer.key. `ahead` holds the open walls from the
+        nearest to the farthest along the current ray, so the nearest wall is always ahead[0].
+        Walls that do not cross keep their order while both are open, so each wall is put in
+        place once, by a binary search with in_front, when its first vertex is reached.
+        `open_walls` maps every open wall to its insertion order. `emit` is called with
+        (old_vertex, vertex, old_nearest_wall) every time the nearest wall changes.
+
+        Returns the next insertion order, the last vertex where the nearest wall changed
+        and the index of that vertex.
+        """
+        last_change = -1
+        old_nearest_wall = ahead[0] if ahead else None
+        stats = Instrumentation.active
+
+        for index in range(first, last):
+            vertex, incident = events[index]
+
+            # Remove walls that end at the current vertex before adding the ones that start
+            # at it, so every wall compared with a new one crosses the ray past the vertex
+            for wall, is_end in incident:
+                if is_end and wall in open_walls:
+                    del open_walls[wall]
+                    ahead.remove(wall)
+            for wall, is_end in incident:
+                if not is_end and wall not in open_walls:
+                    open_walls[wall] = seq
+                    LineOfSight.insert_wall(ahead, wall, source, vertex)
+                    seq += 1
+
+            new_nearest_wall = ahead[0] if ahead else None
+            if stats is not None:
+                stats.peak('open_walls_peak', len(open_walls))
+
+            # If the nearest wall has changed, create a visibility triangle
+            if new_nearest_wall != old_nearest_wall:
+                if old_nearest_wall:
+                    emit(old_vertex, vertex, old_nearest_wall)
+                old_vertex = vertex
+                last_change = index
+            old_nearest_wall = new_nearest_wall
+
+        return seq, old_vertex, last_change
+
+    @staticmethod
+    def in_front(wall: tuple, other: tuple, source: tuple[int, int]) -> bool:
+        """
+        Check if the wall is nearer to the source than the other wall along the rays that
+        cross both. The walls must not cross each other.
+
+        One of two walls that do not cross lies entirely on one side of the line of the other,
+        and it is in front if that is the side of the source. Walls on a line through the
+        source are seen edge on and stay behind every other wall.
+        """
+        (ax, ay), (bx, by) = wall
+        (cx, cy), (dx, dy) = other
+        wall_x, wall_y = bx - ax, by - ay
+        other_x, other_y = dx - cx, dy - cy
+        wall_side = wall_x * (source[1] - ay) - wall_y * (source[0] - ax)
+        other_side = other_x * (source[1] - cy) - other_y * (source[0] - cx)
+        if wall_side == 0 or other_side == 0:
+            return wall_side != 0
+
+        # A parede inteira do lado da fonte na reta da outra fica na frente, do lado oposto fica atrás
+        a = (other_x * (ay - cy) - other_y * (ax - cx)) * other_side
+        b = (other_x * (by - cy) - other_y * (bx - cx)) * other_side
+        if a >= 0 and b >= 0 and (a > 0 or b > 0):
+            return True
+        if a <= 0 and b <= 0 and (a < 0 or b < 0):
+            return False
+
+        # Senão é a outra que fica de um lado só da reta desta
+        c = (wall_x * (cy - ay) - wall_y * (cx - ax)) * wall_side
+        d = (wall_x * (dy - ay) - wall_y * (dx - ax)) * wall_side
+        return c <= 0 and d <= 0 and (c < 0 or d < 0)
+
+    @staticmethod
+    def insert_wall(ahead: list, wall: tuple, source: tuple[int, int], vertex: tuple[int, int] = None):
+        """
+        Insert the wall in the open walls sorted along the ray, after the walls it ties with.
+
+        `vertex` is the end of the wall on the current ray, if it is on it. Each other wall
+        crosses that ray, so the wall is in front of it when the vertex is on the side of the
+        source of its line, and in_front is only needed when the vertex is on the line.
+        """
+        (ax, ay), (bx, by) = wall
+        sx, sy = source
+        if (bx - ax) * (sy - ay) - (by - ay) * (sx - ax) == 0:
+            # Vista de lado, fica atrás de todas
+            ahead.append(wall)
+            return
+
+        # Ponta da parede fora do raio
+        far = None if vertex is None else (bx, by) if vertex == (ax, ay) else (ax, ay)
+
+        low, high = 0, len(ahead)
+        while low < high:
+            middle = (low + high) // 2
+            other = ahead[middle]
+            front = None
+            if vertex is not None:
+                (cx, cy), (dx, dy) = other
+                dx -= cx
+                dy -= cy
+                side = dx * (sy - cy) - dy * (sx - cx)
+                if side:
+                    # Com o vértice na reta da outra, a outra ponta decide
+                    near = dx * (vertex[1] - cy) - dy * (vertex[0] - cx)
+                    if not near:
+                        near = dx * (far[1] - cy) - dy * (far[0] - cx)
+                    if near:
+                        front = (near > 0) == (side > 0)
+            if front is None:
+                front = LineOfSight.in_front(wall, other, source)
+
+            if front:
+                high = middle
+            else:
+                low = middle + 1
+        ahead.insert(low, wall)
+
+    @staticmethod
+    def clip_to_circle(wall: Edge, center: tuple[int, int], radius: float) -> Edge:
+        """
+        Clip the wall to the inside of the circle. Returns None if no part of it is inside.
+        """
+        sx, sy = wall.start
+        dx = wall.end[0] - sx
+        dy = wall.end[1] - sy
+        fx = sx - center[0]
+        fy = sy - center[1]
+
+        # Solve |start + t * (end - start) - center| = radius
+        a = dx * dx + dy * dy
+        b = 2 * (fx * dx + fy * dy)
+        c = fx * fx + fy * fy - radius * radius
+        if a == 0:
+            return wall if c <= 0 else None
+
+        discriminant = b * b - 4 * a * c
+        if discriminant <= 0:
+            return None
+
+        root = sqrt(discriminant)
+        t0 = max(0, (-b - root) / (2 * a))
+        t1 = min(1, (-b + root) / (2 * a))
+        if t0 >= t1:
+            return None
+        if t0 == 0 and t1 == 1:
+            return wall
+
+        start = (sx + t0 * dx, sy + t0 * dy) if t0 > 0 else wall.start
+        end = (sx + t1 * dx, sy + t1 * dy) if t1 < 1 else wall.end
+        return Edge(start, end)
+
+    @staticmethod
+    def light_boundary(source: tuple[int, int], max_radius: float, map_size: tuple[int, int], sides: int = 32) -> list[tuple[float, float]]:
+        """
+        Polygon around the circle of the light, clipped to the map.
+
+        The polygon is circumscribed, so every wall clipped to the circle lies inside it and
+        the light reaches the whole circle. Between its vertices it reaches a little beyond
+        max_radius, at most max_radius * (1 / cos(pi / sides) - 1), about 0.5% with 32 sides.
+        """
+        # Circumscribed polygon, so the whole circle is inside it
+        radius = max_radius / cos(pi / sides)
+        polygon = [(source[0] + radius * cos(2 * pi * i / sides), source[1] + radius * sin(2 * pi * i / sides)) for i in range(sides)]
+
+        # Clip against each side of the map (Sutherland-Hodgman)
+        for axis, limit, inside in ((0, 0, 1), (0, map_size[0], -1), (1, 0, 1), (1, map_size[1], -1)):
+            clipped = []
+            for i in range(len(polygon)):
+                p1 = polygon[i - 1]
+                p2 = polygon[i]
+                in1 = (p1[axis] - limit) * inside >= 0
+                in2 = (p2[axis] - limit) * inside >= 0
+                if in1 != in2:
+                    t = (limit - p1[axis]) / (p2[axis] - p1[axis])
+                    point = [p1[0] + t * (p2[0] - p1[0]), p1[1] + t * (p2[1] - p1[1])]
+                    point[axis] = limit
+                    clipped.append(tuple(point))
+                if in2:
+                    clipped.append(p2)
+            polygon = clipped
+
+        return polygon
+
+    @staticmethod
+    def build_visibility_triangles(walls: Polymap | EdgeBuffer | set[Edge], source: tuple[int, int], map_size: tuple[int, int], max_radius: float = None,
+                                   occluders: Occluders = None) -> list[tuple[int, int]]:
         """
         Build the visibility polygon from the source point.
+
+        With max_radius only the walls within that distance of the source are considered and
+        the polygon is clipped to the circle of the light. The circle is approximated by the
+        polygon of light_boundary, which contains it, so where no wall is closer the
+        triangles reach up to about 0.5% beyond max_radius. Lights whose falloff reaches zero
+        at max_radius, like Lightmap, add nothing there. If walls is an EdgeGrid it is used
+        to find them without visiting every wall. A Polymap gives its cached vertex adjacency,
+        or its EdgeGrid with max_radius. An EdgeBuffer is read directly, any other collection
+        of edges is first packed into one.
+
+        The enabled occluders, if given, block the light like the walls. With a Polymap their
+        cached adjacency is merged with the cached adjacency of the map, so changing them
+        never rebuilds anything derived from the Polymap.
+
+        While an Instrumentation is active, the time of each stage and the counters of the
+        call are recorded in one 'build_visibility_triangles' record.
         """
+        stats = Instrumentation.active
+        if stats is not None:
+            start = perf_counter()
+
+        if isinstance(walls, Polymap):
+            walls = walls if max_radius is None else walls.edge_grid
+
+        if occluders is not None and not isinstance(walls, Polymap):
+            if isinstance(walls, EdgeGrid) and max_radius is not None:
+                walls = walls.query(source, max_radius)
+            walls = list(walls) + occluders.walls()
+
+        if max_radius is not None:
+            if isinstance(walls, EdgeGrid):
+                walls = walls.query(source, max_radius)
+            walls = [LineOfSight.clip_to_circle(wall, source, max_radius) for wall in walls]
+            walls = [wall for wall in walls if wall is not None]
+            if stats is not None:
+                start = stats.stage('clip', start)
+
         ##### pygame stuff #######
         # Invert the y-coordinate of the source point
-        source = (source[0], map_size[1] - source[1]) 
-        # invert the y-coordinate of the walls
-        walls = [Edge((wall.start[0], map_size[1] - wall.start[1]), (wall.end[0], map_size[1] - wall.end[1])) for wall in walls]
+        height = map_size[1]
+        source = (source[0], height - source[1])
         ##### pygame stuff #######
 
-        # Add the limits of the map as walls
-        limits = [Edge((0, 0), (0, map_size[1])),
-                Edge((0, map_size[1]), (map_size[0], map_size[1])),
-                Edge((map_size[0], map_size[1]), (map_size[0], 0)),
-                Edge((map_size[0], 0), (0, 0))]
-        
-        # Combine walls with map limits
-        walls = walls + limits 
+        if isinstance(walls, Polymap):
+            walls_per_vertex = LineOfSight.polymap_adjacency(walls, map_size)
+            if occluders is not None:
+                walls_per_vertex = LineOfSight.merge_adjacency(walls_per_vertex, LineOfSight.occluder_adjacency(occluders, height))
+        else:
+            if not isinstance(walls, EdgeBuffer):
+                walls = EdgeBuffer(walls)
+
+            # invert the y-coordinate of the walls
+            walls = LineOfSight.flipped_walls(walls, height)
+            if stats is not None:
+                start = stats.stage('flip', start)
+
+            # Add the limits of the map as walls
+            if max_radius is None:
+                limits = LineOfSight.map_limits(map_size)
+            else:
+                # The circle of the light inside the map is the limit
+                boundary = LineOfSight.light_boundary(source, max_radius, map_size)
+                limits = [(boundary[i - 1], boundary[i]) for i in range(len(boundary))]
+
+            # Combine walls with map limits
+            walls = walls + limits
+            walls_per_vertex = LineOfSight.vertex_adjacency(walls)
+
+        if stats is not None:
+            start = stats.stage('adjacency', start)
 
-        # Create a dictionary with the vertices of the walls
-        walls_per_vertex = {}
-        for wall in walls:
-            if wall.start not in walls_per_vertex:
-                walls_per_vertex[wall.start] = []
-            if wall.end not in walls_per_vertex:
-                walls_per_vertex[wall.end] = []
-
-            walls_per_vertex[wall.start].append(wall)
-            walls_per_vertex[wall.end].append(wall)
-        
         # Sort the vertices by angle from the source
-        walls_per_vertex = dict(sorted(walls_per_vertex.items(), key=lambda x: LineOfSight.angle(source, x[0])))
+        vertices = sorted(walls_per_vertex, key=lambda vertex: LineOfSight.pseudo_angle(source, vertex))
+        if stats is not None:
+            start = stats.stage('sort', start)
+
+        # Each event is a vertex with its walls and whether the wall ends there
+        events = [(vertex, [(wall, LineOfSight.is_clockwise(source, other, vertex)) for wall, other in walls_per_vertex[vertex]])
+                  for vertex in vertices]
+        if stats is not None:
+            stats.stage('events', start)
+
+        return LineOfSight.sweep_events(source, events, map_size)
+
+    @staticmethod
+    def sweep_events(source: tuple[int, int], events: list, map_size: tuple[int, int]) -> list[tuple[int, int]]:
+        """
+        Build the visibility triangles from the events sorted by angle around the source,
+        both with the y axis inverted. The triangles are returned in screen coordinates.
+
+        While an Instrumentation is active, this closes the 'build_visibility_triangles'
+        record. The build_triangle stage runs inside the sweep stage.
+        """
+        stats = Instrumentation.active
+        if stats is not None:
+            start = perf_counter()
+            stats.count('vertices', len(events))
+            stats.count('events', sum(len(incident) for _, incident in events))
+
+        # The sweep starts with the walls that are still open after a full turn, which are the
+        # walls crossing the first ray and the ones that are never closed. Only the membership is
+        # needed to find them, so no distances are computed here.
+        open_walls = {}
+        seq = 0
+        for vertex, incident in events:
+            for wall, is_end in incident:
+                if wall not in open_walls:
+                    if not is_end:
+                        open_walls[wall] = seq
+                        seq += 1
+                elif is_end:
+                    del open_walls[wall]
 
-        # Initialize the open list of walls and the final polygon points
-        open_walls = []
+        primed = seq
+        ahead = []
+        for wall in open_walls:
+            LineOfSight.insert_wall(ahead, wall, source)
+
+        # The sweep agrees with a sweep started from an empty set once the last primed wall is
+        # closed. Walls collinear with the source are never closed and, having been opened in
+        # the previous turn, they tie in a different order, so with them the whole previous
+        # turn has to be replayed.
+        settled = -1
+        closed = set()
+        for index, (vertex, incident) in enumerate(events):
+            for wall, is_end in incident:
+                if is_end and open_walls.get(wall, primed) < primed:
+                    settled = index
+                    closed.add(wall)
+        if len(closed) < len(open_walls):
+            settled = len(events) - 1
+
+        if stats is not None:
+            stats.count('primed_walls', len(open_walls))
+            start = stats.stage('prime', start)
+
+        # Sweep a full turn, the first triangle is only known once the turn is complete
         polygon = []
-        old_vertex = None
-
-        #the first pass is only to find the first wall and the last wall
-        for passes in range(2):
-            # Iterate over vertices sorted by angle
-            for vertex in walls_per_vertex.keys():
-                # get the old closest wall
-                old_nearest_wall = open_walls[0] if open_walls else None
-
-                # Add walls that start at the current vertex and remove wall that end at this vertex
-                for wall in walls_per_vertex[vertex]:
-                    if wall not in open_walls and not LineOfSight.is_end_point(vertex, wall, source):
-                        open_walls.append(wall)
-                    if wall in open_walls and LineOfSight.is_end_point(vertex, wall, source):
-                        open_walls.remove(wall)
-
-                # Find the new closest wall
-                open_walls.sort(key=lambda x: x.distance(source))
-                new_nearest_wall = open_walls[0] if open_walls else None
-                
-                # If the nearest wall has changed, create a visibility triangle
-                if new_nearest_wall != old_nearest_wall:
-                    if old_nearest_wall and passes == 1:
-                        triangle = LineOfSight.build_triangle(source, old_vertex, vertex, old_nearest_wall)
-                        polygon.append(triangle)
-                    old_vertex = vertex
+        first = []
+
+        def emit(old_vertex, vertex, old_nearest_wall):
+            if old_vertex is None:
+                first.append((vertex, old_nearest_wall))
+            elif stats is None:
+                polygon.append(LineOfSight.build_triangle(source, old_vertex, vertex, Edge(*old_nearest_wall)))
+            else:
+                begin = perf_counter()
+                polygon.append(LineOfSight.build_triangle(source, old_vertex, vertex, Edge(*old_nearest_wall)))
+                stats.stage('build_triangle', begin)
+
+        seq, old_vertex, last_change = LineOfSight.sweep(source, events, 0, len(events), open_walls, ahead, seq, None, emit)
+        if stats is not None:
+            start = stats.stage('sweep', start)
+
+        if first:
+            # The first triangle starts at the last change of the previous turn. After the
+            # settled vertex both turns agree, otherwise replay the start of a turn from an
+            # empty set to find it.
+            if last_change <= settled:
+                _, old_vertex, _ = LineOfSight.sweep(source, events, 0, settled + 1, {}, [], 0, None, lambda *args: None)
+            vertex, old_nearest_wall = first[0]
+            polygon.insert(0, LineOfSight.build_triangle(source, old_vertex, vertex, Edge(*old_nearest_wall)))
+            if stats is not None:
+                start = stats.stage('first_triangle', start)
 
         ###### pygame stuff ######
         #invert the y-coordinate of the polygon
         polygon = [[(point[0], map_size[1] - point[1]) for point in triangle] for triangle in polygon]
         ###### pygame stuff ######
 
-        return polygon
-
+        if stats is not None:
+            stats.stage('flip_back', start)
+            stats.count('triangles', len(polygon))
+            stats.flush('build_visibility_triangles')
 
-            
+        return polygon
 
+    @staticmethod
+    def build_visibility_region(walls: Polymap | EdgeBuffer | set[Edge], source: tuple[int, int], map_size: tuple[int, int], max_radius: float = None,
+                                occluders: Occluders = None) -> VisibilityRegion:
+        """
+        Build the visibility triangles from the source as a VisibilityRegion, to test which
+        points are seen from it. The region can be drawn like the list of triangles.
+        """
+        return VisibilityRegion(source, LineOfSight.build_visibility_triangles(walls, source, map_size, max_radius, occluders))
@@ -1,34 +1,48 @@
 import pygame
 import sys
 from polymap import Polymap
-from line_of_sight import LineOfSight
-
-# Inicializando o Pygame
-pygame.init()
+from instrumentation import Instrumentation
+from occluders import Occluders
+from render import LayeredRenderer, StatsOverlay, draw_filled_tiles, draw_occluders, draw_polymap, draw_visibility
+from time import perf_counter
+from visibility_cache import VisibilityCache
+from visibility_worker import VisibilityWorker
 
 # Dimensões da janela e grid
 screen_width, screen_height = 800, 600
 tile_size = 40  # Tamanho dos tiles
 n = screen_width // tile_size  # Número de tiles por linha
 
-# Configurando a tela
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption('shadows casting demo')
+# A tela é criada em main(), importar este módulo não abre a janela
+screen = None
 
 # Cores
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 GRAY = (100, 100, 100)
 RED = (255, 0, 0)
+BROWN = (150, 100, 50)
 
 # Variáveis de controle
-tiles = []  # Lista de tiles
 ball_radius = 10
 ball_pos = [screen_width // 2, screen_height // 2]  # Posição inicial da bola
 ball_dragging = False  # Se a bola está sendo arrastada
-polymap = Polymap()
+polymap = Polymap((n, screen_height // tile_size), tile_size)  # Os tiles ficam no grid do Polymap
+# Sem contornos traçados cada clique só corrige os 4 lados do tile, em O(1). Contornos traçados
+# juntam os lados colineares e deixam a varredura com menos paredes, mas cada edição traça o mapa inteiro de novo
+polymap.update(trace_contours=False)
+
+# Porta que bloqueia a luz sem fazer parte do Polymap, a tecla D abre e fecha
+occluders = Occluders()
+occluders.add_segment('door', (14 * tile_size, 5 * tile_size), (14 * tile_size, 10 * tile_size))
+visibility_cache = VisibilityCache(polymap, (screen_width, screen_height), occluders=occluders)
 visibility_polygon = []
 
+# Luz da bola, uma só e sem queda, então o polígono chapado basta. Com um raio o renderer
+# compõe a luz num Lightmap, que só vale a pena com várias luzes ou com queda
+light_color = (255, 240, 180)
+light_radius = None
+
 # Função para desenhar o grid
 def draw_grid():
     for x in range(0, screen_width, tile_size):
@@ -39,25 +53,16 @@ def draw_grid():
 # Função para adicionar um tile ao clicar
 def add_tile(pos):
     x, y = pos
-    grid_x = (x // tile_size) * tile_size
-    grid_y = (y // tile_size) * tile_size
-    tile_rect = pygame.Rect(grid_x, grid_y, tile_size, tile_size)
-    if tile_rect not in tiles:
-        tiles.append(tile_rect)
-    polymap.update(tiles)
+    polymap.add_tile(x // tile_size, y // tile_size)
 
 # Função para desenhar os tiles
-def draw_tiles():
-    global tiles
-    for tile in tiles:
-        pygame.draw.rect(screen, GRAY, tile)
-
-    polymap.draw(tiles, screen, RED)
-    visibility_triangles = LineOfSight.build_visibility_triangles(polymap.edges, ball_pos, (screen_width, screen_height))
-    if visibility_triangles:
-        for triangle in visibility_triangles:
-            #pygame.draw.lines(screen, RED, True, triangle)
-            pygame.draw.polygon(screen, (255, 240, 180), triangle)
+def draw_tiles(visibility_triangles=None):
+    draw_filled_tiles(screen, polymap, GRAY)
+    draw_polymap(polymap, screen, RED)
+    if visibility_triangles is None:
+        visibility_triangles = visibility_cache.build_visibility_triangles(ball_pos)
+    draw_visibility(screen, visibility_triangles, light_color)
+    draw_occluders(screen, occluders, BROWN)
 
         
 
@@ -70,6 +75,11 @@ def threat_exit(event):
         event.quit()
         sys.exit()
 
+def threat_keys(event):
+    # A tecla D abre ou fecha a porta
+    if event.type == pygame.KEYDOWN and event.key == pygame.K_d:
+        occluders.toggle('door')
+
 def threat_mouse(event):
     global ball_dragging, ball_pos
 
@@ -92,18 +102,73 @@ def threat_mouse(event):
 
     
 
-# Loop principal do jogo
-running = True
-while running:
-    for event in pygame.event.get():
-        threat_exit(event)
-        threat_mouse(event)
-
-    # Desenha o cenário
-    screen.fill(BLACK)
-    draw_tiles()
-    draw_ball()
-    draw_grid()
-
-    pygame.display.flip()
-    pygame.time.Clock().tick(60)
+def main(dirty_rendering=True, show_stats=False, background_visibility=False):
+    """
+    Run the demo. With dirty_rendering the scene is drawn from cached layers and only the
+    changed area is sent to the display, otherwise every frame is redrawn from scratch.
+    With show_stats the timings of the visibility stages and of the frames are recorded and
+    shown over the scene. With background_visibility the light is computed by a
+    VisibilityWorker and each frame draws its latest result, so the loop never waits for it.
+    """
+    global screen
+
+    # Inicializando o Pygame e configurando a tela
+    pygame.init()
+    screen = pygame.display.set_mode((screen_width, screen_height))
+    pygame.display.set_caption('shadows casting demo')
+
+    renderer = LayeredRenderer(screen, tile_size, BLACK, GRAY, RED, GRAY, light_color, RED, light_radius, BROWN)
+    clock = pygame.time.Clock()
+
+    # Estatísticas do pipeline de visibilidade, desligadas por padrão
+    stats = Instrumentation.enable() if show_stats else None
+    overlay = StatsOverlay(WHITE, BLACK) if show_stats else None
+
+    # A luz pode ficar alguns quadros atrás da bola enquanto o worker calcula
+    worker = VisibilityWorker((screen_width, screen_height)) if background_visibility else None
+
+    # Loop principal do jogo
+    running = True
+    while running:
+        for event in pygame.event.get():
+            threat_exit(event)
+            threat_mouse(event)
+            threat_keys(event)
+
+        if stats is not None:
+            start = perf_counter()
+
+        visibility = visibility_cache.build_visibility_triangles
+        result_key = None
+        triangles = None
+        if worker is not None:
+            worker.submit(polymap, ball_pos, occluders)
+            result = worker.latest()
+            result_key, triangles = result if result is not None else (None, [])
+            visibility = lambda source: triangles
+
+        if dirty_rendering:
+            dirty_rects = renderer.render(polymap, ball_pos, ball_radius, visibility, result_key, occluders)
+            if overlay is not None:
+                stats.stage('draw', start)
+                stats.flush('frame')
+                dirty_rects.append(overlay.draw(screen, stats))
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+        else:
+            # Desenha o cenário
+            screen.fill(BLACK)
+            draw_tiles(triangles)
+            draw_ball()
+            draw_grid()
+            if overlay is not None:
+                stats.stage('draw', start)
+                stats.flush('frame')
+                overlay.draw(screen, stats)
+
+            pygame.display.flip()
+
+        clock.tick(60)
+
+if __name__ == '__main__':
+    main(show_stats='--stats' in sys.argv, background_visibility='--background' in sys.argv)
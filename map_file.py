@@ -0,0 +1,170 @@
+"""
+Formato binário de mapas, lido com mmap.
+
+Layout, little-endian, com cada seção alinhada em 8 bytes:
+
+    cabeçalho   magic, versão do formato, flags, tile_size, largura e altura em tiles,
+                número de arestas, vértices, incidências e contornos, crc32 do conteúdo
+    ocupação    um bit por tile, em ordem de linhas
+    arestas     colunas float64 x0, y0, x1, y1, como no EdgeBuffer
+    vértices    pares float64 (x, y) com o eixo y invertido, na ordem do LineOfSight
+    offsets     uint32, início das paredes de cada vértice em incidências
+    incidências uint32, índice de cada parede, as arestas seguidas dos limites do mapa
+    contornos   uint32, início de cada contorno nas arestas, só com contornos traçados
+"""
+from __future__ import annotations
+import mmap
+import struct
+import zlib
+from array import array
+import numpy as np
+from edge import EdgeBuffer
+from line_of_sight import LineOfSight
+from polymap import Polymap
+
+
+class MapFile:
+    """
+    Save a Polymap with its tiles, edges and vertex adjacency, and load it back by mapping the
+    file in memory.
+
+    A loaded Polymap reads its edges straight from the mapped pages, so processes loading
+    the same file share them, and nothing is traced or converted again. The edges are only
+    copied if the map is edited afterwards, and only indexed in the EdgeGrid on its first use.
+    """
+
+    magic = b'SHMP'
+    format_version = 1
+    header = struct.Struct('<4sHHIIIIIIII')
+    header_size = 48
+
+    # Flags do cabeçalho
+    traced_contours = 1
+
+    @staticmethod
+    def padded(data: bytes) -> bytes:
+        return data + bytes(-len(data) % 8)
+
+    @staticmethod
+    def save(path: str, polymap: Polymap):
+        """
+        Write the Polymap to the file, with the size and tile size of its grid.
+        """
+        width, height = polymap.tiles.size
+        tile_size = polymap.tile_size
+        map_size = (width * tile_size, height * tile_size)
+
+        # Um bit por tile do grid inteiro, então toda aresta tem os seus tiles no arquivo
+        occupancy = np.packbits(polymap.tiles.cells, axis=None, bitorder='little')
+
+        edges = polymap.edges if isinstance(polymap.edges, EdgeBuffer) else EdgeBuffer(polymap.edges)
+
+        # Adjacência no formato do LineOfSight, com as paredes como índices
+        walls = LineOfSight.flipped_walls(edges, map_size[1]) + LineOfSight.map_limits(map_size)
+        index = {}
+        for i, (start, end) in enumerate(walls):
+            index.setdefault(EdgeBuffer.key(start, end), i)
+
+        walls_per_vertex = LineOfSight.polymap_adjacency(polymap, map_size)
+        vertices = array('d')
+        offsets = array('I', [0])
+        incident = array('I')
+        for vertex, entries in walls_per_vertex.items():
+            vertices.extend(vertex)
+            incident.extend(index[wall] for wall, _ in entries)
+            offsets.append(len(incident))
+
+        contours = array('I')
+        if polymap.trace_contours:
+            start = 0
+            for contour in polymap.contours:
+                contours.append(start)
+                start += len(contour)
+
+        sections = [occupancy.tobytes()] + [column.tobytes() for column in (edges.x0, edges.y0, edges.x1, edges.y1)]
+        sections += [vertices.tobytes(), offsets.tobytes(), incident.tobytes(), contours.tobytes()]
+        payload = b''.join(MapFile.padded(section) for section in sections)
+
+        flags = MapFile.traced_contours if polymap.trace_contours else 0
+        header = MapFile.header.pack(MapFile.magic, MapFile.format_version, flags, tile_size, width, height,
+                                     len(edges), len(vertices) // 2, len(incident), len(contours), zlib.crc32(payload))
+
+        with open(path, 'wb') as file:
+            file.write(header.ljust(MapFile.header_size, b'\0'))
+            file.write(payload)
+
+    @staticmethod
+    def load(path: str, verify: bool = True) -> tuple[Polymap, tuple[int, int], int]:
+        """
+        Map the file in memory and build its Polymap.
+
+        Returns the Polymap, the size of the map in tiles and the tile size. With verify the
+        checksum of the content is checked first. Raises ValueError for files that are not
+        maps of this format version or fail the checksum.
+        """
+        with open(path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(data) < MapFile.header_size:
+            raise ValueError(f'{path} is not a map file')
+
+        magic, version, flags, tile_size, width, height, edge_count, vertex_count, incident_count, contour_count, checksum = \
+            MapFile.header.unpack_from(data)
+        if magic != MapFile.magic:
+            raise ValueError(f'{path} is not a map file')
+        if version != MapFile.format_version:
+            raise ValueError(f'{path} has map format version {version}, expected {MapFile.format_version}')
+
+        view = memoryview(data)
+        if verify and zlib.crc32(view[MapFile.header_size:]) != checksum:
+            raise ValueError(f'{path} is corrupted, checksum mismatch')
+
+        # Fatias de cada seção, sem copiar nada
+        offset = MapFile.header_size
+
+        def section(count: int, item_size: int, kind: str):
+            nonlocal offset
+            size = count * item_size
+            block = view[offset:offset + size]
+            offset += size + (-size % 8)
+            return block.cast(kind) if kind != 'B' else block
+
+        occupancy = section((width * height + 7) // 8, 1, 'B')
+        columns = [section(edge_count, 8, 'd') for _ in range(4)]
+        vertices = section(2 * vertex_count, 8, 'd')
+        offsets = section(vertex_count + 1, 4, 'I')
+        incident = section(incident_count, 4, 'I')
+        contour_starts = section(contour_count, 4, 'I')
+
+        polymap = Polymap((width, height), tile_size)
+        bits = np.unpackbits(np.frombuffer(occupancy, dtype=np.uint8), count=width * height, bitorder='little')
+        polymap.tiles.cells[:] = bits.reshape(height, width).astype(bool)
+
+        polymap.trace_contours = bool(flags & MapFile.traced_contours)
+        polymap.edges = EdgeBuffer.wrap(*columns)
+        polymap.version += 1
+        polymap.edge_grid.defer(polymap.edges)
+
+        if polymap.trace_contours:
+            # Cada aresta termina no vértice seguinte do contorno
+            ends = list(contour_starts[1:]) + [edge_count]
+            polymap.contours = [[(columns[2][i], columns[3][i]) for i in range(start, end)]
+                                for start, end in zip(contour_starts, ends)]
+
+        # A adjacência salva vira o cache do LineOfSight para o tamanho do mapa
+        map_size = (width * tile_size, height * tile_size)
+        walls = LineOfSight.flipped_walls(polymap.edges, map_size[1]) + LineOfSight.map_limits(map_size)
+        keys = [EdgeBuffer.key(start, end) for start, end in walls]
+        walls_per_vertex = {}
+        for i in range(vertex_count):
+            vertex = (vertices[2 * i], vertices[2 * i + 1])
+            entries = []
+            for wall in incident[offsets[i]:offsets[i + 1]]:
+                start, end = walls[wall]
+                entries.append((keys[wall], end if start == vertex else start))
+            walls_per_vertex[vertex] = entries
+
+        polymap.adjacency = {map_size: walls_per_vertex}
+        polymap.adjacency_version = polymap.version
+
+        return polymap, (width, height), tile_size
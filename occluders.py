@@ -0,0 +1,120 @@
+from __future__ import annotations
+from edge import Edge
+
+
+class Occluders:
+    """
+    Dynamic layer of sight blockers over the static Polymap, such as doors, crates and
+    bodies, each one a segment or a closed polygon kept under an id.
+
+    Occluders can be switched off and on, like a door that opens, moved and removed without
+    touching the Polymap, so its edges, EdgeGrid and cached adjacency stay valid. Every change
+    bumps `version`. LineOfSight.build_visibility_triangles merges the enabled occluders with
+    the static walls at query time, and the vertex adjacency of this layer, kept in
+    `adjacency`, is built again from the occluders only, never from the whole map.
+
+    The occluders may touch the walls and each other but should not cross them, like the
+    walls of the Polymap.
+    """
+
+    def __init__(self):
+        # id -> lados (start, end) em coordenadas da tela
+        self.shapes = {}
+        self.disabled = set()
+        self.version = 0
+
+        # Vizinhança dos vértices por altura do mapa, montada pelo LineOfSight para a versão adjacency_version
+        self.adjacency = {}
+        self.adjacency_version = None
+
+    def __contains__(self, occluder_id) -> bool:
+        return occluder_id in self.shapes
+
+    def __len__(self) -> int:
+        return len(self.shapes)
+
+    def __bool__(self) -> bool:
+        return len(self.shapes) > len(self.disabled)
+
+    def snapshot(self) -> Occluders:
+        """
+        Copy of the occluders with the same version, that can be read by another thread while
+        this layer is edited.
+        """
+        copy = Occluders()
+        copy.shapes = {occluder_id: list(sides) for occluder_id, sides in self.shapes.items()}
+        copy.disabled = set(self.disabled)
+        copy.version = self.version
+        return copy
+
+    def add_segment(self, occluder_id, start: tuple[float, float], end: tuple[float, float], enabled: bool = True):
+        """
+        Add, or replace, the occluder with a single segment.
+        """
+        self.set_shape(occluder_id, [(tuple(start), tuple(end))], enabled)
+
+    def add_polygon(self, occluder_id, points: list[tuple[float, float]], enabled: bool = True):
+        """
+        Add, or replace, the occluder with the closed polygon through the points.
+        """
+        points = [tuple(point) for point in points]
+        self.set_shape(occluder_id, [(points[i - 1], points[i]) for i in range(len(points))], enabled)
+
+    def set_shape(self, occluder_id, sides: list, enabled: bool = True):
+        self.shapes[occluder_id] = sides
+        if enabled:
+            self.disabled.discard(occluder_id)
+        else:
+            self.disabled.add(occluder_id)
+        self.version += 1
+
+    def remove(self, occluder_id) -> bool:
+        """
+        Remove the occluder. Returns False if there was no occluder with this id.
+        """
+        if self.shapes.pop(occluder_id, None) is None:
+            return False
+        self.disabled.discard(occluder_id)
+        self.version += 1
+        return True
+
+    def move(self, occluder_id, dx: float, dy: float):
+        """
+        Move the occluder by (dx, dy). Raises KeyError for unknown ids.
+        """
+        self.shapes[occluder_id] = [((start[0] + dx, start[1] + dy), (end[0] + dx, end[1] + dy))
+                                    for start, end in self.shapes[occluder_id]]
+        self.version += 1
+
+    def set_enabled(self, occluder_id, enabled: bool):
+        """
+        Switch the occluder on or off, keeping its shape. Raises KeyError for unknown ids.
+        """
+        if occluder_id not in self.shapes:
+            raise KeyError(occluder_id)
+        if enabled == (occluder_id in self.disabled):
+            if enabled:
+                self.disabled.discard(occluder_id)
+            else:
+                self.disabled.add(occluder_id)
+            self.version += 1
+
+    def toggle(self, occluder_id) -> bool:
+        """
+        Switch the occluder, like a door opening or closing, and return whether it is on.
+        """
+        enabled = occluder_id in self.disabled
+        self.set_enabled(occluder_id, enabled)
+        return enabled
+
+    def is_enabled(self, occluder_id) -> bool:
+        return occluder_id in self.shapes and occluder_id not in self.disabled
+
+    def sides(self) -> list:
+        """
+        Sides of the enabled occluders as (start, end) tuples in screen coordinates.
+        """
+        return [side for occluder_id, sides in self.shapes.items() if occluder_id not in self.disabled for side in sides]
+
+    def walls(self) -> list[Edge]:
+        return [Edge(start, end) for start, end in self.sides()]
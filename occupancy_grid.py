@@ -0,0 +1,152 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class OccupancyGrid:
+    """
+    Filled tiles of a map of size (width, height) tiles, kept as a dense (height, width)
+    boolean array.
+
+    Checking, adding and removing a tile are O(1) and regions are filled or cleared with one
+    slice assignment. The exposed sides of every tile are found at once by comparing the grid
+    with itself shifted by one tile in each direction, with no Python loop over the tiles.
+    Tiles outside the grid are empty. It can be used as the set of (x, y) tiles of a Polymap:
+    it supports `in`, iteration, len, add and remove. NumPy is only imported when a grid is
+    created, so importing the module is cheap.
+    """
+
+    __slots__ = ('size', 'tile_size', 'cells')
+
+    def __init__(self, size: tuple[int, int], tile_size: int = 40):
+        import numpy as np
+        self.size = (int(size[0]), int(size[1]))
+        self.tile_size = tile_size
+        self.cells = np.zeros((self.size[1], self.size[0]), dtype=bool)
+
+    def __contains__(self, tile: tuple[int, int]) -> bool:
+        x, y = tile
+        return 0 <= x < self.size[0] and 0 <= y < self.size[1] and bool(self.cells[y, x])
+
+    def __iter__(self):
+        ys, xs = self.cells.nonzero()
+        return zip(xs.tolist(), ys.tolist())
+
+    def __len__(self) -> int:
+        return int(self.cells.sum())
+
+    def inside(self, x: int, y: int) -> bool:
+        return 0 <= x < self.size[0] and 0 <= y < self.size[1]
+
+    def add(self, tile: tuple[int, int]):
+        x, y = tile
+        if not self.inside(x, y):
+            raise IndexError(f'tile {tile} is outside the {self.size[0]}x{self.size[1]} grid')
+        self.cells[y, x] = True
+
+    def discard(self, tile: tuple[int, int]):
+        x, y = tile
+        if self.inside(x, y):
+            self.cells[y, x] = False
+
+    def remove(self, tile: tuple[int, int]):
+        if tile not in self:
+            raise KeyError(tile)
+        self.discard(tile)
+
+    def copy(self) -> OccupancyGrid:
+        grid = OccupancyGrid(self.size, self.tile_size)
+        grid.cells[:] = self.cells
+        return grid
+
+    def fill(self, x: int, y: int, width: int, height: int, filled: bool = True):
+        """
+        Fill, or clear, the tiles of the rectangle with top left tile (x, y), clipped to the grid.
+        """
+        self.cells[max(y, 0):max(y + height, 0), max(x, 0):max(x + width, 0)] = filled
+
+    def clear(self, x: int = 0, y: int = 0, width: int = None, height: int = None):
+        """
+        Clear the tiles of the rectangle, by default the whole grid.
+        """
+        width = self.size[0] if width is None else width
+        height = self.size[1] if height is None else height
+        self.fill(x, y, width, height, False)
+
+    def resize(self, size: tuple[int, int]):
+        """
+        Change the size of the grid, keeping the tiles that still fit.
+        """
+        import numpy as np
+        cells = np.zeros((size[1], size[0]), dtype=bool)
+        height = min(size[1], self.size[1])
+        width = min(size[0], self.size[0])
+        cells[:height, :width] = self.cells[:height, :width]
+        self.size = (int(size[0]), int(size[1]))
+        self.cells = cells
+
+    def fill_rects(self, rects, filled: bool = True, grow: bool = False):
+        """
+        Fill, or clear, the tiles containing the top left corners of the rectangles, in pixels.
+
+        Raises IndexError if a tile is outside the grid, like add. With grow the grid is first
+        enlarged to the right and down to fit every tile, only negative tiles are refused.
+        """
+        import numpy as np
+        corners = np.array([(rect[0], rect[1]) for rect in rects], dtype=np.int64).reshape(-1, 2) // self.tile_size
+        xs, ys = corners[:, 0], corners[:, 1]
+        if len(xs) == 0:
+            return
+
+        if grow:
+            size = (max(self.size[0], int(xs.max()) + 1), max(self.size[1], int(ys.max()) + 1))
+            if size != self.size:
+                self.resize(size)
+
+        outside = (xs < 0) | (xs >= self.size[0]) | (ys < 0) | (ys >= self.size[1])
+        if outside.any():
+            i = int(np.argmax(outside))
+            raise IndexError(f'tile {(int(xs[i]), int(ys[i]))} is outside the {self.size[0]}x{self.size[1]} grid')
+        self.cells[ys, xs] = filled
+
+    def exposed_sides(self) -> dict[tuple[int, int], tuple[np.ndarray, np.ndarray]]:
+        """
+        Tiles with an empty neighbour in each direction of Polymap.directions, as a dict of
+        direction -> (xs, ys) arrays.
+        """
+        import numpy as np
+        padded = np.pad(self.cells, 1)
+        neighbours = {
+            (-1, 0): padded[1:-1, :-2],
+            (1, 0): padded[1:-1, 2:],
+            (0, -1): padded[:-2, 1:-1],
+            (0, 1): padded[2:, 1:-1],
+        }
+
+        sides = {}
+        for direction, neighbour in neighbours.items():
+            ys, xs = np.nonzero(self.cells & ~neighbour)
+            sides[direction] = (xs, ys)
+        return sides
+
+    def edge_columns(self, tile_size: int = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Columns x0, y0, x1, y1 of the exposed tile sides, scaled to the screen, with the
+        points of Polymap.tile_side.
+        """
+        import numpy as np
+        tile_size = self.tile_size if tile_size is None else tile_size
+        columns = [[], [], [], []]
+        for (dx, dy), (xs, ys) in self.exposed_sides().items():
+            if dx:
+                sx = xs + (dx > 0)
+                points = (sx, ys, sx, ys + 1)
+            else:
+                sy = ys + (dy > 0)
+                points = (xs, sy, xs + 1, sy)
+            for column, values in zip(columns, points):
+                column.append(values)
+
+        return tuple(np.concatenate(column).astype(np.float64) * tile_size for column in columns)
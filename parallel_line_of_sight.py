@@ -0,0 +1,173 @@
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from edge import EdgeBuffer
+from line_of_sight import LineOfSight
+from occluders import Occluders
+from polymap import Polymap
+
+# Mapa já lido por este processo trabalhador: nome da memória compartilhada -> Polymap
+worker_maps = {}
+
+# Oclusores recebidos por este processo trabalhador: chave do processo principal -> Occluders
+worker_occluders = {}
+
+
+def load_polymap(name: str, count: int) -> Polymap:
+    """
+    Read the walls published in the shared memory block `name`, once per block.
+
+    They are kept as the edges of a Polymap with no tiles, so the vertex adjacency is built
+    once per block and cached in it, and queries with max_radius use its EdgeGrid, indexed on
+    the first one, like in the main process.
+    """
+    polymap = worker_maps.get(name)
+    if polymap is not None:
+        return polymap
+
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        size = count * 8
+        walls = EdgeBuffer.from_columns(*(block.buf[i * size:(i + 1) * size] for i in range(4)))
+    finally:
+        block.close()
+
+    polymap = Polymap()
+    polymap.edges = walls
+    polymap.version = 1
+    polymap.edge_grid.defer(walls)
+
+    # Só o mapa mais recente interessa, os anteriores são descartados
+    worker_maps.clear()
+    worker_maps[name] = polymap
+    return polymap
+
+
+def load_occluders(key: tuple, sides: list) -> Occluders | None:
+    """
+    Occluders with the enabled sides sent by the main process, built once per key, so their
+    adjacency is cached across the tasks of the same version.
+    """
+    if key is None:
+        return None
+
+    occluders = worker_occluders.get(key)
+    if occluders is None:
+        occluders = Occluders()
+        occluders.set_shape(0, sides)
+
+        # Só a versão mais recente interessa
+        worker_occluders.clear()
+        worker_occluders[key] = occluders
+    return occluders
+
+
+def build_in_worker(task: tuple) -> list:
+    """
+    Build the visibility triangles of a chunk of sources inside a worker process.
+    """
+    name, count, sources, map_size, max_radius, occluders_key, occluder_sides = task
+    polymap = load_polymap(name, count)
+    occluders = load_occluders(occluders_key, occluder_sides)
+    return [LineOfSight.build_visibility_triangles(polymap, source, map_size, max_radius, occluders) for source in sources]
+
+
+class ParallelLineOfSight:
+    """
+    Visibility triangles of many sources computed by a pool of worker processes.
+
+    The walls of the Polymap are copied to a shared memory block once per geometry version,
+    and the workers read them from there the first time they see the block, building their
+    vertex adjacency and EdgeGrid once for it, so only the sources and the triangles travel
+    between the processes on each call. The sides of the enabled occluders, usually a few
+    doors, are sent with the tasks and the workers rebuild them once per occluders version.
+    Batches smaller than `min_batch` are computed in this process, where the round trip would
+    cost more than it saves.
+    """
+
+    def __init__(self, workers: int = None, min_batch: int = 8):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_batch = min_batch
+        self.executor = None
+        self.block = None
+        self.count = 0
+        self.published = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def publish(self, polymap: Polymap):
+        """
+        Copy the walls of the Polymap to a new shared memory block if its geometry changed.
+        """
+        key = (id(polymap), polymap.version)
+        if self.published == key:
+            return
+
+        self.release()
+
+        walls = polymap.edges
+        if not isinstance(walls, EdgeBuffer):
+            walls = EdgeBuffer(walls)
+
+        size = len(walls) * 8
+        self.block = shared_memory.SharedMemory(create=True, size=max(1, 4 * size))
+        for i, column in enumerate((walls.x0, walls.y0, walls.x1, walls.y1)):
+            self.block.buf[i * size:(i + 1) * size] = column.tobytes()
+
+        self.count = len(walls)
+        self.published = key
+
+    def build_visibility_triangles(self, polymap: Polymap, sources: list[tuple[int, int]], map_size: tuple[int, int],
+                                   max_radius: float = None, occluders: Occluders = None) -> list[list[tuple[int, int]]]:
+        """
+        Build the visibility triangles of each source, in the order of the sources, seen
+        through the enabled occluders if given.
+        """
+        sources = [tuple(source) for source in sources]
+
+        if self.workers <= 1 or len(sources) < self.min_batch:
+            return [LineOfSight.build_visibility_triangles(polymap, source, map_size, max_radius, occluders)
+                    for source in sources]
+
+        self.publish(polymap)
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        # Um bloco de fontes por tarefa, para diluir o custo de cada envio
+        chunk = -(-len(sources) // self.workers)
+        if occluders is None:
+            occluders_key, occluder_sides = None, None
+        else:
+            occluders_key, occluder_sides = (id(occluders), occluders.version), occluders.sides()
+        tasks = [(self.block.name, self.count, sources[i:i + chunk], map_size, max_radius, occluders_key, occluder_sides)
+                 for i in range(0, len(sources), chunk)]
+
+        results = []
+        for triangles in self.executor.map(build_in_worker, tasks):
+            results.extend(triangles)
+        return results
+
+    def release(self):
+        """
+        Free the shared memory block of the published walls.
+        """
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+            self.published = None
+
+    def close(self):
+        """
+        Stop the workers and free the shared memory.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.release()
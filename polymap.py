@@ -1,10 +1,31 @@
 from __future__ import annotations
-import pygame
-from edge import Edge  
+from typing import TYPE_CHECKING
+from edge import Edge, EdgeBuffer
+from edge_grid import EdgeGrid
+from instrumentation import Instrumentation
+from occupancy_grid import OccupancyGrid
+from time import perf_counter
+
+if TYPE_CHECKING:
+    import pygame
 
 class Polymap:
-    def __init__(self):
-        self.edges = []
+    # Direções dos lados de um tile (esquerda, direita, cima, baixo)
+    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+    def __init__(self, size: tuple[int, int] = (20, 15), tile_size: int = 40):
+        self.edges = EdgeBuffer()
+        self.contours = []
+        # Tiles preenchidos de um mapa de size tiles, escalados por tile_size na tela
+        self.tile_size = tile_size
+        self.tiles = OccupancyGrid(size, tile_size)
+        self.trace_contours = False
+        self.version = 0
+        self.edge_grid = EdgeGrid()
+
+        # Vizinhança dos vértices por tamanho de mapa, montada pelo LineOfSight para a versão adjacency_version
+        self.adjacency = {}
+        self.adjacency_version = None
 
     def get_edges_with_y_axis_reverse(self, screen_height):
         edges = []
@@ -14,19 +35,149 @@ class Polymap:
             edges.append(Edge(start, end))
         return edges
 
+    def snapshot(self) -> Polymap:
+        """
+        Copy of the geometry with the same version, that can be read by another thread while
+        this Polymap is edited.
+        """
+        copy = Polymap(self.tiles.size, self.tile_size)
+        copy.tiles = self.tiles.copy()
+        copy.contours = [list(contour) for contour in self.contours]
+        copy.trace_contours = self.trace_contours
+        copy.edges = self.edges.copy()
+        copy.version = self.version
+        copy.edge_grid.defer(copy.edges)
+        return copy
 
-    def draw(self, rects : set[pygame.Rect], screen, color):
-        for edge in self.edges:
-            pygame.draw.line(screen, color, edge.start, edge.end, 2)
+    def update(self, rects: set[pygame.Rect] = None, trace_contours=False):
+        """
+        Rebuild the edges from the rectangles, or from the current tiles if no rectangles are
+        given. The grid grows to fit rectangles beyond its size, and rectangles at negative
+        coordinates raise IndexError. With trace_contours the collinear tile sides are merged
+        and the closed contours are returned, otherwise the edges are returned.
+        """
+        stats = Instrumentation.active
+        if stats is not None:
+            start = perf_counter()
+
+        if rects is not None:
+            self.tiles.clear()
+            self.tiles.fill_rects(rects, grow=True)
+        self.trace_contours = trace_contours
+        self.version += 1
+        if stats is not None:
+            start = stats.stage('tiles', start)
+
+        if trace_contours:
+            self.contours = self.convert_to_contours(self.tiles)
+            self.edges = EdgeBuffer(self.contours_to_edges(self.contours))
+        else:
+            self.contours = []
+            self.edges = EdgeBuffer.from_columns(*self.tiles.edge_columns())
+        if stats is not None:
+            start = stats.stage('edges', start)
+
+        self.edge_grid.defer(self.edges)
+        if stats is not None:
+            stats.stage('edge_grid', start)
+            stats.count('tiles', len(self.tiles))
+            stats.count('edges', len(self.edges))
+            stats.flush('polymap.update')
+
+        return self.contours if trace_contours else self.edges
+
+    def fill_tiles(self, x: int, y: int, width: int, height: int, filled=True):
+        """
+        Fill, or clear, a rectangle of tiles with top left tile (x, y) and rebuild the edges
+        once for the whole region.
+        """
+        self.tiles.fill(x, y, width, height, filled)
+        self.update(trace_contours=self.trace_contours)
+
+    def clear_tiles(self, x: int, y: int, width: int, height: int):
+        self.fill_tiles(x, y, width, height, False)
+
+    def add_tile(self, x: int, y: int) -> bool:
+        """
+        Add the tile (x, y), patching only its sides. Returns False if it was already there.
+        Raises IndexError for tiles outside the grid.
+        """
+        if (x, y) in self.tiles:
+            return False
+
+        self.tiles.add((x, y))
+        self.patch_tile(x, y)
+        return True
+
+    def remove_tile(self, x: int, y: int) -> bool:
+        """
+        Remove the tile (x, y), patching only its sides. Returns False if it was not there.
+        """
+        if (x, y) not in self.tiles:
+            return False
+
+        self.tiles.remove((x, y))
+        self.patch_tile(x, y)
+        return True
+
+    def patch_tile(self, x: int, y: int):
+        """
+        Update the edges after the tile (x, y) was added or removed.
+
+        Each side of the tile is shared with one neighbour, so it is a wall exactly when one
+        of the two tiles is filled, and only those 4 sides are patched, in O(1). With traced
+        contours the merged outline of the whole map is traced again instead, which is O(map):
+        traced contours give the sweep fewer walls, untraced edges make every edit cheap, so
+        editors and destructible maps should update without trace_contours.
+        """
+        stats = Instrumentation.active
+        if stats is not None:
+            start = perf_counter()
+
+        self.version += 1
 
-    def update(self, rects : set[pygame.Rect]):
-        tiles = self.convert_to_tiles(rects)
-        self.edges = self.convert_to_polygon(tiles)
+        if self.trace_contours:
+            self.contours = self.convert_to_contours(self.tiles)
+            self.edges = EdgeBuffer(self.contours_to_edges(self.contours))
+            self.edge_grid.defer(self.edges)
+        else:
+            # Um EdgeGrid adiado ainda vai ler self.edges, que já terá a mudança
+            indexed = self.edge_grid.pending is not self.edges
+            filled = (x, y) in self.tiles
+            for direction in self.directions:
+                edge = self.tile_side(x, y, direction, self.tile_size)
+                if filled != ((x + direction[0], y + direction[1]) in self.tiles):
+                    self.edges.add(edge)
+                    if indexed:
+                        self.edge_grid.add(edge)
+                else:
+                    self.edges.discard(edge)
+                    if indexed:
+                        self.edge_grid.remove(edge)
 
-    def convert_to_tiles(self, rects, screen_width=800, screen_height=600, tile_size=40) -> set[(int, int)]:
+        if stats is not None:
+            stats.stage('patch', start)
+            stats.count('edges', len(self.edges))
+            stats.flush('polymap.patch_tile')
+
+    @staticmethod
+    def tile_side(x: int, y: int, direction: tuple[int, int], tile_size=40) -> Edge:
+        """
+        Edge of the side of the tile (x, y) facing the given direction, scaled to the screen.
+        """
+        dx, dy = direction
+        if dx:
+            sx = x + (dx > 0)
+            return Edge((sx * tile_size, y * tile_size), (sx * tile_size, (y + 1) * tile_size))
+
+        sy = y + (dy > 0)
+        return Edge((x * tile_size, sy * tile_size), ((x + 1) * tile_size, sy * tile_size))
+
+    def convert_to_tiles(self, rects, screen_width=800, screen_height=600, tile_size=None) -> set[(int, int)]:
         """
         Convert a set of rectangles to a set of tiles
         """
+        tile_size = self.tile_size if tile_size is None else tile_size
         tiles = set()
 
         for rect in rects:
@@ -80,6 +231,103 @@ class Polymap:
 
         return list(edges)
 
+    def convert_to_contours(self, tiles: set[(int, int)], screen_width=800, screen_height=600, tile_size=None) -> list[list[tuple[int, int]]]:
+        """
+        Trace the outline of the tiles as closed contours, merging collinear tile sides.
+
+        Each contour is a list of vertices, without repeating the first one at the end.
+        Outer boundaries run clockwise on the screen and holes run counterclockwise, so
+        contour_area is positive for boundaries and negative for holes.
+        """
+        tile_size = self.tile_size if tile_size is None else tile_size
+
+        # Bordas expostas orientadas com o tile à direita de quem percorre: vértice -> direções
+        outgoing = {}
+
+        def add_side(p, direction):
+            outgoing.setdefault(p, []).append(direction)
+
+        if isinstance(tiles, OccupancyGrid):
+            # O grid acha os lados expostos de todos os tiles de uma vez
+            sides = tiles.exposed_sides()
+            for side, (ox, oy), direction in (((0, -1), (0, 0), (1, 0)), ((1, 0), (1, 0), (0, 1)),
+                                              ((0, 1), (1, 1), (-1, 0)), ((-1, 0), (0, 1), (0, -1))):
+                xs, ys = sides[side]
+                for p in zip((xs + ox).tolist(), (ys + oy).tolist()):
+                    add_side(p, direction)
+        else:
+            for x, y in tiles:
+                if (x, y - 1) not in tiles:  # Cima
+                    add_side((x, y), (1, 0))
+                if (x + 1, y) not in tiles:  # Direita
+                    add_side((x + 1, y), (0, 1))
+                if (x, y + 1) not in tiles:  # Baixo
+                    add_side((x + 1, y + 1), (-1, 0))
+                if (x - 1, y) not in tiles:  # Esquerda
+                    add_side((x, y + 1), (0, -1))
+
+        contours = []
+
+        for start in sorted(outgoing):
+            while outgoing[start]:
+                contour = []
+                vertex = start
+                direction = outgoing[start].pop()
+                previous = None
+
+                while True:
+                    # Só guardamos os vértices onde a direção muda
+                    if direction != previous:
+                        contour.append((vertex[0] * tile_size, vertex[1] * tile_size))
+                    previous = direction
+                    vertex = (vertex[0] + direction[0], vertex[1] + direction[1])
+
+                    if vertex == start:
+                        break
+
+                    # Em vértices compartilhados na diagonal, virar à direita separa os tiles
+                    options = outgoing[vertex]
+                    dx, dy = direction
+                    for turn in ((-dy, dx), (dx, dy), (dy, -dx)):
+                        if turn in options:
+                            options.remove(turn)
+                            direction = turn
+                            break
+
+                # O primeiro vértice pode estar no meio de um segmento
+                if len(contour) > 1 and direction == self.contour_direction(contour[0], contour[1]):
+                    contour.pop(0)
+
+                contours.append(contour)
+
+        return contours
+
+    @staticmethod
+    def contour_direction(p1: tuple[int, int], p2: tuple[int, int]) -> tuple[int, int]:
+        """
+        Unit direction of an axis aligned segment.
+        """
+        return ((p2[0] > p1[0]) - (p2[0] < p1[0]), (p2[1] > p1[1]) - (p2[1] < p1[1]))
+
+    @staticmethod
+    def contour_area(contour: list[tuple[int, int]]) -> float:
+        """
+        Signed area of a contour, positive for outer boundaries and negative for holes.
+        """
+        area = 0
+        for i in range(len(contour)):
+            x1, y1 = contour[i - 1]
+            x2, y2 = contour[i]
+            area += x1 * y2 - x2 * y1
+        return area / 2
+
+    @staticmethod
+    def contours_to_edges(contours: list[list[tuple[int, int]]]) -> list[Edge]:
+        """
+        Convert closed contours to a list of edges.
+        """
+        return [Edge(contour[i - 1], contour[i]) for contour in contours for i in range(len(contour))]
+
 
 
 
@@ -0,0 +1,272 @@
+"""
+Desenho com pygame da geometria e da visibilidade.
+
+O núcleo (Edge, Polymap, LineOfSight, Vector2/3) não depende do pygame, só este
+módulo e o main.py importam ele.
+"""
+from __future__ import annotations
+import pygame
+from instrumentation import Instrumentation
+from lightmap import Light, Lightmap
+from occluders import Occluders
+from polymap import Polymap
+
+
+def draw_polymap(polymap: Polymap, screen: pygame.Surface, color, width: int = 2):
+    """Desenha as arestas do Polymap."""
+    for edge in polymap.edges:
+        pygame.draw.line(screen, color, edge.start, edge.end, width)
+
+
+def draw_occluders(surface: pygame.Surface, occluders: Occluders, color, width: int = 6):
+    """Desenha os lados dos oclusores ligados."""
+    for start, end in occluders.sides():
+        pygame.draw.line(surface, color, start, end, width)
+
+
+def draw_filled_tiles(surface: pygame.Surface, polymap: Polymap, color):
+    """Desenha os tiles preenchidos do Polymap."""
+    size = polymap.tile_size
+    for x, y in polymap.tiles:
+        pygame.draw.rect(surface, color, (x * size, y * size, size, size))
+
+
+def draw_visibility(screen: pygame.Surface, triangles: list, color):
+    """Desenha os triângulos de visibilidade."""
+    for triangle in triangles:
+        pygame.draw.polygon(screen, color, triangle)
+
+
+def bounding_rect(points, margin: int = 1) -> pygame.Rect:
+    """Menor retângulo inteiro que contém os pontos."""
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    left = int(min(xs)) - margin
+    top = int(min(ys)) - margin
+    return pygame.Rect(left, top, int(max(xs)) + margin - left + 1, int(max(ys)) + margin - top + 1)
+
+
+def draw_grid(surface: pygame.Surface, tile_size: int, color):
+    """Desenha as linhas do grid sobre toda a superfície."""
+    width, height = surface.get_size()
+    for x in range(0, width, tile_size):
+        pygame.draw.line(surface, color, (x, 0), (x, height - 1))
+        pygame.draw.line(surface, color, (x + tile_size - 1, 0), (x + tile_size - 1, height - 1))
+    for y in range(0, height, tile_size):
+        pygame.draw.line(surface, color, (0, y), (width - 1, y))
+        pygame.draw.line(surface, color, (0, y + tile_size - 1), (width - 1, y + tile_size - 1))
+
+
+class LightLayer:
+    """
+    Surface that receives a Lightmap in one surfarray upload and adds it over the screen.
+    """
+
+    def __init__(self, size: tuple[int, int]):
+        self.surface = pygame.Surface(size)
+
+    def upload(self, lightmap: Lightmap, area: pygame.Rect = None):
+        """Copia o lightmap para a superfície, só dentro da área se ela for dada."""
+        if area is None:
+            pygame.surfarray.blit_array(self.surface, lightmap.to_rgb())
+        elif area.width and area.height:
+            pygame.surfarray.blit_array(self.surface.subsurface(area), lightmap.to_rgb(tuple(area)))
+
+    def draw(self, screen: pygame.Surface, area: pygame.Rect = None):
+        """Soma a luz às cores da tela, só dentro da área se ela for dada."""
+        screen.blit(self.surface, area or (0, 0), area, special_flags=pygame.BLEND_RGB_ADD)
+
+
+class LayeredRenderer:
+    """
+    Renders the demo scene from cached layers, redrawing only what changed.
+
+    The tiles and edges are pre-rendered into a static layer that is rebuilt, and the whole
+    screen redrawn, when the version of the Polymap changes, and the grid into a transparent
+    overlay that never changes. The occluders are not part of the static layer: a change to
+    them only redraws the boxes they covered before and after it, and the area whose light
+    changed. The light is recomputed only when the source, the map or the occluders change. Without `light_radius` it is a single light with
+    no falloff, filled flat with pygame.draw.polygon, which costs next to nothing. With
+    `light_radius` it is composited into a Lightmap with a falloff that reaches zero there and
+    added over the static layer, and only the area lit in the last and in the new frame is
+    cleared and uploaded. The enabled occluders are drawn over the light, like the ball, so a
+    closed door stays visible. render returns the dirty rectangles to give to
+    pygame.display.update, an empty list when nothing changed.
+    """
+
+    # Cor transparente da camada do grid
+    colorkey = (255, 0, 255)
+
+    # Espessura das linhas dos oclusores
+    occluder_width = 6
+
+    def __init__(self, screen: pygame.Surface, tile_size: int, background, tile_color, edge_color,
+                 grid_color, light_color, ball_color, light_radius: float = None, occluder_color=None):
+        self.screen = screen
+        self.tile_size = tile_size
+        self.background = background
+        self.tile_color = tile_color
+        self.edge_color = edge_color
+        self.occluder_color = edge_color if occluder_color is None else occluder_color
+        self.light_color = light_color
+        self.ball_color = ball_color
+
+        self.static = pygame.Surface(screen.get_size())
+        self.static_version = None
+
+        self.grid = pygame.Surface(screen.get_size())
+        self.grid.fill(self.colorkey)
+        self.grid.set_colorkey(self.colorkey)
+        draw_grid(self.grid, tile_size, grid_color)
+
+        # Sem raio a luz é chapada e não precisa de lightmap
+        self.light_radius = light_radius
+        if light_radius is not None:
+            self.lightmap = Lightmap(screen.get_size())
+            self.light = LightLayer(screen.get_size())
+        self.lit = None
+
+        self.light_key = None
+        self.light_rect = None
+        self.triangles = []
+
+        self.occluders_version = None
+        self.occluders_box = None
+
+    def render(self, polymap: Polymap, source, radius: int, visibility, result_key=None,
+               occluders: Occluders = None) -> list[pygame.Rect]:
+        """
+        Update the screen and return the dirty rectangles.
+
+        `visibility` is called with the source to get the light triangles, only when the
+        source or the geometry changed since the last frame. When the triangles come from
+        elsewhere, such as a VisibilityWorker, `result_key` identifies them and replaces the
+        versions of the geometry in that check.
+        """
+        dirty = []
+
+        if polymap.version != self.static_version:
+            self.static.fill(self.background)
+            draw_filled_tiles(self.static, polymap, self.tile_color)
+            draw_polymap(polymap, self.static, self.edge_color)
+            self.static_version = polymap.version
+            dirty.append(self.screen.get_rect())
+
+        # Os oclusores são desenhados por cima, mudar eles só suja as caixas antiga e nova
+        occluders_version = None if occluders is None else occluders.version
+        if occluders_version != self.occluders_version:
+            occluders_rect = self.occluders_rect(occluders)
+            dirty.extend(rect for rect in (self.occluders_box, occluders_rect) if rect is not None)
+            self.occluders_version = occluders_version
+            self.occluders_box = occluders_rect
+
+        version = (polymap.version, occluders_version)
+
+        light_key = (version if result_key is None else result_key, tuple(source))
+        if light_key != self.light_key:
+            self.triangles = visibility(source) or []
+            self.light_key = light_key
+
+            # A luz e a bola antigas e novas precisam ser redesenhadas
+            ball = pygame.Rect(source[0] - radius, source[1] - radius, 2 * radius + 1, 2 * radius + 1)
+            if self.light_radius is None:
+                lit = bounding_rect([point for triangle in self.triangles for point in triangle]) if self.triangles else None
+            else:
+                lit = self.composite_light(source)
+            light_rect = ball.union(lit) if lit else ball
+            if self.light_rect is not None:
+                dirty.append(self.light_rect)
+            dirty.append(light_rect)
+            self.light_rect = light_rect
+
+        if not dirty:
+            return []
+
+        area = dirty[0].unionall(dirty[1:]).clip(self.screen.get_rect())
+        self.screen.set_clip(area)
+        self.screen.blit(self.static, area, area)
+        if self.light_radius is None:
+            draw_visibility(self.screen, self.triangles, self.light_color)
+        else:
+            self.light.draw(self.screen, area)
+        if occluders is not None:
+            draw_occluders(self.screen, occluders, self.occluder_color, self.occluder_width)
+        pygame.draw.circle(self.screen, self.ball_color, source, radius)
+        self.screen.blit(self.grid, area, area)
+        self.screen.set_clip(None)
+
+        return [area]
+
+    def occluders_rect(self, occluders: Occluders) -> pygame.Rect | None:
+        """
+        Rectangle covered by the enabled occluders as drawn by draw_occluders, or None if
+        there are none.
+        """
+        sides = [] if occluders is None else occluders.sides()
+        if not sides:
+            return None
+        return bounding_rect([point for side in sides for point in side], self.occluder_width // 2 + 1)
+
+    def composite_light(self, source) -> pygame.Rect | None:
+        """
+        Replace the light of the last frame in the Lightmap by the light of the source, and
+        upload both areas to the light layer. Returns the area lit now.
+        """
+        changed = self.lit
+        if changed is not None:
+            self.lightmap.clear(tuple(changed))
+
+        lit = self.lightmap.add(Light(tuple(source), self.light_color, 1.0, self.light_radius), self.triangles)
+        lit = pygame.Rect(lit) if lit else None
+        if lit is not None:
+            changed = lit if changed is None else changed.union(lit)
+        if changed is not None:
+            self.light.upload(self.lightmap, changed)
+        self.lit = lit
+        return lit
+
+
+class StatsOverlay:
+    """
+    Box with the mean stage timings and counters of the visibility and of the frames, drawn
+    over the scene. The box only grows, so the text of a frame always covers the previous one.
+    """
+
+    def __init__(self, color, background, font_size: int = 18, position: tuple[int, int] = (4, 4)):
+        self.color = color
+        self.background = background
+        self.font = pygame.font.Font(None, font_size)
+        self.rect = pygame.Rect(position, (0, 0))
+
+    def lines(self, stats: Instrumentation) -> list[str]:
+        visibility = stats.summary('build_visibility_triangles')
+        frame = stats.summary('frame')
+
+        lines = [f'visibility: {visibility["runs"]} runs']
+        for name, seconds in visibility['timings'].items():
+            lines.append(f'  {name}: {seconds * 1000:.2f} ms')
+        for name, value in visibility['counters'].items():
+            lines.append(f'  {name}: {value:.0f}')
+        for name, seconds in frame['timings'].items():
+            lines.append(f'frame {name}: {seconds * 1000:.2f} ms')
+        for run in ('polymap.update', 'polymap.patch_tile'):
+            edits = stats.summary(run)
+            if edits['runs']:
+                lines.append(f'{run}: {sum(edits["timings"].values()) * 1000:.2f} ms')
+        return lines
+
+    def draw(self, screen: pygame.Surface, stats: Instrumentation) -> pygame.Rect:
+        """
+        Draw the box and return its rectangle.
+        """
+        texts = [self.font.render(line, True, self.color) for line in self.lines(stats)]
+        width = max(text.get_width() for text in texts) + 8
+        height = sum(text.get_height() for text in texts) + 8
+        self.rect = self.rect.union(pygame.Rect(self.rect.topleft, (width, height)))
+
+        screen.fill(self.background, self.rect)
+        y = self.rect.top + 4
+        for text in texts:
+            screen.blit(text, (self.rect.left + 4, y))
+            y += text.get_height()
+        return self.rect
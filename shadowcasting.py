@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+
+class VisibilityMask:
+    """
+    Visible tiles of a map packed in a bitmask, one bit per tile in row-major order.
+    """
+
+    __slots__ = ('width', 'height', 'bits')
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.bits = bytearray((width * height + 7) // 8)
+
+    def add(self, x: int, y: int):
+        i = y * self.width + x
+        self.bits[i >> 3] |= 1 << (i & 7)
+
+    def __contains__(self, tile: tuple[int, int]) -> bool:
+        x, y = tile
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        i = y * self.width + x
+        return bool(self.bits[i >> 3] >> (i & 7) & 1)
+
+    def __iter__(self):
+        for y in range(self.height):
+            for x in range(self.width):
+                if (x, y) in self:
+                    yield (x, y)
+
+    def __len__(self) -> int:
+        return sum(bin(byte).count('1') for byte in self.bits)
+
+    def to_numpy(self):
+        """
+        Boolean array of shape (height, width), indexed as [y, x].
+        """
+        import numpy as np
+        bits = np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), bitorder='little')
+        return bits[:self.width * self.height].reshape(self.height, self.width).astype(bool)
+
+
+class Shadowcasting:
+    """
+    Field of view on a tile grid with symmetric shadowcasting.
+
+    Each of the four quadrants around the origin is scanned row by row, moving away from
+    the origin, without building any edge. A row is the range of columns inside a cone
+    between a start and an end slope, and every wall in it narrows the cone, or splits it in
+    two, for the rows behind it, using the corners of the whole square of the wall. Floor
+    tiles are visible when their centre is inside the cone, which is the same as the segment
+    between both centres not crossing any wall, so a tile sees the origin whenever the origin
+    sees it. Walls are visible when any part of them is. Slopes are kept as integer
+    fractions to make the scan exact, and the rows are kept in a stack instead of the call
+    stack, so large maps don't hit the recursion limit.
+    """
+
+    @staticmethod
+    def compute(tiles: set[tuple[int, int]], origin: tuple[int, int], size: tuple[int, int], radius: float = None) -> VisibilityMask:
+        """
+        Visible tiles from the origin tile, in a map of size (width, height) tiles where the
+        given tiles block the sight. With a radius only the tiles whose centre is within that
+        many tiles of the origin are visible.
+        """
+        width, height = size
+        ox, oy = origin
+        mask = VisibilityMask(width, height)
+
+        if not (0 <= ox < width and 0 <= oy < height):
+            return mask
+
+        mask.add(ox, oy)
+        max_depth = max(width, height) if radius is None else int(radius)
+        radius_squared = None if radius is None else radius * radius
+
+        # Transformações de (profundidade, coluna) para o mapa em cada quadrante: norte, sul, leste, oeste
+        quadrants = ((0, -1, 1, 0), (0, 1, 1, 0), (1, 0, 0, 1), (-1, 0, 0, 1))
+
+        for rx, ry, cx, cy in quadrants:
+            # Cada linha é (profundidade, início, fim), com as inclinações como frações (numerador, denominador)
+            rows = [(1, (-1, 1), (1, 1))]
+            while rows:
+                depth, start, end = rows.pop()
+                if depth > max_depth:
+                    continue
+
+                # Colunas cujo quadrado entra no cone entre as inclinações, na faixa da linha
+                near, far = 2 * depth - 1, 2 * depth + 1
+                low = start[0] * (near if start[0] >= 0 else far)
+                high = end[0] * (far if end[0] >= 0 else near)
+                min_col = max(-depth, (low + start[1]) // (2 * start[1]))
+                max_col = min(depth, -((end[1] - high) // (2 * end[1])))
+
+                previous = None
+                for col in range(min_col, max_col + 1):
+                    x = ox + rx * depth + cx * col
+                    y = oy + ry * depth + cy * col
+                    inside = 0 <= x < width and 0 <= y < height
+                    wall = not inside or (x, y) in tiles
+
+                    # Paredes aparecem se qualquer parte está no cone, pisos só se o centro estiver
+                    visible = wall or (col * start[1] >= depth * start[0] and col * end[1] <= depth * end[0])
+                    if inside and visible and (radius_squared is None or depth * depth + col * col <= radius_squared):
+                        mask.add(x, y)
+
+                    if previous is True and not wall:
+                        # A sombra da parede anterior termina no seu canto de maior inclinação
+                        start = Shadowcasting.max_slope(start, (2 * col - 1, near if col > 0 else far))
+                    if previous is False and wall:
+                        Shadowcasting.push(rows, depth + 1, start, Shadowcasting.min_slope(end, (2 * col - 1, far if col > 0 else near)))
+                    previous = wall
+
+                if previous is False:
+                    Shadowcasting.push(rows, depth + 1, start, end)
+
+        return mask
+
+    @staticmethod
+    def push(rows: list, depth: int, start: tuple[int, int], end: tuple[int, int]):
+        """
+        Queue the next row of a cone, unless the walls closed it.
+        """
+        if start[0] * end[1] <= end[0] * start[1]:
+            rows.append((depth, start, end))
+
+    @staticmethod
+    def min_slope(a: tuple[int, int], b: tuple[int, int]) -> tuple[int, int]:
+        return a if a[0] * b[1] <= b[0] * a[1] else b
+
+    @staticmethod
+    def max_slope(a: tuple[int, int], b: tuple[int, int]) -> tuple[int, int]:
+        return a if a[0] * b[1] >= b[0] * a[1] else b
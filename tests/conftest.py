@@ -0,0 +1,9 @@
+"""
+The modules live at the root of the repository, like in main.py, so the tests import them
+from there. pygame, when a test needs it, runs without a window.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
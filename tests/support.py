@@ -0,0 +1,83 @@
+"""
+Random maps, region comparisons and a brute force visibility check shared by the tests.
+"""
+from __future__ import annotations
+from polymap import Polymap
+from visibility_region import VisibilityRegion
+
+MAP_SIZE = (800, 600)
+TILE_SIZE = 40
+
+
+def random_tiles(rng, count: int, size: tuple[int, int] = (20, 15)) -> set[tuple[int, int]]:
+    return {(rng.randrange(size[0]), rng.randrange(size[1])) for _ in range(count)}
+
+
+def random_polymap(rng, count: int, size: tuple[int, int] = (20, 15), trace_contours: bool = False) -> Polymap:
+    polymap = Polymap(size, TILE_SIZE)
+    for tile in random_tiles(rng, count, size):
+        polymap.tiles.add(tile)
+    polymap.update(trace_contours=trace_contours)
+    return polymap
+
+
+def plain_edges(polymap: Polymap) -> list:
+    """The walls of the Polymap as a plain list of Edge, the input of the reference path."""
+    return list(polymap.edges)
+
+
+def random_source(rng, tiles, map_size: tuple[int, int] = MAP_SIZE, integer: bool = True) -> tuple:
+    """A random point of the map outside the filled tiles, with integer coordinates by default."""
+    while True:
+        if integer:
+            point = (rng.randint(1, map_size[0] - 1), rng.randint(1, map_size[1] - 1))
+        else:
+            point = (rng.uniform(1, map_size[0] - 1), rng.uniform(1, map_size[1] - 1))
+        if (int(point[0] // TILE_SIZE), int(point[1] // TILE_SIZE)) not in tiles:
+            return point
+
+
+def same_region(first: list, second: list, source, rng, samples: int = 500, map_size: tuple[int, int] = MAP_SIZE) -> bool:
+    """
+    Whether two sets of triangles from the source cover the same region, checked on random
+    points, for paths that may split the same region into different triangles.
+    """
+    a = VisibilityRegion(source, first)
+    b = VisibilityRegion(source, second)
+    for _ in range(samples):
+        point = (rng.uniform(0, map_size[0]), rng.uniform(0, map_size[1]))
+        if a.contains(point) != b.contains(point):
+            return False
+    return True
+
+
+def orientation(a, b, c) -> float:
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def touches(p1, p2, q1, q2) -> bool:
+    """Whether the segments p1-p2 and q1-q2 cross or touch."""
+    return (orientation(q1, q2, p1) * orientation(q1, q2, p2) <= 0 and
+            orientation(p1, p2, q1) * orientation(p1, p2, q2) <= 0)
+
+
+def distance_to_segment(point, a, b) -> float:
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    length = dx * dx + dy * dy
+    t = 0 if length == 0 else max(0, min(1, ((point[0] - a[0]) * dx + (point[1] - a[1]) * dy) / length))
+    return ((a[0] + t * dx - point[0]) ** 2 + (a[1] + t * dy - point[1]) ** 2) ** 0.5
+
+
+def sees(walls: list, source, point, margin: float = 0.5) -> bool | None:
+    """
+    Brute force: the point is seen if the segment from the source reaches it without touching
+    a wall. Returns None for points too close to the border of the region to tell, next to a
+    wall or with the sight line grazing a corner.
+    """
+    for wall in walls:
+        if distance_to_segment(point, wall.start, wall.end) < margin:
+            return None
+        if distance_to_segment(wall.start, source, point) < margin or distance_to_segment(wall.end, source, point) < margin:
+            return None
+    return not any(touches(source, point, wall.start, wall.end) for wall in walls)
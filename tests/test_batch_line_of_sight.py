@@ -0,0 +1,42 @@
+import random
+
+import numpy as np
+import pytest
+
+from batch_line_of_sight import BatchLineOfSight
+from edge import EdgeBuffer
+from support import MAP_SIZE, random_polymap, random_source, sees
+from visibility_region import VisibilityRegion
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_batch_matches_brute_force(seed):
+    rng = random.Random(seed)
+    for _ in range(3):
+        polymap = random_polymap(rng, rng.randrange(0, 60))
+        walls = polymap.convert_to_polygon(set(polymap.tiles))
+        sources = [random_source(rng, polymap.tiles) for _ in range(4)]
+
+        polygons = BatchLineOfSight.build_visibility_polygons(walls, np.array(sources, dtype=np.float64), MAP_SIZE)
+        assert len(polygons) == len(sources)
+        for source, polygon in zip(sources, polygons):
+            region = VisibilityRegion(source, BatchLineOfSight.polygon_to_triangles(source, polygon))
+            for _ in range(60):
+                point = (rng.uniform(0, MAP_SIZE[0]), rng.uniform(0, MAP_SIZE[1]))
+                expected = sees(walls, source, point)
+                if expected is not None:
+                    assert region.contains(point) == expected, (source, point)
+
+
+def test_batch_inputs_agree():
+    rng = random.Random(9)
+    polymap = random_polymap(rng, 50)
+    walls = list(polymap.edges)
+    sources = np.array([random_source(rng, polymap.tiles) for _ in range(6)], dtype=np.float64)
+
+    expected = BatchLineOfSight.build_visibility_polygons(walls, sources, MAP_SIZE)
+    segments, vertices = BatchLineOfSight.wall_arrays(EdgeBuffer(walls), MAP_SIZE)
+    for polygons in (BatchLineOfSight.build_visibility_polygons(EdgeBuffer(walls), sources, MAP_SIZE),
+                     BatchLineOfSight.build_visibility_polygons(walls, sources, MAP_SIZE, segments, vertices)):
+        for a, b in zip(polygons, expected):
+            np.testing.assert_array_equal(a, b)
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from chunked_world import ChunkedWorld
+from line_of_sight import LineOfSight
+from polymap import Polymap
+from support import TILE_SIZE, same_region
+
+SIZE = (60, 45)
+
+
+def tile_source(seed: int):
+    """Tile source filling about a tenth of every chunk, the same tiles on every load."""
+    def tiles(cx, cy, chunk_size):
+        rng = random.Random(hash((seed, cx, cy)))
+        first_x, first_y = cx * chunk_size, cy * chunk_size
+        tiles = {(first_x + rng.randrange(chunk_size), first_y + rng.randrange(chunk_size))
+                 for _ in range(chunk_size * chunk_size // 10)}
+        return {(x, y) for x, y in tiles if x < SIZE[0] and y < SIZE[1]}
+    return tiles
+
+
+def all_tiles(world: ChunkedWorld) -> set[tuple[int, int]]:
+    return {(x, y) for x in range(SIZE[0]) for y in range(SIZE[1]) if world.is_filled(x, y)}
+
+
+def plain_walls(tiles: set[tuple[int, int]]) -> list:
+    return Polymap().convert_to_polygon(tiles, tile_size=TILE_SIZE)
+
+
+def free_source(rng, tiles) -> tuple[int, int]:
+    while True:
+        x, y = rng.randrange(SIZE[0]), rng.randrange(SIZE[1])
+        if (x, y) not in tiles:
+            return (x * TILE_SIZE + rng.randint(1, TILE_SIZE - 1), y * TILE_SIZE + rng.randint(1, TILE_SIZE - 1))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_chunked_walls_match_the_whole_map(seed):
+    rng = random.Random(seed)
+    world = ChunkedWorld(SIZE, tile_source(seed), chunk_size=8, capacity=200)
+    tiles = all_tiles(world)
+    walls = plain_walls(tiles)
+    chunk_walls = [wall for cx in range(8) for cy in range(6) for wall in world.chunk_edges(cx, cy)]
+    assert len(chunk_walls) == len(walls) and set(chunk_walls) == set(walls)
+
+    for _ in range(8):
+        source = free_source(rng, tiles)
+        radius = rng.choice((150, 400))
+        assert same_region(world.build_visibility_triangles(source, radius),
+                           LineOfSight.build_visibility_triangles(walls, source, world.map_size(), radius),
+                           source, rng, map_size=world.map_size())
+
+
+def test_evicted_chunks_are_loaded_again():
+    world = ChunkedWorld(SIZE, tile_source(4), chunk_size=8, capacity=4)
+    first = set(world.chunk(0, 0).tiles)
+    for cx in range(1, 6):
+        world.chunk(cx, 0)
+    assert len(world.chunks) == 4 and (0, 0) not in world.chunks
+
+    loads = world.loads
+    assert world.chunk(0, 0).tiles == first
+    assert world.loads == loads + 1
+
+
+def test_edits_survive_eviction_and_update_neighbour_edges():
+    rng = random.Random(5)
+    world = ChunkedWorld(SIZE, tile_source(5), chunk_size=8, capacity=4)
+    tiles = all_tiles(world)
+
+    # Tiles nas bordas dos chunks mudam as arestas dos vizinhos
+    for tile in ((7, 3), (8, 3), (15, 16), (16, 16), (30, 31), (31, 31)):
+        if tile in tiles:
+            assert world.remove_tile(*tile)
+            tiles.discard(tile)
+        else:
+            assert world.add_tile(*tile)
+            tiles.add(tile)
+
+    for cx in range(8):
+        for cy in range(6):
+            world.chunk(cx, cy)
+    assert all_tiles(world) == tiles
+
+    walls = plain_walls(tiles)
+    for _ in range(5):
+        source = free_source(rng, tiles)
+        assert same_region(world.build_visibility_triangles(source, 500),
+                           LineOfSight.build_visibility_triangles(walls, source, world.map_size(), 500),
+                           source, rng, map_size=world.map_size())
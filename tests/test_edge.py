@@ -0,0 +1,74 @@
+import random
+from array import array
+
+import numpy as np
+
+from edge import Edge, EdgeBuffer
+
+
+def keys(buffer: EdgeBuffer) -> set:
+    return {EdgeBuffer.key(edge.start, edge.end) for edge in buffer}
+
+
+def test_edges_are_stored_once_without_direction():
+    buffer = EdgeBuffer()
+    assert buffer.add(Edge((0, 0), (40, 0)))
+    assert not buffer.add(Edge((40, 0), (0, 0)))
+    assert Edge((40, 0), (0, 0)) in buffer
+    assert len(buffer) == 1
+
+
+def test_random_edits_match_a_set():
+    rng = random.Random(1)
+    buffer = EdgeBuffer()
+    expected = set()
+    for _ in range(2000):
+        start = (rng.randrange(5) * 40, rng.randrange(5) * 40)
+        end = (start[0] + 40, start[1]) if rng.random() < 0.5 else (start[0], start[1] + 40)
+        edge = Edge(start, end) if rng.random() < 0.5 else Edge(end, start)
+        key = EdgeBuffer.key(edge.start, edge.end)
+        if rng.random() < 0.5:
+            assert buffer.add(edge) == (key not in expected)
+            expected.add(key)
+        else:
+            assert buffer.discard(edge) == (key in expected)
+            expected.discard(key)
+
+        assert len(buffer) == len(expected)
+    assert keys(buffer) == expected
+    assert all(buffer.slots[EdgeBuffer.key(*buffer.segment(i))] == i for i in range(len(buffer)))
+
+
+def test_copy_is_independent():
+    buffer = EdgeBuffer([Edge((0, 0), (40, 0)), Edge((40, 0), (40, 40))])
+    copy = buffer.copy()
+    buffer.discard(Edge((0, 0), (40, 0)))
+    copy.add(Edge((0, 40), (0, 0)))
+
+    assert keys(buffer) == {((40, 0), (40, 40))}
+    assert keys(copy) == {((0, 0), (40, 0)), ((40, 0), (40, 40)), ((0, 0), (0, 40))}
+
+
+def test_wrapped_columns_are_copied_on_first_write():
+    columns = [array('d', values) for values in ([0, 40], [0, 0], [40, 40], [0, 40])]
+    views = [memoryview(column) for column in columns]
+    buffer = EdgeBuffer.wrap(*views)
+
+    assert buffer.slots is None
+    assert [(edge.start, edge.end) for edge in buffer] == [((0, 0), (40, 0)), ((40, 0), (40, 40))]
+    assert Edge((40, 0), (0, 0)) in buffer
+
+    buffer.add(Edge((0, 0), (0, 40)))
+    buffer.discard(Edge((0, 0), (40, 0)))
+    assert [list(column) for column in columns] == [[0, 40], [0, 0], [40, 40], [0, 40]]
+    assert keys(buffer) == {((40, 0), (40, 40)), ((0, 0), (0, 40))}
+
+
+def test_from_columns_and_as_numpy():
+    x0, y0, x1, y1 = (np.array(values, dtype=np.float64) for values in ([0, 40], [0, 0], [40, 40], [0, 40]))
+    buffer = EdgeBuffer.from_columns(x0, y0, x1, y1)
+    x0[0] = 99
+
+    assert keys(buffer) == {((0, 0), (40, 0)), ((40, 0), (40, 40))}
+    views = buffer.as_numpy()
+    np.testing.assert_array_equal(np.column_stack(views), [[0, 0, 40, 0], [40, 0, 40, 40]])
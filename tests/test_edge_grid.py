@@ -0,0 +1,55 @@
+import random
+from math import cos, pi
+
+import pytest
+
+from edge import Edge
+from edge_grid import EdgeGrid
+from line_of_sight import LineOfSight
+from support import MAP_SIZE, distance_to_segment, plain_edges, random_polymap, random_source, same_region
+
+
+def test_query_finds_the_edges_in_range():
+    rng = random.Random(1)
+    edges = [Edge((rng.uniform(0, 800), rng.uniform(0, 600)), (rng.uniform(0, 800), rng.uniform(0, 600))) for _ in range(200)]
+    grid = EdgeGrid(cell_size=64)
+    grid.rebuild(edges)
+
+    for _ in range(50):
+        center = (rng.uniform(0, 800), rng.uniform(0, 600))
+        radius = rng.uniform(10, 300)
+        expected = {edge for edge in edges if distance_to_segment(center, edge.start, edge.end) <= radius}
+        assert grid.query(center, radius) == expected
+
+
+def test_deferred_grid_follows_edits():
+    edges = [Edge((0, 0), (40, 0)), Edge((400, 400), (400, 440))]
+    grid = EdgeGrid()
+    grid.defer(edges)
+    grid.add(Edge((100, 100), (140, 100)))
+    grid.remove(edges[0])
+    assert set(grid) == {edges[1], Edge((100, 100), (140, 100))}
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_range_limited_polymap_matches_plain_edges(seed):
+    rng = random.Random(seed)
+    for _ in range(8):
+        polymap = random_polymap(rng, rng.randrange(0, 60))
+        source = random_source(rng, polymap.tiles)
+        radius = rng.choice((60, 150, 400))
+        assert same_region(LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, radius),
+                           LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE, radius),
+                           source, rng)
+
+
+def test_light_stays_near_max_radius():
+    rng = random.Random(5)
+    polymap = random_polymap(rng, 30)
+    radius = 120
+    bound = radius / cos(pi / 32)
+    for _ in range(10):
+        source = random_source(rng, polymap.tiles)
+        for triangle in LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, radius):
+            for x, y in triangle:
+                assert ((x - source[0]) ** 2 + (y - source[1]) ** 2) ** 0.5 <= bound + 1e-9
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORE = ['edge', 'edge_grid', 'polymap', 'line_of_sight', 'visibility_cache', 'visibility_solver', 'visibility_region',
+        'chunked_world', 'occluders', 'occupancy_grid', 'vector']
+
+
+def loaded_modules(modules: list) -> set:
+    """Modules loaded by a fresh interpreter after importing the given ones."""
+    code = f'import sys; import {", ".join(modules)}; print(" ".join(sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+def test_core_does_not_import_pygame():
+    assert 'pygame' not in loaded_modules(CORE)
+
+
+def test_core_imports_numpy_lazily():
+    assert 'numpy' not in loaded_modules(CORE)
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from instrumentation import Instrumentation
+from line_of_sight import LineOfSight
+from support import MAP_SIZE, plain_edges, random_polymap, random_source
+
+
+@pytest.fixture
+def stats():
+    records = []
+    yield Instrumentation.enable(records.append)
+    Instrumentation.disable()
+
+
+def test_disabled_by_default():
+    assert Instrumentation.active is None
+
+
+def test_one_record_per_run(stats):
+    rng = random.Random(1)
+    polymap = random_polymap(rng, 40)
+    walls = plain_edges(polymap)
+    sources = [random_source(rng, polymap.tiles) for _ in range(5)]
+
+    triangles = [LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE) for source in sources]
+    records = [record for record in stats.records if record['run'] == 'build_visibility_triangles']
+    assert len(records) == 5
+    assert [record['counters']['triangles'] for record in records] == [len(result) for result in triangles]
+    assert all(seconds >= 0 for record in records for seconds in record['timings'].values())
+    assert stats.sink.__self__ == list(stats.records)
+    recorded = len(stats.records)
+
+    summary = stats.summary('build_visibility_triangles')
+    assert summary['runs'] == 5
+    assert summary['counters']['triangles'] == pytest.approx(sum(map(len, triangles)) / 5)
+
+    # Os resultados não mudam com a instrumentação
+    Instrumentation.disable()
+    assert [LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE) for source in sources] == triangles
+    assert len(stats.records) == recorded
+
+
+def test_polymap_runs(stats):
+    polymap = random_polymap(random.Random(2), 30)
+    polymap.add_tile(0, 0) or polymap.remove_tile(0, 0)
+    runs = [record['run'] for record in stats.records]
+    assert runs == ['polymap.update', 'polymap.patch_tile']
+    assert stats.records[-1]['counters']['edges'] == len(polymap.edges)
+
+
+def test_stages_chain():
+    stats = Instrumentation()
+    start = stats.stage('first', 0.0)
+    stats.stage('second', start)
+    stats.count('items', 3)
+    stats.count('items')
+    stats.peak('peak', 5)
+    stats.peak('peak', 2)
+    record = stats.flush('run')
+    assert set(record['timings']) == {'first', 'second'}
+    assert record['counters'] == {'items': 4, 'peak': 5}
+    assert stats.flush('empty') == {'run': 'empty', 'timings': {}, 'counters': {}}
@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import pytest
+
+from lightmap import Light, Lightmap
+from line_of_sight import LineOfSight
+from support import MAP_SIZE, distance_to_segment, plain_edges, random_polymap, random_source
+from visibility_region import VisibilityRegion
+
+
+def near_side(triangles: list, point, margin: float = 1e-6) -> bool:
+    return any(distance_to_segment(point, a, b) < margin
+               for triangle in triangles for a, b in zip(triangle, triangle[1:] + triangle[:1]))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_rasterize_matches_the_region(seed):
+    rng = random.Random(seed)
+    for _ in range(3):
+        polymap = random_polymap(rng, rng.randrange(0, 60))
+        source = random_source(rng, polymap.tiles, integer=False)
+        radius = rng.choice((None, 150))
+        triangles = LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE, radius)
+        left, top = rng.randrange(0, 400), rng.randrange(0, 300)
+        width, height = rng.randrange(1, 400), rng.randrange(1, 300)
+
+        mask = Lightmap.rasterize(triangles, left, top, width, height)
+        ys, xs = np.mgrid[top:top + height, left:left + width] + 0.5
+        centres = np.stack((xs.ravel(), ys.ravel()), axis=1)
+        expected = VisibilityRegion(source, triangles).contains_many(centres).reshape(height, width)
+
+        # Centros sobre os lados podem cair para qualquer um dos lados
+        for row, column in zip(*np.nonzero(mask != expected)):
+            assert near_side(triangles, (column + left + 0.5, row + top + 0.5))
+
+
+def test_light_accumulates_inside_its_radius():
+    lightmap = Lightmap((200, 100), ambient=(10, 10, 10))
+    light = Light((50.5, 50.5), color=(100, 200, 0), intensity=0.5, radius=30)
+    triangles = LineOfSight.build_visibility_triangles([], light.position, lightmap.size, light.radius)
+
+    assert lightmap.add(light, triangles) == (20, 20, 61, 61)
+    assert lightmap.buffer[50, 50] == pytest.approx((10 + 50, 10 + 100, 10), rel=1e-3)
+    assert lightmap.add(light, triangles) == (20, 20, 61, 61)
+    assert lightmap.buffer[50, 50] == pytest.approx((10 + 100, 10 + 200, 10), rel=1e-3)
+
+    ys, xs = np.mgrid[0:100, 0:200] + 0.5
+    outside = (xs - 50.5) ** 2 + (ys - 50.5) ** 2 >= 30 ** 2
+    assert (lightmap.buffer[outside] == 10).all()
+    assert (lightmap.buffer[~outside][:, 2] == 10).all()
+
+    assert lightmap.add(Light((-100, 50), radius=30), triangles) is None
+    assert lightmap.add(light, []) is None
+
+    rgb = lightmap.to_rgb()
+    assert rgb.shape == (200, 100, 3) and rgb.dtype == np.uint8
+    assert tuple(rgb[50, 50]) == (110, 210, 10)
+
+
+def test_composite_starts_from_the_ambient_light():
+    lightmap = Lightmap((80, 60), ambient=(5, 5, 5))
+    lights = [Light((20, 20), radius=15), Light((60, 40), radius=15)]
+    visibility = lambda light: LineOfSight.build_visibility_triangles([], light.position, lightmap.size, light.radius)
+
+    first = lightmap.composite(lights, visibility).copy()
+    assert (lightmap.composite(lights, visibility) == first).all()
+    assert first.min() == 5 and first.max() > 5
+
+
+def test_light_only_touches_the_box_of_its_triangles():
+    lightmap = Lightmap(MAP_SIZE, ambient=(3, 3, 3))
+    triangles = [((100.0, 100.0), (180.5, 120.0), (130.0, 170.25)), ((100.0, 100.0), (130.0, 170.25), (90.0, 140.0))]
+
+    assert lightmap.add(Light((100.0, 100.0), radius=1000), triangles) == (90, 100, 91, 71)
+    assert lightmap.add(Light((100.0, 100.0), radius=50), triangles) == (90, 100, 61, 51)
+    assert len(lightmap.falloffs) == 2
+
+    area = (90, 100, 91, 71)
+    assert lightmap.to_rgb(area).shape == (91, 71, 3)
+    lightmap.clear(area)
+    assert (lightmap.buffer == 3).all()
+
+
+def test_falloff_tiles_match_the_distances():
+    rng = random.Random(9)
+    lightmap = Lightmap((300, 200))
+    for _ in range(50):
+        x, y = rng.uniform(-100, 400), rng.uniform(-100, 300)
+        radius = rng.choice((20.0, 80.5, 1000.0))
+        # A luz só é pedida dentro do seu quadrado, recortado pela tela
+        first_x, last_x = max(0, int(x - radius)), min(300, int(x + radius) + 1)
+        first_y, last_y = max(0, int(y - radius)), min(200, int(y + radius) + 1)
+        if first_x >= last_x or first_y >= last_y:
+            continue
+        left, top = rng.randrange(first_x, last_x), rng.randrange(first_y, last_y)
+        width, height = rng.randint(1, last_x - left), rng.randint(1, last_y - top)
+
+        ys, xs = np.mgrid[top:top + height, left:left + width] + 0.5
+        expected = np.maximum(1 - ((xs - x) ** 2 + (ys - y) ** 2) / radius ** 2, 0) ** 2
+        assert lightmap.falloff(radius, x, y, (left, top, width, height)) == pytest.approx(expected, abs=1e-5)
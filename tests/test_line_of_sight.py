@@ -0,0 +1,141 @@
+import random
+
+import pytest
+
+from edge import Edge, EdgeBuffer
+from line_of_sight import LineOfSight
+from polymap import Polymap
+from reference_line_of_sight import LineOfSight as Reference
+from support import MAP_SIZE, TILE_SIZE, plain_edges, random_polymap, random_source, same_region
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_sweep_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(20):
+        polymap = random_polymap(rng, rng.randrange(0, 60))
+        walls = plain_edges(polymap)
+        source = random_source(rng, polymap.tiles)
+        assert LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE) == \
+            Reference.build_visibility_triangles(walls, source, MAP_SIZE)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_sweep_covers_reference_region_from_any_point(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        polymap = random_polymap(rng, rng.randrange(0, 60))
+        walls = plain_edges(polymap)
+        source = random_source(rng, polymap.tiles, integer=False)
+        assert same_region(LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE),
+                           Reference.build_visibility_triangles(walls, source, MAP_SIZE), source, rng)
+
+
+def test_sweep_with_free_walls():
+    rng = random.Random(7)
+    walls = [Edge((300, 100), (300, 500)), Edge((500, 50), (500, 550)), Edge((400, 250), (400, 350)),
+             Edge((100, 80), (250, 160))]
+    for source in ((100, 300), (420, 300), (700, 590), (40, 40)):
+        assert LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE) == \
+            Reference.build_visibility_triangles(walls, source, MAP_SIZE)
+    assert same_region(LineOfSight.build_visibility_triangles(walls, (420.5, 300.25), MAP_SIZE),
+                       Reference.build_visibility_triangles(walls, (420.5, 300.25), MAP_SIZE), (420.5, 300.25), rng)
+
+
+def test_nearer_wall_is_not_hidden_by_the_limits():
+    # O limite de baixo tem a menor distância até a fonte, mas o tile está na frente dele
+    polymap = Polymap((20, 15), TILE_SIZE)
+    polymap.tiles.add((7, 12))
+    polymap.update()
+    for walls in (polymap, plain_edges(polymap)):
+        region = LineOfSight.build_visibility_region(walls, (700, 300), MAP_SIZE)
+        assert not region.contains((180, 540))
+        assert region.contains((180, 60))
+
+
+def test_empty_map_sees_everything():
+    triangles = LineOfSight.build_visibility_triangles([], (400, 300), MAP_SIZE)
+    area = sum(abs((b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])) / 2 for a, b, c in triangles)
+    assert area == pytest.approx(MAP_SIZE[0] * MAP_SIZE[1])
+
+
+def test_edge_buffer_and_edge_list_agree():
+    rng = random.Random(3)
+    polymap = random_polymap(rng, 60)
+    walls = plain_edges(polymap)
+    source = random_source(rng, polymap.tiles)
+    assert LineOfSight.build_visibility_triangles(EdgeBuffer(walls), source, MAP_SIZE) == \
+        LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE)
+
+
+@pytest.mark.parametrize('trace_contours', (False, True))
+def test_polymap_adjacency_matches_plain_edges(trace_contours):
+    rng = random.Random(11)
+    for _ in range(10):
+        polymap = random_polymap(rng, rng.randrange(0, 60), trace_contours=trace_contours)
+        walls = plain_edges(polymap)
+        for _ in range(3):
+            source = random_source(rng, polymap.tiles)
+            assert LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE) == \
+                LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE)
+
+
+def test_polymap_adjacency_is_kept_per_version():
+    rng = random.Random(12)
+    polymap = random_polymap(rng, 30)
+    source = random_source(rng, polymap.tiles)
+
+    LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE)
+    adjacency = polymap.adjacency[MAP_SIZE]
+    LineOfSight.build_visibility_triangles(polymap, random_source(rng, polymap.tiles), MAP_SIZE)
+    assert polymap.adjacency[MAP_SIZE] is adjacency
+    assert LineOfSight.polymap_adjacency(polymap, (400, 300)) is not adjacency
+    assert set(polymap.adjacency) == {MAP_SIZE, (400, 300)}
+
+    tile = next(tile for tile in ((x, 7) for x in range(20)) if tile not in polymap.tiles and
+                (int(source[0] // 40), int(source[1] // 40)) != tile)
+    polymap.add_tile(*tile)
+    assert LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE) == \
+        LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE)
+    assert polymap.adjacency[MAP_SIZE] is not adjacency
+    assert set(polymap.adjacency) == {MAP_SIZE}
+
+
+def random_axis_wall(rng) -> tuple:
+    x, y = rng.randrange(0, 21) * 40, rng.randrange(0, 16) * 40
+    length = rng.randrange(-3, 4) * 40
+    return ((x, y), (x + length, y)) if rng.random() < 0.5 else ((x, y), (x, y + length))
+
+
+def test_axis_line_intersection_matches_line_intersection():
+    rng = random.Random(21)
+    for _ in range(20000):
+        start, end = random_axis_wall(rng)
+        source = (rng.randint(0, 800), rng.randint(0, 600))
+        vertex = rng.choice(((rng.randint(0, 800), rng.randint(0, 600)), start, end, (source[0], rng.randint(0, 600))))
+        assert LineOfSight.axis_line_intersection(source, vertex, start, end) == \
+            LineOfSight.line_intersection(source, vertex, start, end)
+
+    for _ in range(20000):
+        start, end = random_axis_wall(rng)
+        source = (rng.uniform(0, 800), rng.uniform(0, 600))
+        vertex = (rng.uniform(0, 800), rng.uniform(0, 600))
+        expected = LineOfSight.line_intersection(source, vertex, start, end)
+        hit = LineOfSight.axis_line_intersection(source, vertex, start, end)
+        assert (hit is None) == (expected is None)
+        if hit is None:
+            continue
+        assert hit == pytest.approx(expected, rel=1e-9, abs=1e-6)
+        assert hit[0] == start[0] if start[0] == end[0] else hit[1] == start[1]
+
+
+def test_build_triangle_matches_reference():
+    rng = random.Random(22)
+    for _ in range(5000):
+        start, end = random_axis_wall(rng)
+        wall = Edge(start, end)
+        source = (rng.randint(0, 800), rng.randint(0, 600))
+        old_vertex = (rng.randint(0, 800), rng.randint(0, 600))
+        vertex = (rng.randint(0, 800), rng.randint(0, 600))
+        assert LineOfSight.build_triangle(source, old_vertex, vertex, wall) == \
+            Reference.build_triangle(source, old_vertex, vertex, wall)
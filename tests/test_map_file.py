@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from line_of_sight import LineOfSight
+from map_file import MapFile
+from polymap import Polymap
+from support import MAP_SIZE, TILE_SIZE, plain_edges, random_polymap, random_source, random_tiles
+
+
+@pytest.mark.parametrize('trace_contours', (False, True))
+def test_round_trip(tmp_path, trace_contours):
+    rng = random.Random(1)
+    polymap = random_polymap(rng, 60, trace_contours=trace_contours)
+    path = str(tmp_path / 'map.bin')
+    MapFile.save(path, polymap)
+
+    loaded, size, tile_size = MapFile.load(path)
+    assert (size, tile_size) == ((20, 15), TILE_SIZE)
+    assert set(loaded.tiles) == set(polymap.tiles)
+    assert plain_edges(loaded) == plain_edges(polymap)
+    assert loaded.trace_contours == trace_contours
+    assert loaded.contours == polymap.contours
+
+    fresh = Polymap()
+    fresh.edges = polymap.edges
+    assert loaded.adjacency[MAP_SIZE] == LineOfSight.polymap_adjacency(fresh, MAP_SIZE)
+
+    for _ in range(10):
+        source = random_source(rng, polymap.tiles)
+        assert LineOfSight.build_visibility_triangles(loaded, source, MAP_SIZE) == \
+            LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE)
+
+
+def test_loaded_map_can_be_edited(tmp_path):
+    rng = random.Random(2)
+    polymap = random_polymap(rng, 40)
+    path = str(tmp_path / 'map.bin')
+    MapFile.save(path, polymap)
+    loaded, _, _ = MapFile.load(path)
+
+    for _ in range(10):
+        tile = (rng.randrange(20), rng.randrange(15))
+        for target in (polymap, loaded):
+            if tile in target.tiles:
+                target.remove_tile(*tile)
+            else:
+                target.add_tile(*tile)
+
+    assert set(plain_edges(loaded)) == set(plain_edges(polymap))
+    source = random_source(rng, polymap.tiles)
+    assert LineOfSight.build_visibility_triangles(loaded, source, MAP_SIZE) == \
+        LineOfSight.build_visibility_triangles(plain_edges(loaded), source, MAP_SIZE)
+
+
+def test_corrupted_files_are_refused(tmp_path):
+    polymap = random_polymap(random.Random(3), 30)
+    path = tmp_path / 'map.bin'
+    MapFile.save(str(path), polymap)
+
+    data = bytearray(path.read_bytes())
+    data[MapFile.header_size + 5] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match='checksum'):
+        MapFile.load(str(path))
+    MapFile.load(str(path), verify=False)
+
+    path.write_bytes(b'NOPE' + bytes(data[4:]))
+    with pytest.raises(ValueError, match='not a map file'):
+        MapFile.load(str(path))
+
+    path.write_bytes(b'')
+    with pytest.raises(ValueError):
+        MapFile.load(str(path))
+
+
+def test_size_and_tile_size_come_from_the_polymap(tmp_path):
+    rng = random.Random(4)
+    polymap = Polymap((30, 12), 32)
+    for tile in random_tiles(rng, 50, (30, 12)):
+        polymap.tiles.add(tile)
+    polymap.update()
+    # Um retângulo além do grid faz ele crescer, e o arquivo guarda o grid inteiro
+    polymap.update([(x * 32, y * 32, 32, 32) for x, y in polymap.tiles] + [(40 * 32, 3 * 32, 32, 32)])
+    path = str(tmp_path / 'map.bin')
+    MapFile.save(path, polymap)
+
+    loaded, size, tile_size = MapFile.load(path)
+    assert (size, tile_size) == ((41, 12), 32)
+    assert loaded.tiles.size == size and loaded.tile_size == 32
+    assert set(loaded.tiles) == set(polymap.tiles)
+
+    rebuilt = Polymap(size, 32)
+    rebuilt.update([(x * 32, y * 32, 32, 32) for x, y in loaded.tiles])
+    assert set(plain_edges(loaded)) == set(plain_edges(rebuilt))
+
+    for tile in ((40, 3), (40, 4), (0, 0), (1, 0)):
+        if tile in loaded.tiles:
+            loaded.remove_tile(*tile)
+            rebuilt.remove_tile(*tile)
+        else:
+            loaded.add_tile(*tile)
+            rebuilt.add_tile(*tile)
+    assert set(plain_edges(loaded)) == set(plain_edges(rebuilt))
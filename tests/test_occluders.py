@@ -0,0 +1,174 @@
+import random
+
+import pytest
+
+from line_of_sight import LineOfSight
+from occluders import Occluders
+from parallel_line_of_sight import ParallelLineOfSight
+from polymap import Polymap
+from support import MAP_SIZE, TILE_SIZE, plain_edges, random_source, random_tiles, same_region
+from visibility_cache import VisibilityCache
+from visibility_solver import VisibilitySolver
+from visibility_worker import VisibilityWorker
+
+
+def scene(rng) -> tuple[Polymap, Occluders]:
+    """Random tiles on the left of the map and occluders on the right, where they cross no wall."""
+    polymap = Polymap((20, 15), TILE_SIZE)
+    for tile in random_tiles(rng, 30, (10, 15)):
+        polymap.tiles.add(tile)
+    polymap.update()
+
+    occluders = Occluders()
+    occluders.add_segment('door', (14 * TILE_SIZE, 5 * TILE_SIZE), (14 * TILE_SIZE, 10 * TILE_SIZE))
+    occluders.add_segment('beam', (rng.uniform(450, 550), rng.uniform(50, 150)), (rng.uniform(650, 750), rng.uniform(50, 150)))
+    x, y = rng.uniform(620, 700), rng.uniform(420, 500)
+    occluders.add_polygon('crate', [(x, y), (x + 40, y + 10), (x + 30, y + 50), (x - 10, y + 35)])
+    # Porta encostada num tile, como no demo
+    occluders.add_segment('hinge', (10 * TILE_SIZE, 0), (10 * TILE_SIZE, TILE_SIZE), enabled=False)
+    return polymap, occluders
+
+
+def expected(polymap: Polymap, occluders: Occluders, source, max_radius=None) -> list:
+    return LineOfSight.build_visibility_triangles(plain_edges(polymap) + occluders.walls(), source, MAP_SIZE, max_radius)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_occluders_match_plain_edges(seed):
+    rng = random.Random(seed)
+    polymap, occluders = scene(rng)
+    for step in range(12):
+        if step % 3 == 2:
+            occluders.toggle(rng.choice(('door', 'beam', 'crate', 'hinge')))
+        source = random_source(rng, polymap.tiles)
+        max_radius = rng.choice((None, 250))
+        assert same_region(LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, max_radius, occluders),
+                           expected(polymap, occluders, source, max_radius), source, rng)
+
+
+def test_toggles_keep_the_static_adjacency():
+    rng = random.Random(5)
+    polymap, occluders = scene(rng)
+    source = random_source(rng, polymap.tiles)
+
+    LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, occluders=occluders)
+    static = polymap.adjacency[MAP_SIZE]
+    copy = {vertex: list(entries) for vertex, entries in static.items()}
+
+    for occluder_id in ('door', 'crate', 'door', 'hinge'):
+        occluders.toggle(occluder_id)
+        LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, occluders=occluders)
+        assert polymap.adjacency[MAP_SIZE] is static
+        assert static == copy
+
+    occluders.move('crate', 5, -5)
+    assert occluders.adjacency_version != occluders.version
+    LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, occluders=occluders)
+    assert occluders.adjacency_version == occluders.version
+    assert polymap.adjacency[MAP_SIZE] is static
+
+
+def test_toggles_invalidate_solver_cache_and_worker():
+    rng = random.Random(6)
+    polymap, occluders = scene(rng)
+    solver = VisibilitySolver(polymap, MAP_SIZE, occluders=occluders)
+    cache = VisibilityCache(polymap, MAP_SIZE, occluders=occluders)
+    source = (600, 300)
+
+    with VisibilityWorker(MAP_SIZE) as worker:
+        for step in range(6):
+            reference = LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, occluders=occluders)
+            assert same_region(reference, expected(polymap, occluders, source), source, rng)
+
+            assert solver.build_visibility_triangles(source) == reference
+            assert cache.build_visibility_triangles(source) == reference
+            worker.submit(polymap, source, occluders)
+            assert worker.wait(10)
+            assert worker.latest() == (((polymap.version, occluders.version), source), reference)
+
+            occluders.toggle('door')
+            if step == 3:
+                polymap.add_tile(16, 2)
+
+    assert cache.misses == 6
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_solver_repairs_the_occluder_layer(seed):
+    rng = random.Random(seed)
+    polymap, occluders = scene(rng)
+    solver = VisibilitySolver(polymap, MAP_SIZE, max_moves=10 ** 6, occluders=occluders)
+    source = random_source(rng, polymap.tiles)
+
+    for frame in range(40):
+        choice = rng.random()
+        if choice < 0.3:
+            occluders.toggle(rng.choice(('door', 'beam', 'crate', 'hinge')))
+        elif choice < 0.6:
+            occluders.move('crate', rng.randint(-5, 5), rng.randint(-5, 5))
+        elif choice < 0.7:
+            occluders.add_segment(('npc', frame), (rng.uniform(450, 750), rng.uniform(50, 550)),
+                                  (rng.uniform(450, 750), rng.uniform(50, 550)))
+        elif choice < 0.8 and len(occluders) > 4:
+            occluders.remove(('npc', next(i for i in range(frame) if ('npc', i) in occluders)))
+        x, y = source[0] + rng.randint(-6, 6), source[1] + rng.randint(-6, 6)
+        if 0 < x < MAP_SIZE[0] and 0 < y < MAP_SIZE[1] and (x // TILE_SIZE, y // TILE_SIZE) not in polymap.tiles:
+            source = (x, y)
+
+        assert solver.build_visibility_triangles(source) == \
+            LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, occluders=occluders)
+
+    # As mudanças dos oclusores entram pelo reparo, só a primeira chamada ordena tudo
+    assert solver.full_sorts == 1
+
+
+def test_toggles_keep_the_cached_entries():
+    rng = random.Random(8)
+    polymap, occluders = scene(rng)
+    cache = VisibilityCache(polymap, MAP_SIZE, occluders=occluders)
+    source = (600, 300)
+
+    closed = cache.build_visibility_triangles(source)
+    occluders.toggle('door')
+    opened = cache.build_visibility_triangles(source)
+    assert closed != opened
+    assert list(cache.entries) == [(occluders.version - 1, source), (occluders.version, source)]
+    assert cache.build_visibility_triangles(source) is opened
+
+    # Editar o Polymap ainda descarta tudo
+    polymap.add_tile(16, 2)
+    cache.build_visibility_triangles(source)
+    assert list(cache.entries) == [(occluders.version, source)]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_door_blocks_the_light():
+    polymap = Polymap((20, 15), TILE_SIZE)
+    polymap.update([])
+    occluders = Occluders()
+    occluders.add_segment('door', (400, 0), (400, 600))
+    source, behind = (200, 300), (600, 300)
+
+    def lit() -> bool:
+        return LineOfSight.build_visibility_region(polymap, source, MAP_SIZE, occluders=occluders).contains(behind)
+
+    assert not lit()
+    occluders.toggle('door')
+    assert lit() and not occluders
+    occluders.toggle('door')
+    assert not lit()
+    occluders.remove('door')
+    assert lit()
+
+
+def test_parallel_with_occluders():
+    rng = random.Random(7)
+    polymap, occluders = scene(rng)
+    sources = [random_source(rng, polymap.tiles) for _ in range(8)]
+
+    with ParallelLineOfSight(workers=2, min_batch=1) as parallel:
+        for _ in range(2):
+            reference = [LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, occluders=occluders)
+                         for source in sources]
+            assert parallel.build_visibility_triangles(polymap, sources, MAP_SIZE, occluders=occluders) == reference
+            occluders.toggle('door')
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from edge import Edge
+from occupancy_grid import OccupancyGrid
+from polymap import Polymap
+from support import TILE_SIZE, random_tiles
+
+
+def grid_edges(grid: OccupancyGrid) -> set:
+    return {Edge((x0, y0), (x1, y1)) for x0, y0, x1, y1 in zip(*(column.tolist() for column in grid.edge_columns()))}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_edge_columns_match_convert_to_polygon(seed):
+    rng = random.Random(seed)
+    tiles = random_tiles(rng, rng.randrange(0, 120))
+    grid = OccupancyGrid((20, 15), TILE_SIZE)
+    for tile in tiles:
+        grid.add(tile)
+
+    assert set(grid) == tiles and len(grid) == len(tiles)
+    assert grid_edges(grid) == set(Polymap().convert_to_polygon(tiles, tile_size=TILE_SIZE))
+
+
+def test_fill_rects():
+    grid = OccupancyGrid((20, 15), TILE_SIZE)
+    grid.fill_rects([(0, 0, 40, 40), (85, 130, 40, 40)])
+    assert set(grid) == {(0, 0), (2, 3)}
+    grid.fill_rects([(0, 0, 40, 40)], filled=False)
+    assert set(grid) == {(2, 3)}
+    grid.fill_rects([])
+    assert set(grid) == {(2, 3)}
+
+    with pytest.raises(IndexError, match='outside the 20x15 grid'):
+        grid.fill_rects([(800, 0, 40, 40)])
+    with pytest.raises(IndexError):
+        grid.fill_rects([(-40, 0, 40, 40)], grow=True)
+    assert set(grid) == {(2, 3)}
+
+    grid.fill_rects([(1000, 100, 40, 40)], grow=True)
+    assert grid.size == (26, 15)
+    assert set(grid) == {(2, 3), (25, 2)}
+
+
+def test_resize_keeps_the_tiles_that_fit():
+    grid = OccupancyGrid((4, 4))
+    grid.add((1, 1))
+    grid.add((3, 3))
+    grid.resize((3, 6))
+    assert grid.size == (3, 6) and set(grid) == {(1, 1)}
+    assert (2, 5) not in grid and (5, 5) not in grid
+
+
+def test_polymap_grows_to_fit_the_rects():
+    polymap = Polymap()
+    edges = polymap.update([(1000, 100, 40, 40), (80, 80, 40, 40)])
+    assert len(edges) == 8
+    assert polymap.tiles.size == (26, 15)
+    assert set(edges) == set(polymap.convert_to_polygon({(25, 2), (2, 2)}))
+
+    with pytest.raises(IndexError):
+        polymap.add_tile(30, 2)
@@ -0,0 +1,45 @@
+import random
+
+import parallel_line_of_sight
+from line_of_sight import LineOfSight
+from parallel_line_of_sight import ParallelLineOfSight, build_in_worker
+from support import MAP_SIZE, plain_edges, random_polymap, random_source
+
+
+def test_pool_matches_plain_edges():
+    rng = random.Random(1)
+    polymap = random_polymap(rng, 40)
+    sources = [random_source(rng, polymap.tiles) for _ in range(12)]
+
+    with ParallelLineOfSight(workers=2, min_batch=1) as parallel:
+        for max_radius in (None, 150):
+            expected = [LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE, max_radius)
+                        for source in sources]
+            assert parallel.build_visibility_triangles(polymap, sources, MAP_SIZE, max_radius) == expected
+
+        # Depois de uma edição as paredes são publicadas de novo
+        tile = next((x, 0) for x in range(20) if (x, 0) not in polymap.tiles)
+        polymap.add_tile(*tile)
+        expected = [LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE) for source in sources]
+        assert parallel.build_visibility_triangles(polymap, sources, MAP_SIZE) == expected
+
+
+def test_worker_keeps_adjacency_per_block():
+    rng = random.Random(2)
+    polymap = random_polymap(rng, 30)
+    sources = [random_source(rng, polymap.tiles) for _ in range(3)]
+
+    parallel = ParallelLineOfSight(workers=2)
+    try:
+        parallel.publish(polymap)
+        task = (parallel.block.name, parallel.count, sources, MAP_SIZE, None, None, None)
+        assert build_in_worker(task) == [LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE)
+                                         for source in sources]
+
+        worker_map = parallel_line_of_sight.worker_maps[parallel.block.name]
+        adjacency = worker_map.adjacency[MAP_SIZE]
+        build_in_worker(task)
+        assert worker_map.adjacency[MAP_SIZE] is adjacency
+    finally:
+        parallel.close()
+        parallel_line_of_sight.worker_maps.clear()
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from line_of_sight import LineOfSight
+from polymap import Polymap
+from support import MAP_SIZE, TILE_SIZE, random_polymap, random_source, random_tiles, same_region
+
+
+def unit_sides(edges) -> set:
+    """The edges split into tile sides, without direction."""
+    sides = set()
+    for edge in edges:
+        (x0, y0), (x1, y1) = edge.start, edge.end
+        steps = int(max(abs(x1 - x0), abs(y1 - y0)) // TILE_SIZE)
+        dx, dy = (x1 - x0) / steps, (y1 - y0) / steps
+        for i in range(steps):
+            start = (x0 + i * dx, y0 + i * dy)
+            end = (x0 + (i + 1) * dx, y0 + (i + 1) * dy)
+            sides.add((start, end) if start <= end else (end, start))
+    return sides
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_contours_cover_the_polygon_sides(seed):
+    rng = random.Random(seed)
+    tiles = random_tiles(rng, rng.randrange(1, 120))
+    polymap = Polymap()
+    contours = polymap.convert_to_contours(tiles)
+
+    assert unit_sides(Polymap.contours_to_edges(contours)) == unit_sides(polymap.convert_to_polygon(tiles))
+
+    # Nenhum vértice fica no meio de um segmento reto
+    for contour in contours:
+        for i in range(len(contour)):
+            assert Polymap.contour_direction(contour[i - 1], contour[i]) != \
+                Polymap.contour_direction(contour[i], contour[(i + 1) % len(contour)])
+
+
+def test_contour_orientation():
+    # Um anel de 3x3 tiles tem um contorno externo e um buraco
+    tiles = {(x, y) for x in range(3) for y in range(3)} - {(1, 1)}
+    contours = Polymap().convert_to_contours(tiles)
+    areas = sorted(Polymap.contour_area(contour) for contour in contours)
+    assert areas == [-TILE_SIZE ** 2, 9 * TILE_SIZE ** 2]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_traced_polymap_matches_plain_edges(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        polymap = random_polymap(rng, rng.randrange(0, 60), trace_contours=True)
+        walls = polymap.convert_to_polygon(set(polymap.tiles))
+        source = random_source(rng, polymap.tiles)
+        assert same_region(LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE),
+                           LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE), source, rng)
+
+
+def edge_keys(edges) -> set:
+    return {(edge.start, edge.end) if edge.start <= edge.end else (edge.end, edge.start) for edge in edges}
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_patched_tiles_match_full_rebuild(seed):
+    rng = random.Random(seed)
+    polymap = random_polymap(rng, 30)
+
+    for _ in range(150):
+        x, y = rng.randrange(20), rng.randrange(15)
+        version = polymap.version
+        if (x, y) in polymap.tiles:
+            assert polymap.remove_tile(x, y)
+            assert not polymap.remove_tile(x, y)
+        else:
+            assert polymap.add_tile(x, y)
+            assert not polymap.add_tile(x, y)
+        assert polymap.version == version + 1
+        assert edge_keys(polymap.edges) == edge_keys(polymap.convert_to_polygon(set(polymap.tiles)))
+
+    source = random_source(rng, polymap.tiles)
+    assert LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE) == \
+        LineOfSight.build_visibility_triangles(polymap.convert_to_polygon(set(polymap.tiles)), source, MAP_SIZE)
+
+
+def test_patched_edge_grid_stays_in_sync():
+    rng = random.Random(5)
+    polymap = random_polymap(rng, 40)
+    polymap.edge_grid.ensure()
+
+    for _ in range(60):
+        x, y = rng.randrange(20), rng.randrange(15)
+        if not polymap.add_tile(x, y):
+            polymap.remove_tile(x, y)
+    assert edge_keys(polymap.edge_grid) == edge_keys(polymap.edges)
+
+
+def test_patched_traced_contours_match_full_rebuild():
+    rng = random.Random(6)
+    polymap = random_polymap(rng, 30, trace_contours=True)
+
+    for _ in range(20):
+        x, y = rng.randrange(20), rng.randrange(15)
+        if not polymap.add_tile(x, y):
+            polymap.remove_tile(x, y)
+        assert polymap.contours == polymap.convert_to_contours(polymap.tiles)
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+pygame = pytest.importorskip('pygame')
+
+from lightmap import Light, Lightmap
+from line_of_sight import LineOfSight
+from occluders import Occluders
+from render import LayeredRenderer, LightLayer, draw_filled_tiles, draw_grid, draw_occluders, draw_polymap, draw_visibility
+from support import MAP_SIZE, TILE_SIZE, random_polymap, random_source
+
+BLACK, GRAY, RED, LIGHT, BROWN = (0, 0, 0), (100, 100, 100), (255, 0, 0), (255, 240, 180), (150, 100, 50)
+RADIUS = 10
+
+
+@pytest.fixture
+def screen():
+    pygame.display.init()
+    yield pygame.display.set_mode(MAP_SIZE)
+    pygame.display.quit()
+
+
+def full_frame(screen, renderer, polymap, source, occluders=None) -> bytes:
+    """The scene drawn from scratch, like the demo without dirty rendering."""
+    screen.fill(BLACK)
+    draw_filled_tiles(screen, polymap, GRAY)
+    draw_polymap(polymap, screen, RED)
+    triangles = LineOfSight.build_visibility_triangles(polymap, source, MAP_SIZE, occluders=occluders)
+    if renderer.light_radius is None:
+        draw_visibility(screen, triangles, LIGHT)
+    else:
+        lightmap = Lightmap(MAP_SIZE)
+        if lightmap.add(Light(tuple(source), LIGHT, 1.0, renderer.light_radius), triangles):
+            layer = LightLayer(MAP_SIZE)
+            layer.upload(lightmap)
+            layer.draw(screen)
+    if occluders is not None:
+        draw_occluders(screen, occluders, BROWN)
+    pygame.draw.circle(screen, RED, source, RADIUS)
+    grid = pygame.Surface(MAP_SIZE)
+    grid.fill(LayeredRenderer.colorkey)
+    grid.set_colorkey(LayeredRenderer.colorkey)
+    draw_grid(grid, TILE_SIZE, GRAY)
+    screen.blit(grid, (0, 0))
+    return pygame.image.tobytes(screen, 'RGB')
+
+
+def dirty_frame(screen, renderer, polymap, source, occluders=None) -> bytes:
+    def visibility(point):
+        return LineOfSight.build_visibility_triangles(polymap, point, MAP_SIZE, occluders=occluders)
+
+    renderer.render(polymap, source, RADIUS, visibility, None, occluders)
+    return pygame.image.tobytes(screen, 'RGB')
+
+
+@pytest.mark.parametrize('light_radius', (None, 300))
+def test_dirty_rendering_matches_full_redraw(screen, light_radius):
+    polymap = random_polymap(random.Random(1), 25)
+    renderer = LayeredRenderer(screen, TILE_SIZE, BLACK, GRAY, RED, GRAY, LIGHT, RED, light_radius, BROWN)
+    reference = pygame.Surface(MAP_SIZE)
+
+    source = (415, 305)
+    assert dirty_frame(screen, renderer, polymap, source) == full_frame(reference, renderer, polymap, source)
+
+    source = (452, 293)
+    assert dirty_frame(screen, renderer, polymap, source) == full_frame(reference, renderer, polymap, source)
+
+    if not polymap.add_tile(1, 1):
+        polymap.remove_tile(1, 1)
+    assert dirty_frame(screen, renderer, polymap, source) == full_frame(reference, renderer, polymap, source)
+
+    # Um salto longe apaga a luz antiga inteira
+    rng = random.Random(4)
+    for _ in range(3):
+        source = random_source(rng, polymap.tiles)
+        assert dirty_frame(screen, renderer, polymap, source) == full_frame(reference, renderer, polymap, source)
+
+
+def test_idle_frame_draws_nothing(screen):
+    polymap = random_polymap(random.Random(2), 10)
+    renderer = LayeredRenderer(screen, TILE_SIZE, BLACK, GRAY, RED, GRAY, LIGHT, RED)
+    renderer.render(polymap, (400, 300), RADIUS, lambda point: [])
+    assert renderer.render(polymap, (400, 300), RADIUS, None) == []
+
+
+def test_door_toggle_matches_full_redraw(screen):
+    polymap = random_polymap(random.Random(3), 20)
+    occluders = Occluders()
+    occluders.add_segment('door', (14 * TILE_SIZE, 5 * TILE_SIZE), (14 * TILE_SIZE, 10 * TILE_SIZE))
+    renderer = LayeredRenderer(screen, TILE_SIZE, BLACK, GRAY, RED, GRAY, LIGHT, RED, 300, BROWN)
+    reference = pygame.Surface(MAP_SIZE)
+
+    source = next((x, 300) for x in range(420, 540, 7) if (x // TILE_SIZE, 300 // TILE_SIZE) not in polymap.tiles)
+    frames = set()
+    for _ in range(3):
+        frame = dirty_frame(screen, renderer, polymap, source, occluders)
+        assert frame == full_frame(reference, renderer, polymap, source, occluders)
+        frames.add(frame)
+        occluders.toggle('door')
+    assert len(frames) == 2
+
+
+def test_door_toggle_redraws_only_around_the_door(screen):
+    polymap = random_polymap(random.Random(3), 20)
+    occluders = Occluders()
+    occluders.add_segment('door', (14 * TILE_SIZE, 5 * TILE_SIZE), (14 * TILE_SIZE, 10 * TILE_SIZE))
+    renderer = LayeredRenderer(screen, TILE_SIZE, BLACK, GRAY, RED, GRAY, LIGHT, RED, 150, BROWN)
+    reference = pygame.Surface(MAP_SIZE)
+
+    # A luz não alcança a porta, só a caixa dela muda
+    source = next((x, 300) for x in range(60, 200, 7) if (x // TILE_SIZE, 300 // TILE_SIZE) not in polymap.tiles)
+    dirty_frame(screen, renderer, polymap, source, occluders)
+    for _ in range(2):
+        occluders.toggle('door')
+        (area,) = renderer.render(polymap, source, RADIUS, lambda point: LineOfSight.build_visibility_triangles(
+            polymap, point, MAP_SIZE, occluders=occluders), None, occluders)
+        assert area.width * area.height < MAP_SIZE[0] * MAP_SIZE[1] // 2
+        assert pygame.image.tobytes(screen, 'RGB') == full_frame(reference, renderer, polymap, source, occluders)
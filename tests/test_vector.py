@@ -0,0 +1,80 @@
+import random
+from math import cos, pi, sin
+
+import numpy as np
+import pytest
+
+from vector import Vector2, Vector3
+from vector_array import Vector2Array, Vector3Array
+
+
+def original_rotate(point: Vector3, angle: float, axis: Vector3) -> tuple:
+    """Vector3.rotate before the sine and cosine were hoisted out of the matrix."""
+    x, y, z = point.x, point.y, point.z
+    u, v, w = axis.x, axis.y, axis.z
+    x_new = (u * (u * x + v * y + w * z) * (1 - cos(angle)) +
+             x * cos(angle) +
+             (-w * y + v * z) * sin(angle))
+    y_new = (v * (u * x + v * y + w * z) * (1 - cos(angle)) +
+             y * cos(angle) +
+             (w * x - u * z) * sin(angle))
+    z_new = (w * (u * x + v * y + w * z) * (1 - cos(angle)) +
+             z * cos(angle) +
+             (-v * x + u * y) * sin(angle))
+    return (x_new, y_new, z_new)
+
+
+def random_vector3(rng, scale: float = 100) -> Vector3:
+    return Vector3(rng.uniform(-scale, scale), rng.uniform(-scale, scale), rng.uniform(-scale, scale))
+
+
+def test_rotate_is_bit_identical():
+    rng = random.Random(1)
+    for _ in range(20000):
+        point = random_vector3(rng)
+        axis = random_vector3(rng, 1).normalize()
+        angle = rng.uniform(-2 * pi, 2 * pi)
+        rotated = point.rotate(angle, axis)
+        assert (rotated.x, rotated.y, rotated.z) == original_rotate(point, angle, axis)
+
+
+def test_vector3_array_matches_the_scalar_operations():
+    rng = random.Random(2)
+    points = [random_vector3(rng) for _ in range(50)]
+    others = [random_vector3(rng) for _ in range(50)]
+    axis = random_vector3(rng, 1).normalize()
+    array = Vector3Array.from_vectors(points)
+    other = Vector3Array.from_vectors(others)
+
+    assert len(array) == 50 and array[3] == points[3]
+    assert np.allclose(array.distance(other), [a.distance(b) for a, b in zip(points, others)])
+    assert np.allclose(array.dot_product(axis), [a.dot_product(axis) for a in points])
+    assert np.allclose(array.cossine(other), [a.cossine(b) for a, b in zip(points, others)])
+    assert np.allclose(array.length(), [a.length() for a in points])
+    assert (array.is_clockwise(other, axis) == [a.is_clockwise(b, axis) for a, b in zip(points, others)]).all()
+
+    for result, expected in ((array + other, [a + b for a, b in zip(points, others)]),
+                             (array - axis, [a - axis for a in points]),
+                             (array * 2.5, [a * 2.5 for a in points]),
+                             (array.cross_product(other), [a.cross_product(b) for a, b in zip(points, others)]),
+                             (array.normalize(), [a.normalize() for a in points]),
+                             (array.rotate(0.7, axis), [a.rotate(0.7, axis) for a in points])):
+        assert all(result.is_equal_with_tolerance(Vector3Array.from_vectors(expected), 1e-9))
+
+    assert array.truncate().to_vectors() == [a.truncate() for a in points]
+    assert np.allclose(array.distance_matrix(other)[4, 7], points[4].distance(others[7]))
+
+
+def test_vector2_array_matches_the_scalar_operations():
+    rng = random.Random(3)
+    points = [Vector2(rng.uniform(-100, 100), rng.uniform(-100, 100)) for _ in range(50)]
+    array = Vector2Array.from_vectors(points)
+    origin = Vector2(3, -4)
+
+    assert np.allclose(array.angle(), [a.angle() for a in points])
+    assert np.allclose(array.cross_product(origin), [a.cross_product(origin) for a in points])
+    assert np.allclose(array.distance_squared(origin), [a.distance_squared(origin) for a in points])
+    rotated = array.rotate(-1.3)
+    for result, expected in zip(rotated, (a.rotate(-1.3) for a in points)):
+        assert result.x == pytest.approx(expected.x) and result.y == pytest.approx(expected.y)
+    assert Vector2Array(np.zeros((2, 2))).normalize().to_vectors() == [Vector2(0, 0), Vector2(0, 0)]
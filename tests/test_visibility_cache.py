@@ -0,0 +1,57 @@
+import random
+
+from line_of_sight import LineOfSight
+from support import MAP_SIZE, plain_edges, random_polymap, random_source
+from visibility_cache import VisibilityCache
+
+
+def test_cache_matches_plain_edges():
+    rng = random.Random(1)
+    polymap = random_polymap(rng, 40)
+    cache = VisibilityCache(polymap, MAP_SIZE)
+
+    for _ in range(30):
+        source = random_source(rng, polymap.tiles)
+        assert cache.build_visibility_triangles(source) == \
+            LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE)
+
+
+def test_hits_and_snapping():
+    polymap = random_polymap(random.Random(2), 0)
+    cache = VisibilityCache(polymap, MAP_SIZE, grid=10)
+
+    first = cache.build_visibility_triangles((101, 99))
+    assert cache.build_visibility_triangles((104, 96)) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first == LineOfSight.build_visibility_triangles([], (100, 100), MAP_SIZE)
+
+
+def test_edits_invalidate_the_entries():
+    rng = random.Random(3)
+    polymap = random_polymap(rng, 20)
+    cache = VisibilityCache(polymap, MAP_SIZE)
+    source = (10, 10)
+    before = cache.build_visibility_triangles(source)
+
+    tile = next((x, 2) for x in range(20) if (x, 2) not in polymap.tiles)
+    assert polymap.add_tile(*tile)
+    after = cache.build_visibility_triangles(source)
+    assert cache.misses == 2
+    assert after != before
+    assert after == LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE)
+
+    polymap.update([])
+    assert cache.build_visibility_triangles(source) == LineOfSight.build_visibility_triangles([], source, MAP_SIZE)
+    assert cache.misses == 3
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = VisibilityCache(random_polymap(random.Random(4), 10), MAP_SIZE, capacity=2)
+    cache.build_visibility_triangles((10, 10))
+    cache.build_visibility_triangles((20, 20))
+    cache.build_visibility_triangles((10, 10))
+    cache.build_visibility_triangles((30, 30))
+
+    assert list(cache.entries) == [(None, (10, 10)), (None, (30, 30))]
+    cache.build_visibility_triangles((20, 20))
+    assert cache.misses == 4
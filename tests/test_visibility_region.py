@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+import pytest
+
+from line_of_sight import LineOfSight
+from support import MAP_SIZE, orientation, random_polymap, random_source
+from visibility_region import VisibilityRegion
+
+
+def in_triangles(triangles: list, point) -> bool:
+    """Brute force: the point is inside, or on the border of, one of the triangles."""
+    for a, b, c in triangles:
+        sides = (orientation(a, b, point), orientation(b, c, point), orientation(c, a, point))
+        if orientation(a, b, c) != 0 and (min(sides) >= 0 or max(sides) <= 0):
+            return True
+    return False
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_contains_matches_the_triangles(seed):
+    rng = random.Random(seed)
+    for _ in range(5):
+        polymap = random_polymap(rng, rng.randrange(0, 60))
+        source = random_source(rng, polymap.tiles, integer=False)
+        triangles = LineOfSight.build_visibility_triangles(list(polymap.edges), source, MAP_SIZE)
+        region = LineOfSight.build_visibility_region(list(polymap.edges), source, MAP_SIZE)
+        assert list(region) == triangles
+
+        points = [(rng.uniform(0, MAP_SIZE[0]), rng.uniform(0, MAP_SIZE[1])) for _ in range(300)]
+        expected = [in_triangles(triangles, point) for point in points]
+        assert [region.contains(point) for point in points] == expected
+        assert region.contains_many(np.array(points)).tolist() == expected
+
+
+def test_source_and_empty_region():
+    region = LineOfSight.build_visibility_region([], (400, 300), MAP_SIZE)
+    assert (400, 300) in region
+    assert (0, 0) in region and (800, 600) in region
+
+    empty = VisibilityRegion((400, 300), [])
+    assert not empty and (400, 300) not in empty
+    assert empty.contains_many(np.array([(1.0, 2.0)])).tolist() == [False]
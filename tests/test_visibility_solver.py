@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from line_of_sight import LineOfSight
+from support import MAP_SIZE, TILE_SIZE, plain_edges, random_polymap, random_source
+from visibility_solver import VisibilitySolver
+
+
+def drag(rng, polymap, start, steps: int, step: int = 6):
+    """Positions of a source dragged a few pixels at a time, staying off the tiles."""
+    x, y = start
+    for _ in range(steps):
+        nx = min(max(x + rng.randint(-step, step), 1), MAP_SIZE[0] - 1)
+        ny = min(max(y + rng.randint(-step, step), 1), MAP_SIZE[1] - 1)
+        if (nx // TILE_SIZE, ny // TILE_SIZE) not in polymap.tiles:
+            x, y = nx, ny
+        yield (x, y)
+
+
+@pytest.mark.parametrize('max_moves', (None, 0, 10 ** 6))
+def test_dragged_source_matches_plain_edges(max_moves):
+    rng = random.Random(5)
+    for _ in range(3):
+        polymap = random_polymap(rng, rng.randrange(10, 60))
+        walls = plain_edges(polymap)
+        solver = VisibilitySolver(polymap, MAP_SIZE, max_moves=max_moves)
+        for source in drag(rng, polymap, random_source(rng, polymap.tiles), 40):
+            assert solver.build_visibility_triangles(source) == \
+                LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE)
+
+    if max_moves == 0:
+        assert solver.repairs == 0
+    elif max_moves is not None:
+        assert solver.full_sorts == 1
+
+
+def test_jumps_and_edits_between_frames():
+    rng = random.Random(6)
+    polymap = random_polymap(rng, 40)
+    solver = VisibilitySolver(polymap, MAP_SIZE)
+
+    for frame in range(60):
+        if frame % 10 == 9:
+            tile = (rng.randrange(20), rng.randrange(15))
+            if tile in polymap.tiles:
+                polymap.remove_tile(*tile)
+            else:
+                polymap.add_tile(*tile)
+        source = random_source(rng, polymap.tiles)
+        assert solver.build_visibility_triangles(source) == \
+            LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE)
+
+
+def test_same_source_returns_the_same_triangles():
+    polymap = random_polymap(random.Random(7), 30)
+    solver = VisibilitySolver(polymap, MAP_SIZE)
+    source = random_source(random.Random(8), polymap.tiles)
+    assert solver.build_visibility_triangles(source) is solver.build_visibility_triangles(source)
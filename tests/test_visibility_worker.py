@@ -0,0 +1,82 @@
+import random
+import threading
+
+from instrumentation import Instrumentation
+from line_of_sight import LineOfSight
+from support import MAP_SIZE, plain_edges, random_polymap, random_source
+from visibility_worker import VisibilityWorker
+
+
+def test_results_match_plain_edges():
+    rng = random.Random(1)
+    polymap = random_polymap(rng, 40)
+
+    with VisibilityWorker(MAP_SIZE) as worker:
+        assert worker.latest() is None
+        for step in range(20):
+            if step % 5 == 4:
+                tile = (rng.randrange(20), rng.randrange(15))
+                if tile in polymap.tiles:
+                    polymap.remove_tile(*tile)
+                else:
+                    polymap.add_tile(*tile)
+            source = random_source(rng, polymap.tiles)
+            worker.submit(polymap, source)
+            assert worker.wait(10)
+
+            key, triangles = worker.latest()
+            assert key == ((polymap.version, None), source)
+            assert triangles == LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE)
+
+
+def test_edits_after_submit_do_not_reach_the_solve():
+    rng = random.Random(2)
+    polymap = random_polymap(rng, 30)
+    source = random_source(rng, polymap.tiles)
+    expected = LineOfSight.build_visibility_triangles(plain_edges(polymap), source, MAP_SIZE)
+
+    with VisibilityWorker(MAP_SIZE) as worker:
+        worker.submit(polymap, source)
+        polymap.update([])
+        assert worker.wait(10)
+        assert worker.latest()[1] == expected
+
+
+def test_newest_request_wins():
+    rng = random.Random(3)
+    polymap = random_polymap(rng, 30)
+    sources = [random_source(rng, polymap.tiles) for _ in range(30)]
+
+    with VisibilityWorker(MAP_SIZE) as worker:
+        for source in sources:
+            worker.submit(polymap, source)
+        assert worker.wait(10)
+        assert worker.latest()[0] == ((polymap.version, None), sources[-1])
+        assert worker.completed + worker.dropped == len(sources)
+
+
+def test_records_of_threads_do_not_mix():
+    rng = random.Random(4)
+    polymap = random_polymap(rng, 40)
+    walls = plain_edges(polymap)
+    sources = [random_source(rng, polymap.tiles) for _ in range(20)]
+    results = {}
+
+    def solve(name, sources):
+        results[name] = [LineOfSight.build_visibility_triangles(walls, source, MAP_SIZE) for source in sources]
+
+    stats = Instrumentation.enable()
+    try:
+        threads = [threading.Thread(target=solve, args=(name, sources[name::2])) for name in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        Instrumentation.disable()
+
+    triangles = sorted(record['counters']['triangles'] for record in stats.records)
+    assert len(triangles) == len(sources)
+    assert triangles == sorted(len(result) for name in results for result in results[name])
+    # Cada registro tem os estágios de uma única chamada
+    assert all(record['counters']['vertices'] == stats.records[0]['counters']['vertices'] for record in stats.records)
@@ -6,6 +6,8 @@ class Vector3:
     Class to represent a point in 3D space. Each point has an x, y, and z coordinate.
     """
 
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, x: int, y: int, z: int):
         self.x = x
         self.y = y
@@ -73,16 +75,22 @@ class Vector3:
         v = axis.y
         w = axis.z
 
+        # O seno e o cosseno são calculados uma vez só, sem mudar a ordem das operações da matriz
+        c = cos(angle)
+        s = sin(angle)
+        t = 1 - c
+        dot = u * x + v * y + w * z
+
         #apply the rotation matrix
-        x_new = (u * (u * x + v * y + w * z) * (1 - cos(angle)) +
-                 x * cos(angle) +
-                 (-w * y + v * z) * sin(angle))
-        y_new = (v * (u * x + v * y + w * z) * (1 - cos(angle)) +
-                 y * cos(angle) +
-                 (w * x - u * z) * sin(angle))
-        z_new = (w * (u * x + v * y + w * z) * (1 - cos(angle)) +
-                 z * cos(angle) +
-                 (-v * x + u * y) * sin(angle))
+        x_new = (u * dot * t +
+                 x * c +
+                 (-w * y + v * z) * s)
+        y_new = (v * dot * t +
+                 y * c +
+                 (w * x - u * z) * s)
+        z_new = (w * dot * t +
+                 z * c +
+                 (-v * x + u * y) * s)
 
         return Vector3(x_new, y_new, z_new)
     
@@ -115,6 +123,8 @@ class Vector2:
     Class to represent a point in 2D space. Each point has an x and y coordinate.
     """
 
+    __slots__ = ('x', 'y')
+
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
@@ -163,6 +173,12 @@ class Vector2:
     def truncate(self) -> Vector2:
         """Truncate the current point"""
         return Vector2(int(self.x), int(self.y))
+
+    def rotate(self, angle: float) -> Vector2:
+        """Rotate the current point around the origin by a given angle"""
+        c = cos(angle)
+        s = sin(angle)
+        return Vector2(self.x * c - self.y * s, self.x * s + self.y * c)
     
     def __add__(self, other: Vector2) -> Vector2:
         return Vector2(self.x + other.x, self.y + other.y)
@@ -178,4 +194,3 @@ class Vector2:
     
     def __eq__(self, other: Vector2) -> bool:
         return self.x == other.x and self.y == other.y
-    
\ No newline at end of file
@@ -0,0 +1,195 @@
+from __future__ import annotations
+from math import cos, sin
+import numpy as np
+from vector import Vector2, Vector3
+
+
+class VectorArray:
+    """
+    Many points stored in one contiguous (n, dimension) float64 array, so operations run over
+    all of them at once without creating an object per point.
+
+    The operations of Vector2 and Vector3 work element by element against another array of
+    the same length or against a single vector, which is broadcast to every point. Products
+    and lengths return NumPy arrays, operations producing points return a new array of the
+    same type.
+    """
+
+    __slots__ = ('data',)
+
+    # Dimensão dos pontos e classe escalar, definidas nas subclasses
+    dimension = 0
+    scalar = None
+
+    def __init__(self, data):
+        data = np.array(data, dtype=np.float64)
+        self.data = data.reshape(-1, self.dimension)
+
+    @classmethod
+    def from_vectors(cls, vectors) -> VectorArray:
+        return cls([[getattr(vector, axis) for axis in cls.scalar.__slots__] for vector in vectors])
+
+    @classmethod
+    def operand(cls, other) -> np.ndarray:
+        """Data of another array, or a single vector as a row that broadcasts."""
+        if isinstance(other, VectorArray):
+            return other.data
+        if isinstance(other, cls.scalar):
+            return np.array([getattr(other, axis) for axis in cls.scalar.__slots__], dtype=np.float64)
+        return np.asarray(other, dtype=np.float64)
+
+    def broadcast(self, other) -> np.ndarray:
+        """Data of the other operand with one point for each point of this array."""
+        return np.broadcast_to(self.operand(other), self.data.shape)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.scalar(*self.data[index].tolist())
+        return type(self)(self.data[index])
+
+    def __iter__(self):
+        for row in self.data.tolist():
+            yield self.scalar(*row)
+
+    def to_vectors(self) -> list:
+        return list(self)
+
+    def __add__(self, other) -> VectorArray:
+        return type(self)(self.data + self.operand(other))
+
+    def __sub__(self, other) -> VectorArray:
+        return type(self)(self.data - self.operand(other))
+
+    def __mul__(self, scalar) -> VectorArray:
+        """Multiply by a number, or by an (n,) array of numbers, one per point."""
+        return type(self)(self.data * np.reshape(scalar, (-1, 1)))
+
+    def __truediv__(self, scalar) -> VectorArray:
+        return type(self)(self.data / np.reshape(scalar, (-1, 1)))
+
+    def __eq__(self, other) -> np.ndarray:
+        return np.all(self.data == self.operand(other), axis=-1)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.data.tolist()})'
+
+    def dot_product(self, other) -> np.ndarray:
+        return np.einsum('ij,ij->i', self.data, self.broadcast(other))
+
+    def length_squared(self) -> np.ndarray:
+        return np.einsum('ij,ij->i', self.data, self.data)
+
+    def length(self) -> np.ndarray:
+        return np.sqrt(self.length_squared())
+
+    def distance_squared(self, other) -> np.ndarray:
+        difference = self.data - self.operand(other)
+        return np.einsum('ij,ij->i', difference, difference)
+
+    def distance(self, other) -> np.ndarray:
+        return np.sqrt(self.distance_squared(other))
+
+    def distance_matrix(self, other: VectorArray = None, squared: bool = False) -> np.ndarray:
+        """
+        Distances between every point of this array and every point of the other, by default
+        this array itself, as an (n, m) array.
+        """
+        other = self.data if other is None else self.operand(other).reshape(-1, self.dimension)
+        difference = self.data[:, None, :] - other[None, :, :]
+        distance = np.einsum('ijk,ijk->ij', difference, difference)
+        return distance if squared else np.sqrt(distance)
+
+    def cossine(self, other) -> np.ndarray:
+        """Cossine of the angle with the other points, 0 where one of them has length 0"""
+        other = self.broadcast(other)
+        lengths = self.length() * np.sqrt(np.einsum('ij,ij->i', other, other))
+        dot = np.einsum('ij,ij->i', self.data, other)
+        return np.divide(dot, lengths, out=np.zeros_like(dot), where=lengths != 0)
+
+    def normalize(self) -> VectorArray:
+        """Unit vectors, the points of length 0 stay at the origin"""
+        lengths = self.length()[:, None]
+        return type(self)(np.divide(self.data, lengths, out=np.zeros_like(self.data), where=lengths != 0))
+
+    def is_equal_with_tolerance(self, other, tolerance: float) -> np.ndarray:
+        return np.all(np.abs(self.data - self.operand(other)) < tolerance, axis=-1)
+
+    def truncate(self) -> VectorArray:
+        return type(self)(np.trunc(self.data))
+
+
+class Vector2Array(VectorArray):
+    """
+    Array of 2D points, with the operations of Vector2.
+    """
+
+    __slots__ = ()
+    dimension = 2
+    scalar = Vector2
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.data[:, 1]
+
+    def cross_product(self, other) -> np.ndarray:
+        other = self.broadcast(other)
+        return self.data[:, 0] * other[:, 1] - self.data[:, 1] * other[:, 0]
+
+    def angle(self) -> np.ndarray:
+        return np.arctan2(self.data[:, 1], self.data[:, 0])
+
+    def rotate(self, angle: float) -> Vector2Array:
+        """Rotate every point around the origin by the same angle"""
+        c = cos(angle)
+        s = sin(angle)
+        return Vector2Array(self.data @ np.array([[c, s], [-s, c]]))
+
+
+class Vector3Array(VectorArray):
+    """
+    Array of 3D points, with the operations of Vector3.
+    """
+
+    __slots__ = ()
+    dimension = 3
+    scalar = Vector3
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.data[:, 1]
+
+    @property
+    def z(self) -> np.ndarray:
+        return self.data[:, 2]
+
+    def cross_product(self, other) -> Vector3Array:
+        return Vector3Array(np.cross(self.data, self.operand(other)))
+
+    def is_clockwise(self, other, normal) -> np.ndarray:
+        return self.cross_product(other).dot_product(normal) > 0
+
+    def rotate(self, angle: float, axis: Vector3) -> Vector3Array:
+        """Rotate every point around the same unit axis by the same angle"""
+        u, v, w = axis.x, axis.y, axis.z
+        c = cos(angle)
+        s = sin(angle)
+        t = 1 - c
+
+        # Matriz de rotação em torno do eixo, montada uma vez para todos os pontos
+        matrix = np.array([[u * u * t + c, u * v * t - w * s, u * w * t + v * s],
+                           [v * u * t + w * s, v * v * t + c, v * w * t - u * s],
+                           [w * u * t - v * s, w * v * t + u * s, w * w * t + c]])
+        return Vector3Array(self.data @ matrix.T)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+from collections import OrderedDict
+from occluders import Occluders
+from polymap import Polymap
+from visibility_solver import VisibilitySolver
+
+
+class VisibilityCache:
+    """
+    Least recently used cache of visibility triangles of a Polymap.
+
+    Sources are snapped to a grid of `grid` pixels and the triangles are computed from the
+    snapped position, so every source inside the same cell shares one entry. The entries
+    belong to one geometry version of the Polymap and are dropped as soon as the map changes
+    through Polymap.update, add_tile or remove_tile. The occluders, if given, change much more
+    often, like a door opening or an NPC walking, so their version is part of the key instead:
+    the entries of older versions are never hit again and leave the cache as the least
+    recently used ones. Misses are computed by a VisibilitySolver, since consecutive misses
+    usually come from a source being dragged.
+    """
+
+    def __init__(self, polymap: Polymap, map_size: tuple[int, int], grid: int = 1, capacity: int = 256,
+                 occluders: Occluders = None):
+        self.polymap = polymap
+        self.occluders = occluders
+        self.map_size = map_size
+        self.grid = grid
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.solver = VisibilitySolver(polymap, map_size, occluders=occluders)
+        self.version = polymap.version
+        self.hits = 0
+        self.misses = 0
+
+    def snap(self, source: tuple[int, int]) -> tuple[int, int]:
+        """
+        Snap the source to the nearest point of the grid.
+        """
+        return (round(source[0] / self.grid) * self.grid, round(source[1] / self.grid) * self.grid)
+
+    def build_visibility_triangles(self, source: tuple[int, int]) -> list[tuple[int, int]]:
+        """
+        Return the visibility triangles from the snapped source, computing them on a miss.
+        """
+        if self.polymap.version != self.version:
+            self.clear()
+            self.version = self.polymap.version
+
+        snapped = self.snap(source)
+        key = (None if self.occluders is None else self.occluders.version, snapped)
+        triangles = self.entries.get(key)
+
+        if triangles is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return triangles
+
+        self.misses += 1
+        triangles = self.solver.build_visibility_triangles(snapped)
+        self.entries[key] = triangles
+
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+        return triangles
+
+    def clear(self):
+        """
+        Drop every entry, keeping the counters.
+        """
+        self.entries.clear()
+
+    def hit_rate(self) -> float:
+        """
+        Fraction of the queries answered from the cache.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,107 @@
+from __future__ import annotations
+from bisect import bisect_right
+from math import atan2, pi
+
+
+class VisibilityRegion:
+    """
+    Region seen from a source, built from its visibility triangles, that answers whether
+    points are inside it.
+
+    Every triangle of the fan covers an angle around the source and is closed by the wall
+    segment opposite to it. The angles are kept sorted, so a point is found by a binary search
+    on its angle around the source and one orientation test against the segment of that
+    angle, in O(log n) per point. Triangles crossing the -pi angle are split in two.
+    """
+
+    __slots__ = ('source', 'triangles', 'starts', 'ends', 'segments', 'arrays')
+
+    def __init__(self, source: tuple[int, int], triangles: list):
+        self.source = tuple(source)
+        self.triangles = triangles
+        self.arrays = None
+
+        sx, sy = self.source
+        spans = []
+        for _, a, b in triangles:
+            turn = (a[0] - sx) * (b[1] - sy) - (a[1] - sy) * (b[0] - sx)
+            if turn == 0:
+                continue
+
+            # Cada segmento fica com o ponto de menor ângulo primeiro
+            if turn < 0:
+                a, b = b, a
+            start = atan2(a[1] - sy, a[0] - sx)
+            end = atan2(b[1] - sy, b[0] - sx)
+            if end < start:
+                spans.append((start, pi, a, b))
+                spans.append((-pi, end, a, b))
+            else:
+                spans.append((start, end, a, b))
+
+        spans.sort(key=lambda span: span[0])
+        self.starts = [span[0] for span in spans]
+        self.ends = [span[1] for span in spans]
+        self.segments = [(span[2], span[3]) for span in spans]
+
+    def __iter__(self):
+        return iter(self.triangles)
+
+    def __len__(self) -> int:
+        return len(self.triangles)
+
+    def __bool__(self) -> bool:
+        return bool(self.triangles)
+
+    def contains(self, point: tuple[float, float]) -> bool:
+        """
+        Check if the point is inside the region, borders included.
+        """
+        sx, sy = self.source
+        dx = point[0] - sx
+        dy = point[1] - sy
+        if dx == 0 and dy == 0:
+            return bool(self.starts)
+
+        angle = atan2(dy, dx)
+        i = bisect_right(self.starts, angle) - 1
+        if i < 0 or angle > self.ends[i]:
+            return False
+
+        # O ponto tem que estar do mesmo lado do segmento que a fonte
+        a, b = self.segments[i]
+        ex = b[0] - a[0]
+        ey = b[1] - a[1]
+        return ex * (point[1] - a[1]) - ey * (point[0] - a[0]) >= 0
+
+    def __contains__(self, point: tuple[float, float]) -> bool:
+        return self.contains(point)
+
+    def contains_many(self, points):
+        """
+        Check an (N, 2) array of points at once. Returns an (N,) boolean array.
+        """
+        import numpy as np
+
+        if self.arrays is None:
+            segments = np.array(self.segments, dtype=np.float64).reshape(-1, 4)
+            self.arrays = (np.array(self.starts), np.array(self.ends), segments)
+        starts, ends, segments = self.arrays
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(starts) == 0:
+            return np.zeros(len(points), dtype=bool)
+
+        dx = points[:, 0] - self.source[0]
+        dy = points[:, 1] - self.source[1]
+        angles = np.arctan2(dy, dx)
+
+        i = np.searchsorted(starts, angles, side='right') - 1
+        found = i >= 0
+        i = np.maximum(i, 0)
+
+        a = segments[i, :2]
+        b = segments[i, 2:]
+        side = (b[:, 0] - a[:, 0]) * (points[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (points[:, 0] - a[:, 0])
+        inside = found & (angles <= ends[i]) & (side >= 0)
+        return inside | ((dx == 0) & (dy == 0))
@@ -0,0 +1,244 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from instrumentation import Instrumentation
+from line_of_sight import LineOfSight
+from occluders import Occluders
+from polymap import Polymap
+from time import perf_counter
+
+
+class VisibilitySolver:
+    """
+    Visibility triangles of one source that moves a little at a time over a Polymap, such as
+    the ball dragged in the demo, reusing the work done for its previous position.
+
+    The vertices are kept in the angular order of the last position. When the source moves
+    their keys are computed again and the order is repaired with an insertion sort, which only
+    touches the vertices that changed places. If more than `max_moves` vertices move, by
+    default an eighth of them, the repair stops paying off and the order is sorted again from
+    scratch. Whether each wall opens or closes at each of its vertices only changes for the
+    walls whose line the source crossed. For the axis aligned walls of a Polymap these are
+    found with a binary search on their coordinates, the other walls are checked on every
+    move.
+
+    The enabled occluders, if given, block the light like the walls. Their vertices and walls
+    are a layer over the vertices of the Polymap: when only the occluders change, like a door
+    opening or an NPC walking, the old layer is taken out of the order of the last position
+    and the new one is put in by the same insertion sort, so the cost depends on the number
+    of occluders and not on the map. The whole state is read again only when the Polymap
+    changes version.
+
+    The triangles are the same as LineOfSight.build_visibility_triangles with the Polymap and
+    the occluders.
+    """
+
+    def __init__(self, polymap: Polymap, map_size: tuple[int, int], max_moves: int = None, occluders: Occluders = None):
+        self.polymap = polymap
+        self.occluders = occluders
+        self.map_size = tuple(map_size)
+        self.max_moves = max_moves
+        self.version = None
+        self.source = None
+        self.triangles = []
+        self.repairs = 0
+        self.full_sorts = 0
+
+    def reset(self):
+        """
+        Drop the state of the previous position and read the vertices of the current geometry.
+        """
+        walls_per_vertex = LineOfSight.polymap_adjacency(self.polymap, self.map_size)
+        self.source = None
+        self.order = None
+        self.keys = None
+
+        self.vertices = list(walls_per_vertex)
+        self.others = [[other for _, other in walls_per_vertex[vertex]] for vertex in self.vertices]
+        self.incident = [[(wall, False) for wall, _ in walls_per_vertex[vertex]] for vertex in self.vertices]
+        self.static_count = len(self.vertices)
+        self.static_index = {vertex: i for i, vertex in enumerate(self.vertices)}
+
+        # Entradas (vértice, parede) por coordenada das paredes verticais e horizontais
+        vertical = {}
+        horizontal = {}
+        self.static_general = []
+        for i, vertex in enumerate(self.vertices):
+            for k, (wall, _) in enumerate(self.incident[i]):
+                (x0, y0), (x1, y1) = wall
+                if x0 == x1 and y0 != y1:
+                    vertical.setdefault(x0, []).append((i, k))
+                elif y0 == y1 and x0 != x1:
+                    horizontal.setdefault(y0, []).append((i, k))
+                else:
+                    self.static_general.append((i, k))
+
+        self.vertical_x = sorted(vertical)
+        self.vertical = [vertical[x] for x in self.vertical_x]
+        self.horizontal_y = sorted(horizontal)
+        self.horizontal = [horizontal[y] for y in self.horizontal_y]
+
+        self.general = list(self.static_general)
+        self.shared = []
+        self.merge_occluders()
+        self.version = self.geometry_version()
+
+    def merge_occluders(self):
+        """
+        Replace the layer of the occluders by the one of their current version.
+
+        The vertices of the Polymap keep their indices. The occluder vertices that are not
+        Polymap vertices come after them, in the order of LineOfSight.merge_adjacency, and
+        the walls of the occluders are added after the walls of each vertex. The order of the
+        last position loses the old occluder vertices and gets the new ones at its end, for
+        update_order to put in place. The occluder walls are checked on every move, like the
+        walls that are not axis aligned.
+        """
+        # Tira a camada anterior
+        del self.vertices[self.static_count:]
+        del self.others[self.static_count:]
+        del self.incident[self.static_count:]
+        for i, length in self.shared:
+            del self.others[i][length:]
+            del self.incident[i][length:]
+        if self.order is not None:
+            self.order = [i for i in self.order if i < self.static_count]
+        self.general = list(self.static_general)
+        self.shared = []
+
+        if self.occluders is None:
+            return
+
+        for vertex, entries in LineOfSight.occluder_adjacency(self.occluders, self.map_size[1]).items():
+            i = self.static_index.get(vertex)
+            if i is None:
+                i = len(self.vertices)
+                self.vertices.append(vertex)
+                self.others.append([])
+                self.incident.append([])
+                if self.order is not None:
+                    self.order.append(i)
+            else:
+                # Uma parede que já está na camada estática não entra duas vezes
+                walls = {wall for wall, _ in self.incident[i]}
+                entries = [entry for entry in entries if entry[0] not in walls]
+                if not entries:
+                    continue
+                self.shared.append((i, len(self.incident[i])))
+
+            for wall, other in entries:
+                self.general.append((i, len(self.incident[i])))
+                self.others[i].append(other)
+                self.incident[i].append((wall, False))
+
+    def geometry_version(self) -> tuple:
+        """
+        Versions of the Polymap and of the occluders, None without occluders.
+        """
+        return (self.polymap.version, None if self.occluders is None else self.occluders.version)
+
+    def build_visibility_triangles(self, source: tuple[int, int]) -> list[tuple[int, int]]:
+        """
+        Build the visibility triangles from the source, repairing the state of the last call.
+        """
+        version = self.geometry_version()
+        if version != self.version:
+            if self.version is not None and version[0] == self.version[0]:
+                # Só os oclusores mudaram, a posição anterior continua valendo para o resto
+                self.merge_occluders()
+                self.version = version
+                self.triangles = None
+            else:
+                self.reset()
+
+        ##### pygame stuff #######
+        # Invert the y-coordinate of the source point
+        source = (source[0], self.map_size[1] - source[1])
+        ##### pygame stuff #######
+
+        if source == self.source and self.triangles is not None:
+            return self.triangles
+
+        stats = Instrumentation.active
+        if stats is not None:
+            start = perf_counter()
+
+        previous = self.source
+        self.update_orientation(previous, source)
+        if stats is not None:
+            start = stats.stage('orientation', start)
+
+        self.update_order(source)
+        self.source = source
+        if stats is not None:
+            start = stats.stage('sort', start)
+
+        events = [(self.vertices[i], self.incident[i]) for i in self.order]
+        if stats is not None:
+            stats.stage('events', start)
+        self.triangles = LineOfSight.sweep_events(source, events, self.map_size)
+        return self.triangles
+
+    def update_orientation(self, previous: tuple[int, int], source: tuple[int, int]):
+        """
+        Recompute whether the walls end at each vertex for the walls whose line the source
+        crossed going from the previous position to the new one.
+        """
+        if previous is None:
+            entries = [(i, k) for i in range(len(self.vertices)) for k in range(len(self.incident[i]))]
+        else:
+            entries = list(self.general)
+            for coordinates, groups, axis in ((self.vertical_x, self.vertical, 0), (self.horizontal_y, self.horizontal, 1)):
+                low, high = sorted((previous[axis], source[axis]))
+                for group in groups[bisect_left(coordinates, low):bisect_right(coordinates, high)]:
+                    entries.extend(group)
+
+        for i, k in entries:
+            incident = self.incident[i]
+            wall = incident[k][0]
+            incident[k] = (wall, LineOfSight.is_clockwise(source, self.others[i][k], self.vertices[i]))
+
+    def update_order(self, source: tuple[int, int]):
+        """
+        Sort the vertices by angle from the source, starting from the order of the last call.
+        """
+        # Empates ficam na ordem dos vértices, como no sorted do LineOfSight. Se só os oclusores
+        # mudaram, as chaves dos vértices do Polymap são as da última chamada
+        count = self.static_count
+        if source == self.source and self.keys is not None:
+            keys = self.keys[:count]
+        else:
+            keys = [(LineOfSight.pseudo_angle(source, vertex), i) for i, vertex in enumerate(self.vertices[:count])]
+        keys += [(LineOfSight.pseudo_angle(source, self.vertices[i]), i) for i in range(count, len(self.vertices))]
+        self.keys = keys
+
+        order = self.order
+        if order is not None:
+            moves = 0
+            max_moves = len(order) // 8 if self.max_moves is None else self.max_moves
+            for i in range(1, len(order)):
+                item = order[i]
+                key = keys[item]
+                if key < keys[order[i - 1]]:
+                    moves += 1
+                    if moves > max_moves:
+                        order = None
+                        break
+
+                    # Busca binária da posição do vértice na parte já ordenada
+                    low, high = 0, i - 1
+                    while low < high:
+                        middle = (low + high) // 2
+                        if key < keys[order[middle]]:
+                            high = middle
+                        else:
+                            low = middle + 1
+                    del order[i]
+                    order.insert(low, item)
+
+        if order is None:
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            self.full_sorts += 1
+        else:
+            self.repairs += 1
+
+        self.order = order
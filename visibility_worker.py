@@ -0,0 +1,115 @@
+from __future__ import annotations
+import threading
+from occluders import Occluders
+from polymap import Polymap
+from visibility_solver import VisibilitySolver
+
+
+class VisibilityWorker:
+    """
+    Computes visibility triangles in a background thread, so a slow solve doesn't hold the
+    render loop.
+
+    submit only records the latest request and returns at once. A request that is still
+    waiting when a newer one arrives is dropped, so the worker always moves to the newest
+    source. Finished results go to a back buffer that is swapped with the front buffer under a
+    lock, and latest returns the front buffer, the most recent completed result.
+
+    The worker reads snapshots of the Polymap and of the occluders taken when their versions
+    change, so the map can be edited and doors opened while a solve is running. Consecutive
+    solves on the same Polymap snapshot share a VisibilitySolver, which only swaps its
+    occluder layer when the occluders change. The solve runs in Python and shares the
+    interpreter lock with the render loop, which still runs between its time slices.
+    """
+
+    def __init__(self, map_size: tuple[int, int]):
+        self.map_size = map_size
+        self.condition = threading.Condition()
+        self.pending = None
+        self.requested = None
+        self.front = None
+        self.back = None
+        self.snapshot = None
+        self.occluders = None
+        self.solver = None
+        self.running = True
+        self.completed = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def submit(self, polymap: Polymap, source: tuple[int, int], occluders: Occluders = None):
+        """
+        Ask for the triangles of the source, seen through the enabled occluders if given,
+        replacing the request still waiting, if any.
+        """
+        version = (polymap.version, None if occluders is None else occluders.version)
+        key = (version, tuple(source))
+        if key == self.requested:
+            return
+
+        if self.snapshot is None or self.snapshot.version != polymap.version:
+            self.snapshot = polymap.snapshot()
+        if occluders is None:
+            self.occluders = None
+        elif self.occluders is None or self.occluders.version != occluders.version:
+            self.occluders = occluders.snapshot()
+
+        with self.condition:
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = (key, self.snapshot, self.occluders, tuple(source))
+            self.requested = key
+            self.condition.notify()
+
+    def latest(self) -> tuple[tuple, list] | None:
+        """
+        The most recent completed result as (((polymap version, occluders version), source),
+        triangles), or None before the first one.
+        """
+        with self.condition:
+            return self.front
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait until every submitted request is done. Returns False on timeout.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.pending is None and
+                                           (self.front is not None and self.front[0] == self.requested), timeout)
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None or not self.running)
+                if not self.running:
+                    return
+                key, snapshot, occluders, source = self.pending
+                self.pending = None
+
+            if self.solver is None or self.solver.polymap is not snapshot:
+                self.solver = VisibilitySolver(snapshot, self.map_size, occluders=occluders)
+            else:
+                # Um novo snapshot dos oclusores só troca a camada deles no solver
+                self.solver.occluders = occluders
+            self.back = (key, self.solver.build_visibility_triangles(source))
+
+            with self.condition:
+                self.front, self.back = self.back, self.front
+                self.completed += 1
+                self.condition.notify_all()
+
+    def close(self):
+        """
+        Stop the thread, dropping the request still waiting.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()